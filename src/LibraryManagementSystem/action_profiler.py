@@ -0,0 +1,96 @@
+# action_profiler.py
+
+import cProfile
+import os
+import re
+import threading
+import tracemalloc
+from datetime import datetime
+from configuration import (PROFILE_ACTIONS_ENV, PROFILE_ONLY_ENV, PROFILE_ACTION_COUNT, PROFILE_TRACEMALLOC_FRAMES,
+                           UI_PROFILE_DIR)
+
+class ActionProfiler:
+    # Captures cProfile stats and tracemalloc snapshots for the next N UI actions. arm()
+    # creates a timestamped directory under UI_PROFILE_DIR; each captured action writes
+    # NN_<action>.prof plus NN_<action>.before/.after.tracemalloc snapshots into it.
+    # One action is captured at a time: nested actions and actions started on another
+    # thread while a capture is running are executed normally.
+
+    def __init__(self):
+        self.remaining = 0
+        self.only = None
+        self.directory = None
+        self.captured = 0
+        self.started_tracemalloc = False
+        self.lock = threading.Lock()
+
+    @property
+    def armed(self):
+        return self.remaining > 0
+
+    def arm(self, count=PROFILE_ACTION_COUNT, only=None):
+        # Capture the next `count` actions, optionally only those whose method name is in `only`
+        self.directory = os.path.join(UI_PROFILE_DIR, f"actions_{datetime.now():%Y%m%d_%H%M%S}")
+        os.makedirs(self.directory, exist_ok=True)
+        self.only = set(only) if only else None
+        self.captured = 0
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(PROFILE_TRACEMALLOC_FRAMES)
+            self.started_tracemalloc = True
+        self.remaining = count
+        print(f"Profiling the next {count} actions into {self.directory}")
+
+    def disarm(self):
+        self.remaining = 0
+        if self.started_tracemalloc:
+            tracemalloc.stop()
+            self.started_tracemalloc = False
+
+    def toggle(self, count=PROFILE_ACTION_COUNT):
+        if self.armed:
+            self.disarm()
+        else:
+            self.arm(count)
+        return self.armed
+
+    def arm_from_environment(self):
+        # LMS_PROFILE_ACTIONS=N captures the first N actions; LMS_PROFILE_ONLY=load_borrowed,issue_book narrows them
+        count = os.environ.get(PROFILE_ACTIONS_ENV, '').strip()
+        if count.isdigit() and int(count) > 0:
+            only = [name.strip() for name in os.environ.get(PROFILE_ONLY_ENV, '').split(',') if name.strip()]
+            self.arm(int(count), only)
+
+    def call(self, name, func, *args, **kwargs):
+        # Run func, capturing it if armed and `name` (Owner.method) is wanted
+        if not self.remaining or (self.only and name.rsplit('.', 1)[-1] not in self.only):
+            return func(*args, **kwargs)
+        if not self.lock.acquire(blocking=False):
+            return func(*args, **kwargs)
+        try:
+            if not self.remaining:
+                return func(*args, **kwargs)
+            return self._capture(name, func, args, kwargs)
+        finally:
+            self.lock.release()
+
+    def _capture(self, name, func, args, kwargs):
+        self.remaining -= 1
+        self.captured += 1
+        prefix = os.path.join(self.directory, f"{self.captured:02d}_" + re.sub(r'[^\w.-]', '_', name))
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            # Written before the action runs so the snapshot itself is not part of the "after" picture
+            tracemalloc.take_snapshot().dump(prefix + '.before.tracemalloc')
+        profiler = cProfile.Profile()
+        try:
+            return profiler.runcall(func, *args, **kwargs)
+        finally:
+            profiler.dump_stats(prefix + '.prof')
+            if tracing:
+                tracemalloc.take_snapshot().dump(prefix + '.after.tracemalloc')
+            if not self.remaining:
+                self.disarm()
+                print(f"Profiling finished, {self.captured} actions saved in {self.directory}")
+
+# Shared by every wrapped UI action
+ACTION_PROFILER = ActionProfiler()
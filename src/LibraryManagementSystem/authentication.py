@@ -2,8 +2,12 @@
 
 import tkinter as tk
 from tkinter import messagebox
+import queue
 import re
-from configuration import COLORS, FONTS
+import threading
+from configuration import COLORS, FONTS, LOGIN_POLL_INTERVAL_MS
+from password_hashing import verify_password, needs_rehash, hash_password
+from session_store import SESSIONS, parse_roles
 
 class AuthPage:
     def __init__(self, root, db, on_success):
@@ -13,6 +17,9 @@ class AuthPage:
         self.db = db
         self.on_success = on_success
         self.frame = None
+        self.login_btn = None
+        self.checks = queue.Queue()
+        self.checking = False
 
     def show(self):
         # Display authentication page, clear existing widgets
@@ -121,7 +128,7 @@ class AuthPage:
         forgot_btn.pack(pady=(0, 15))
 
         # Login button
-        login_btn = tk.Button(
+        self.login_btn = login_btn = tk.Button(
             login_frame,
             text="Login",
             font=FONTS['login'],
@@ -137,7 +144,9 @@ class AuthPage:
         login_btn.bind('<Leave>', lambda e: login_btn.configure(bg=COLORS['primary']))
 
     def login(self):
-        # Validate username and password
+        # Validate username and password against the librarians table
+        if self.checking:
+            return
         username = self.username_entry.get().strip()
         password = self.password_entry.get().strip()
 
@@ -153,9 +162,65 @@ class AuthPage:
                 "It cannot end with a period and must be up to 50 characters.")
             return
 
-        messagebox.showinfo("Success", f"Welcome, {username}!")
+        # Identity and roles are read once here and cached in the session
+        librarian = self.db.fetch_one("""
+            SELECT l.librarian_id, l.username, l.password, GROUP_CONCAT(r.role) AS roles
+            FROM librarians l
+            LEFT JOIN librarian_roles r ON r.librarian_id = l.librarian_id
+            WHERE l.username = %s
+            GROUP BY l.librarian_id, l.username, l.password
+        """, (username,))
+
+        # The password hash is deliberately slow, so it runs off the Tk thread
+        self.set_checking(True)
+        threading.Thread(target=self.check_password, args=(librarian, password),
+                         name="login-check", daemon=True).start()
+        self.root.after(LOGIN_POLL_INTERVAL_MS, self.finish_login)
+
+    def check_password(self, librarian, password):
+        # Worker thread: verify, and prepare a hash at the current cost if the stored one is outdated
+        try:
+            verified = verify_password(password, librarian['password'] if librarian else None)
+            upgraded = hash_password(password) if verified and needs_rehash(librarian['password']) else None
+            self.checks.put((librarian, verified, upgraded, None))
+        except Exception as e:
+            self.checks.put((librarian, False, None, e))
+
+    def finish_login(self):
+        # UI thread: wait for the password check, then sign in or report the failure
+        try:
+            librarian, verified, upgraded, error = self.checks.get_nowait()
+        except queue.Empty:
+            self.root.after(LOGIN_POLL_INTERVAL_MS, self.finish_login)
+            return
+
+        self.set_checking(False)
+        if error:
+            messagebox.showerror("Error", f"Could not verify the password: {error}")
+            return
+        if not verified:
+            messagebox.showerror("Error", "Invalid username or password.")
+            self.password_entry.delete(0, 'end')
+            return
+
+        if upgraded:
+            self.db.execute_query("UPDATE librarians SET password = %s WHERE librarian_id = %s",
+                                  (upgraded, librarian['librarian_id']))
+
+        SESSIONS.create(librarian['librarian_id'], librarian['username'], parse_roles(librarian['roles']))
+        messagebox.showinfo("Success", f"Welcome, {librarian['username']}!")
         self.on_success()
 
+    def set_checking(self, checking):
+        # Lock the form while a password check is running
+        self.checking = checking
+        if self.frame is None or not self.frame.winfo_exists():
+            return
+        state = 'disabled' if checking else 'normal'
+        self.username_entry.configure(state=state)
+        self.password_entry.configure(state=state)
+        self.login_btn.configure(state=state, text="Signing in…" if checking else "Login")
+
     def forgot_password(self):
         # Handle forgot password functionality
         dialog = tk.Toplevel(self.root)
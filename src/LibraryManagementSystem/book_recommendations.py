@@ -0,0 +1,221 @@
+# book_recommendations.py
+
+import numpy as np
+from configuration import RECOMMENDATIONS_PER_BOOK, RECOMMENDATION_BATCH_SIZE
+
+SAVE_RECOMMENDATION = """
+INSERT INTO book_recommendations (book_id, position, similar_book_id, score) VALUES (%s, %s, %s, %s)
+"""
+
+def co_borrowing(members, books, targets, limit=RECOMMENDATIONS_PER_BOOK, popularity=None):
+    """Top co-borrowed books for each target book.
+
+    members and books are integer-coded (member, book) pairs, one per distinct loan pair;
+    targets are book codes. Each batch of targets is one sparse product of the
+    (targets x members) and (members x books) incidence matrices, done with offsets into
+    the member-sorted pairs instead of per-member loops. Scores are cosine similarities
+    co / sqrt(borrowers(a) * borrowers(b)), borrowers taken from popularity (indexed by
+    book code) when the pairs are only part of the loans.
+
+    Returns (target, neighbour, score, position) arrays, best neighbour first per target.
+    """
+    empty = (np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0), np.empty(0, np.int64))
+    if not len(members) or not len(targets):
+        return empty
+
+    n_members = int(members.max()) + 1
+    n_books = int(books.max()) + 1
+    if popularity is None:
+        popularity = np.bincount(books, minlength=n_books)
+
+    # CSR layout over members: books of member m are by_member[indptr[m]:indptr[m + 1]]
+    order = np.argsort(members, kind='stable')
+    by_member = books[order]
+    indptr = np.concatenate(([0], np.cumsum(np.bincount(members, minlength=n_members))))
+
+    results = []
+    targets = np.asarray(targets, dtype=np.int64)
+    for start in range(0, len(targets), RECOMMENDATION_BATCH_SIZE):
+        batch = targets[start:start + RECOMMENDATION_BATCH_SIZE]
+        in_batch = np.isin(books, batch)
+        pair_members, pair_targets = members[in_batch], books[in_batch]
+
+        # Expand every (member, target) pair into (target, each book of that member)
+        lengths = indptr[pair_members + 1] - indptr[pair_members]
+        total = int(lengths.sum())
+        if not total:
+            continue
+        offsets = np.repeat(indptr[pair_members] - np.cumsum(lengths) + lengths, lengths) + np.arange(total)
+        source = np.repeat(pair_targets, lengths)
+        neighbour = by_member[offsets]
+        keep = source != neighbour
+
+        # Co-borrow counts per (target, neighbour)
+        keys, counts = np.unique(source[keep] * n_books + neighbour[keep], return_counts=True)
+        source, neighbour = keys // n_books, keys % n_books
+        scores = counts / np.sqrt(popularity[source] * popularity[neighbour])
+
+        # Best `limit` neighbours per target
+        order = np.lexsort((-scores, source))
+        source, neighbour, scores = source[order], neighbour[order], scores[order]
+        group_start = np.searchsorted(source, source)
+        position = np.arange(len(source)) - group_start
+        top = position < limit
+        results.append((source[top], neighbour[top], scores[top], position[top]))
+
+    if not results:
+        return empty
+    return tuple(np.concatenate(column) for column in zip(*results))
+
+class BookRecommender:
+    # "Patrons who borrowed this also borrowed" lists, precomputed into book_recommendations
+    # so a lookup is one primary-key range read. refresh() recomputes only the lists of books
+    # borrowed by members with loans past the borrow_id watermark, plus the lists that include
+    # a book borrowed since then; rebuild() recomputes all.
+
+    def __init__(self, db):
+        self.db = db
+
+    def similar_books(self, book_id, limit=5):
+        # Books most often borrowed by the same patrons
+        return self.db.fetch_all("""
+            SELECT r.similar_book_id AS book_id, b.title, b.author, r.score
+            FROM book_recommendations r
+            JOIN books b ON b.book_id = r.similar_book_id
+            WHERE r.book_id = %s
+            ORDER BY r.position
+            LIMIT %s
+        """, (book_id, limit))
+
+    def state(self):
+        return self.db.fetch_one("SELECT last_borrow_id, refreshed_at FROM rollup_state WHERE name = 'recommendations'")
+
+    def _marker(self):
+        return self.db.fetch_one("SELECT COALESCE(MAX(borrow_id), 0) AS last_id, NOW() AS now FROM borrowed_books")
+
+    def rebuild(self):
+        # Recompute every book's list from all distinct (member, book) loan pairs
+        marker = self._marker()
+        if not marker:
+            return False
+
+        columns = self.db.fetch_columns("""
+            SELECT DISTINCT member_id, book_id FROM borrowed_books WHERE borrow_id <= %s
+        """, (marker['last_id'],))
+        member_ids, book_ids = columns or ([], [])
+        rows = self._compute(member_ids, book_ids, None)
+
+        return self.db.execute_batch([
+            ("DELETE FROM book_recommendations", [()]),
+            (SAVE_RECOMMENDATION, rows),
+            ("REPLACE INTO rollup_state (name, last_borrow_id, refreshed_at) VALUES ('recommendations', %s, %s)",
+             [(marker['last_id'], marker['now'])])])
+
+    def refresh(self):
+        # Recompute the lists touched by new loans, returns the number of books updated
+        if self.db.offline:
+            return 0
+
+        state = self.state()
+        if not state:
+            self.rebuild()
+            return -1
+
+        marker = self._marker()
+        if not marker or marker['last_id'] <= state['last_borrow_id']:
+            return 0
+
+        # Books whose co-borrow counts changed (every book of a member with a new loan), and
+        # books whose stored lists score a newly borrowed book, whose borrower count may have grown
+        new_loans = (state['last_borrow_id'], marker['last_id'])
+        affected = self.db.fetch_columns("""
+            SELECT bb.book_id
+            FROM borrowed_books bb
+            JOIN (
+                SELECT DISTINCT member_id FROM borrowed_books WHERE borrow_id > %s AND borrow_id <= %s
+            ) m ON m.member_id = bb.member_id
+            UNION
+            SELECT r.book_id
+            FROM book_recommendations r
+            JOIN (
+                SELECT DISTINCT book_id FROM borrowed_books WHERE borrow_id > %s AND borrow_id <= %s
+            ) n ON n.book_id = r.similar_book_id
+        """, new_loans + new_loans)
+        affected = list(affected[0]) if affected else []
+
+        batches = []
+        for start in range(0, len(affected), RECOMMENDATION_BATCH_SIZE):
+            chunk = affected[start:start + RECOMMENDATION_BATCH_SIZE]
+            placeholders = ", ".join(["%s"] * len(chunk))
+
+            # Loan pairs of every member who borrowed one of these books
+            columns = self.db.fetch_columns(f"""
+                SELECT DISTINCT bb.member_id, bb.book_id
+                FROM borrowed_books bb
+                JOIN (
+                    SELECT DISTINCT member_id FROM borrowed_books WHERE book_id IN ({placeholders})
+                ) m ON m.member_id = bb.member_id
+            """, tuple(chunk))
+            member_ids, book_ids = columns or ([], [])
+            rows = self._compute(member_ids, book_ids, chunk)
+
+            batches.append((f"DELETE FROM book_recommendations WHERE book_id IN ({placeholders})", [tuple(chunk)]))
+            batches.append((SAVE_RECOMMENDATION, rows))
+
+        batches.append(("UPDATE rollup_state SET last_borrow_id = %s, refreshed_at = %s WHERE name = 'recommendations'",
+                        [(marker['last_id'], marker['now'])]))
+        self.db.execute_batch(batches)
+        return len(affected)
+
+    def _compute(self, member_ids, book_ids, target_ids):
+        # Rows for SAVE_RECOMMENDATION, for target_ids (or every book when None)
+        if not member_ids:
+            return []
+        members = np.unique(np.array(member_ids, dtype=object), return_inverse=True)[1].astype(np.int64)
+        books_index, books = np.unique(np.array(book_ids, dtype=object), return_inverse=True)
+        books = books.astype(np.int64)
+
+        if target_ids is None:
+            targets = np.arange(len(books_index))
+        else:
+            targets = np.flatnonzero(np.isin(books_index, np.array(target_ids, dtype=object)))
+
+        # Only members near the targets were fetched, so popularity then comes from the full table
+        popularity = None if target_ids is None else self._borrowers(books_index)
+        source, neighbour, scores, position = co_borrowing(members, books, targets, popularity=popularity)
+
+        return [(books_index[s], int(p), books_index[n], float(score))
+                for s, n, score, p in zip(source, neighbour, scores, position)]
+
+    def _borrowers(self, book_ids):
+        # Distinct borrowers per book over all of borrowed_books, aligned with book_ids
+        counts = {}
+        for start in range(0, len(book_ids), RECOMMENDATION_BATCH_SIZE):
+            chunk = [str(book_id) for book_id in book_ids[start:start + RECOMMENDATION_BATCH_SIZE]]
+            placeholders = ", ".join(["%s"] * len(chunk))
+            rows = self.db.fetch_all(f"""
+                SELECT book_id, COUNT(DISTINCT member_id) AS borrowers
+                FROM borrowed_books WHERE book_id IN ({placeholders})
+                GROUP BY book_id
+            """, tuple(chunk))
+            counts.update({row['book_id']: row['borrowers'] for row in rows})
+        return np.array([max(int(counts.get(book_id, 1)), 1) for book_id in book_ids], dtype=np.float64)
+
+def main():
+    # Scheduled refresh: python book_recommendations.py [--rebuild]
+    import sys
+    from database import Database
+    db = Database()
+    if not db.connect():
+        return
+
+    recommender = BookRecommender(db)
+    if '--rebuild' in sys.argv:
+        recommender.rebuild()
+        print("Book recommendations rebuilt")
+    else:
+        print(f"Book recommendations refreshed ({recommender.refresh()} books)")
+    db.close()
+
+if __name__ == "__main__":
+    main()
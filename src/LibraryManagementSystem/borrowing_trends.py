@@ -0,0 +1,131 @@
+# borrowing_trends.py
+
+from datetime import date, timedelta
+import numpy as np
+
+# Loans per day and category, read from the daily rollup rather than borrowed_books,
+# so even 10M historical loans arrive as at most (days x categories) rows
+TREND_QUERY = """
+SELECT r.loan_date, b.category, SUM(r.loans) AS loans
+FROM book_daily_loans r
+JOIN books b ON b.book_id = r.book_id
+WHERE r.loan_date BETWEEN %s AND %s
+GROUP BY r.loan_date, b.category
+"""
+
+DATE_RANGE_QUERY = "SELECT MIN(loan_date) AS first_day, MAX(loan_date) AS last_day FROM book_daily_loans"
+
+def _year_earlier(day):
+    # Same calendar day one year earlier (Feb 29 becomes Feb 28)
+    try:
+        return day.replace(year=day.year - 1)
+    except ValueError:
+        return day.replace(year=day.year - 1, day=28)
+
+class BorrowingTrends:
+    # Daily, weekly and monthly borrow counts, category mix, moving averages and
+    # year-over-year deltas for a date range, computed with vectorized NumPy over
+    # columns fetched in one batch.
+
+    def __init__(self, start_date, end_date, days, categories, counts):
+        # days: datetime64[D] array, categories: str array, counts: int64 array (one entry per day/category)
+        self.start_date = start_date
+        self.end_date = end_date
+        self.days = days
+        self.categories = categories
+        self.counts = counts
+
+    @classmethod
+    def load(cls, db, start_date=None, end_date=None):
+        # Fetch the range plus the year before it (for year-over-year) as columns
+        if start_date is None or end_date is None:
+            bounds = db.fetch_one(DATE_RANGE_QUERY)
+            first_day = bounds['first_day'] if bounds and bounds['first_day'] else date.today()
+            last_day = bounds['last_day'] if bounds and bounds['last_day'] else date.today()
+            start_date = start_date or first_day
+            end_date = end_date or last_day
+
+        columns = db.fetch_columns(TREND_QUERY, (start_date - timedelta(days=366), end_date))
+        loan_dates, categories, loans = columns or ([], [], [])
+        return cls(
+            start_date,
+            end_date,
+            np.array(loan_dates, dtype='datetime64[D]'),
+            np.array(categories, dtype=object),
+            np.array(loans, dtype=np.int64))
+
+    def _in_range(self, start_date, end_date):
+        # Boolean mask for rows between two dates (inclusive)
+        return (self.days >= np.datetime64(start_date, 'D')) & (self.days <= np.datetime64(end_date, 'D'))
+
+    def daily(self):
+        # (day labels, counts) for every day in the range, zero-filled
+        start = np.datetime64(self.start_date, 'D')
+        length = (np.datetime64(self.end_date, 'D') - start).astype(int) + 1
+        mask = self._in_range(self.start_date, self.end_date)
+        offsets = (self.days[mask] - start).astype(np.int64)
+        counts = np.bincount(offsets, weights=self.counts[mask], minlength=max(length, 0)).astype(np.int64)
+        return start + np.arange(length), counts
+
+    def weekly(self):
+        # (week start labels, counts), weeks starting on Monday
+        days, counts = self.daily()
+        if not len(days):
+            return days, counts
+        lead = self.start_date.weekday()
+        week_index = (np.arange(len(days)) + lead) // 7
+        weekly = np.bincount(week_index, weights=counts).astype(np.int64)
+        first_monday = np.datetime64(self.start_date - timedelta(days=lead), 'D')
+        return first_monday + 7 * np.arange(len(weekly)), weekly
+
+    def monthly(self, start_date=None, end_date=None):
+        # (month labels, counts) for every month in the range, zero-filled
+        start_date = start_date or self.start_date
+        end_date = end_date or self.end_date
+        first = np.datetime64(start_date, 'M')
+        length = (np.datetime64(end_date, 'M') - first).astype(int) + 1
+        mask = self._in_range(start_date, end_date)
+        offsets = (self.days[mask].astype('datetime64[M]') - first).astype(np.int64)
+        counts = np.bincount(offsets, weights=self.counts[mask], minlength=max(length, 0)).astype(np.int64)
+        return first + np.arange(length), counts
+
+    def moving_average(self, window=7):
+        # Trailing moving average of the daily counts (shorter windows at the start)
+        _, counts = self.daily()
+        if not len(counts):
+            return counts.astype(float)
+        cumulative = np.cumsum(np.insert(counts.astype(float), 0, 0.0))
+        idx = np.arange(1, len(counts) + 1)
+        lower = np.maximum(idx - window, 0)
+        return (cumulative[idx] - cumulative[lower]) / (idx - lower)
+
+    def category_mix(self):
+        # [(category, loans, share)] in the range, largest first
+        mask = self._in_range(self.start_date, self.end_date)
+        if not mask.any():
+            return []
+        names, inverse = np.unique(self.categories[mask].astype(str), return_inverse=True)
+        totals = np.bincount(inverse, weights=self.counts[mask]).astype(np.int64)
+        shares = totals / totals.sum()
+        order = np.argsort(-totals, kind='stable')
+        return [(str(names[i]), int(totals[i]), float(shares[i])) for i in order]
+
+    def year_over_year(self):
+        # [(month, loans, loans a year earlier, delta ratio or None)] for each month in the range
+        months, counts = self.monthly()
+        if not len(months):
+            return []
+
+        # Same days one year earlier, binned onto the current range's months
+        mask = self._in_range(_year_earlier(self.start_date), _year_earlier(self.end_date))
+        offsets = (self.days[mask].astype('datetime64[M]') - (months[0] - 12)).astype(np.int64)
+        previous = np.bincount(offsets, weights=self.counts[mask], minlength=len(months))[:len(months)]
+        previous = previous.astype(np.int64)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            deltas = np.where(previous > 0, (counts - previous) / previous, np.nan)
+        return [(str(month), int(count), int(prev), None if np.isnan(delta) else float(delta))
+                for month, count, prev, delta in zip(months, counts, previous, deltas)]
+
+    def total(self):
+        return int(self.counts[self._in_range(self.start_date, self.end_date)].sum())
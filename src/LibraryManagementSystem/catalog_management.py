@@ -4,14 +4,39 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 from configuration import COLORS, FONTS
 from utilities import generate_id, validate_isbn
+from book_recommendations import BookRecommender
+from tree_loader import TreeLoader
+from ui_profiler import UI_PROFILER
+from session_store import require
+from row_format import RowFormat, timestamp_column
 from datetime import datetime
 
+# 15 book categories in alphabetical order
+BOOK_CATEGORIES = [
+    "Adventure", "Art", "Biography", "Business", "Cooking",
+    "Fantasy", "Fiction", "History", "Horror", "Mystery",
+    "Non-Fiction", "Poetry", "Romance", "Science", "Technology"]
+
+# Treeview values for a book
+BOOK_ROW_FORMAT = RowFormat(
+    ('book_id', None), ('title', None), ('author', None), ('isbn', None), ('category', None), ('status', None),
+    ('added_at', timestamp_column()), ('updated_at', timestamp_column()))
+
+# Books whose id, title, author or ISBN contain a keyword (four %keyword% parameters)
+BOOK_SEARCH_QUERY = """
+SELECT * FROM books
+WHERE book_id LIKE %s OR title LIKE %s OR author LIKE %s OR isbn LIKE %s
+ORDER BY book_id
+"""
+
 class BookManagement:
     def __init__(self, parent, db):
         self.context_menu = None
         self.parent = parent
         self.db = db
         self.tree = None
+        self.tree_loader = None
+        self.recommender = BookRecommender(db)
         self.search_var = tk.StringVar()
         self.category_var = tk.StringVar(value="All")
         self.status_var = tk.StringVar(value="All")
@@ -74,12 +99,7 @@ class BookManagement:
             fg=COLORS['text']).
          pack(side='left'))
 
-        # 15 book categories in alphabetical order
-        categories = [
-            "Adventure", "Art", "Biography", "Business", "Cooking",
-            "Fantasy", "Fiction", "History", "Horror", "Mystery",
-            "Non-Fiction", "Poetry", "Romance", "Science", "Technology"]
-        categories.insert(0, "All")
+        categories = ["All"] + BOOK_CATEGORIES
 
         category_combo = ttk.Combobox(
             search_frame,
@@ -99,7 +119,7 @@ class BookManagement:
             fg=COLORS['text']).
          pack(side='left', padx=(10, 0)))
 
-        statuses = ["All", "Available", "Borrowed"]
+        statuses = ["All", "Available", "Borrowed", "On Hold"]
         status_combo = ttk.Combobox(
             search_frame,
             textvariable=self.status_var,
@@ -170,10 +190,15 @@ class BookManagement:
         self.context_menu.add_command(label="Delete Book", command=self.delete_book)
 
         self.tree.bind('<Button-3>', self.show_context_menu)
+        self.tree_loader = TreeLoader(self.tree)
 
         # Load initial data
         self.load_books()
 
+    def refresh(self):
+        # Reload data shown on the page (used when the dashboard returns to a stale page)
+        self.load_books()
+
     def show_context_menu(self, event):
         # Show right-click context menu
         try:
@@ -184,9 +209,6 @@ class BookManagement:
 
     def load_books(self):
         # Load books from database with category and status filters
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
         category_filter = self.category_var.get()
         status_filter = self.status_var.get()
 
@@ -210,16 +232,7 @@ class BookManagement:
         query += " ORDER BY book_id"  # Preserve book ID order
         books = self.db.fetch_all(query, tuple(params))
 
-        for book in books:
-            self.tree.insert('', 'end', values=(
-                book['book_id'],
-                book['title'],
-                book['author'],
-                book['isbn'],
-                book['category'],
-                book['status'],
-                book['added_at'].strftime("%Y-%m-%d %H:%M:%S") if book['added_at'] else "",
-                book['updated_at'].strftime("%Y-%m-%d %H:%M:%S") if book['updated_at'] else ""))
+        self.tree_loader.load(books, BOOK_ROW_FORMAT)
 
     def search_books(self):
         # Search books by keyword
@@ -228,27 +241,11 @@ class BookManagement:
         if not keyword:
             self.load_books()
             return
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        query = """
-        SELECT * FROM books 
-        WHERE book_id LIKE %s OR title LIKE %s OR author LIKE %s OR isbn LIKE %s
-        ORDER BY book_id
-        """
+
         search_pattern = f"%{keyword}%"
-        books = self.db.fetch_all(query, (search_pattern,) * 4)
-
-        for book in books:
-            self.tree.insert('', 'end', values=(
-                book['book_id'],
-                book['title'],
-                book['author'],
-                book['isbn'],
-                book['category'],
-                book['status'],
-                book['added_at'].strftime("%Y-%m-%d %H:%M:%S") if book['added_at'] else "",
-                book['updated_at'].strftime("%Y-%m-%d %H:%M:%S") if book['updated_at'] else ""))
+        books = self.db.fetch_all(BOOK_SEARCH_QUERY, (search_pattern,) * 4)
+
+        self.tree_loader.load(books, BOOK_ROW_FORMAT)
 
     def view_book_details(self):
         # Show book details in a dialog
@@ -264,15 +261,15 @@ class BookManagement:
 
         dialog = tk.Toplevel(self.parent)
         dialog.title("Book Details")
-        dialog.geometry("500x400")
+        dialog.geometry("500x560")
         dialog.configure(bg='white')
         dialog.resizable(False, False)
         dialog.grab_set()
 
         dialog.update_idletasks()
         x = (dialog.winfo_screenwidth() // 2) - (500 // 2)
-        y = (dialog.winfo_screenheight() // 2) - (400 // 2)
-        dialog.geometry(f'500x400+{x}+{y}')
+        y = (dialog.winfo_screenheight() // 2) - (560 // 2)
+        dialog.geometry(f'500x560+{x}+{y}')
 
         tk.Label(dialog, text="Book Details", font=FONTS['heading'], bg='white', fg=COLORS['text']).pack(pady=15)
 
@@ -313,6 +310,31 @@ class BookManagement:
                 anchor='w').
              pack(side='left', fill='x', expand=True))
 
+        # Patrons who borrowed this also borrowed
+        tk.Label(
+            details_frame,
+            text="Patrons who borrowed this also borrowed:",
+            font=FONTS['small'],
+            bg='white',
+            fg=COLORS['secondary'],
+            anchor='w').pack(fill='x', pady=(12, 2))
+
+        similar = self.recommender.similar_books(book['book_id'])
+        if not similar:
+            similar_lines = ["No recommendations yet"]
+        else:
+            similar_lines = [f"{item['title']} – {item['author']}" for item in similar]
+
+        for line in similar_lines:
+            (tk.Label(
+                details_frame,
+                text=line,
+                font=FONTS['small'],
+                bg='white',
+                fg=COLORS['text'],
+                anchor='w').
+             pack(fill='x'))
+
         close_btn = tk.Button(
             dialog,
             text="Close",
@@ -329,6 +351,8 @@ class BookManagement:
 
     def add_book_dialog(self):
         # Show add book dialog
+        if not require('manage_books'):
+            return
         dialog = tk.Toplevel(self.parent)
         dialog.title("Add New Book")
         dialog.geometry("500x450")
@@ -359,13 +383,7 @@ class BookManagement:
 
         tk.Label(form_frame, text="Category*", font=FONTS['small'], bg='white').pack(anchor='w')
 
-        # 15 categories in alphabetical order
-        categories = [
-            "Adventure", "Art", "Biography", "Business", "Cooking",
-            "Fantasy", "Fiction", "History", "Horror", "Mystery",
-            "Non-Fiction", "Poetry", "Romance", "Science", "Technology"]
-
-        category_combo = ttk.Combobox(form_frame, values=categories, state='readonly', width=37)
+        category_combo = ttk.Combobox(form_frame, values=BOOK_CATEGORIES, state='readonly', width=37)
         category_combo.pack(pady=(0, 20))
         category_combo.set("Fiction")
 
@@ -402,7 +420,8 @@ class BookManagement:
                 messagebox.showerror("Error", "Failed to add book", parent=dialog)
 
         save_btn = tk.Button(btn_frame, text="Save Book", font=FONTS['small'], bg=COLORS['primary'],
-                             fg='white', width=15, cursor='hand2', command=save_book)
+                             fg='white', width=15, cursor='hand2',
+                             command=UI_PROFILER.wrap_action('BookManagement.save_book', save_book))
         save_btn.pack(side='left', padx=5)
         save_btn.bind('<Enter>', lambda e: save_btn.configure(bg=COLORS['secondary']))
         save_btn.bind('<Leave>', lambda e: save_btn.configure(bg=COLORS['primary']))
@@ -415,6 +434,8 @@ class BookManagement:
 
     def update_book_dialog(self):
         # Show update book dialog
+        if not require('manage_books'):
+            return
         selected = self.tree.selection()
         if not selected:
             return
@@ -458,13 +479,7 @@ class BookManagement:
 
         tk.Label(form_frame, text="Category*", font=FONTS['small'], bg='white').pack(anchor='w')
 
-        # 15 categories in alphabetical order
-        categories = [
-            "Adventure", "Art", "Biography", "Business", "Cooking",
-            "Fantasy", "Fiction", "History", "Horror", "Mystery",
-            "Non-Fiction", "Poetry", "Romance", "Science", "Technology"]
-
-        category_combo = ttk.Combobox(form_frame, values=categories, state='readonly', width=37)
+        category_combo = ttk.Combobox(form_frame, values=BOOK_CATEGORIES, state='readonly', width=37)
         category_combo.set(book['category'])
         category_combo.pack(pady=(0, 20))
 
@@ -497,7 +512,8 @@ class BookManagement:
                 messagebox.showerror("Error", "Failed to update book", parent=dialog)
 
         update_btn = tk.Button(btn_frame, text="Update Book", font=FONTS['small'], bg=COLORS['primary'],
-                               fg='white', width=15, cursor='hand2', command=update_book)
+                               fg='white', width=15, cursor='hand2',
+                               command=UI_PROFILER.wrap_action('BookManagement.update_book', update_book))
         update_btn.pack(side='left', padx=5)
         update_btn.bind('<Enter>', lambda e: update_btn.configure(bg=COLORS['secondary']))
         update_btn.bind('<Leave>', lambda e: update_btn.configure(bg=COLORS['primary']))
@@ -510,6 +526,8 @@ class BookManagement:
 
     def delete_book(self):
         # Delete book with confirmation
+        if not require('delete_records'):
+            return
         selected = self.tree.selection()
         if not selected:
             return
@@ -4,14 +4,28 @@ import tkinter as tk
 from datetime import datetime
 from tkinter import ttk, messagebox
 from configuration import COLORS, FONTS
-from utilities import format_currency, calculate_due_date
+from database import StaleRowError
+from reservation_queue import ReservationQueue
+from loan_operations import LOAN_SEARCH_QUERY, issue_loan, update_loan, delete_loan, refresh_overdue
+from tree_loader import TreeLoader
+from ui_profiler import UI_PROFILER
+from session_store import require
+from row_format import RowFormat, timestamp_column, date_column, currency_column
+
+# Treeview values for a loan
+LOAN_ROW_FORMAT = RowFormat(
+    ('book_id', None), ('member_id', None), ('book_title', None), ('borrow_date', date_column()),
+    ('return_date', date_column('N/A')), ('due_date', date_column()), ('status', None),
+    ('fine_amount', currency_column()), ('updated_at', timestamp_column()))
 
 class BorrowedManagement:
     def __init__(self, parent, db):
         self.context_menu = None
         self.parent = parent
         self.db = db
+        self.holds = ReservationQueue(db)
         self.tree = None
+        self.tree_loader = None
         self.search_var = tk.StringVar()
         self.filter_var = tk.StringVar(value="All")
 
@@ -143,10 +157,15 @@ class BorrowedManagement:
         self.context_menu.add_command(label="Delete Book", command=self.delete_borrowed)
 
         self.tree.bind('<Button-3>', self.show_context_menu)
+        self.tree_loader = TreeLoader(self.tree)
 
         # Load initial data
-        self.load_borrowed()
+        self.refresh()
+
+    def refresh(self):
+        # Bring overdue fines up to date, then reload the loans
         self.update_overdue_status()
+        self.load_borrowed()
 
     def show_context_menu(self, event):
         # Show right-click context menu
@@ -159,30 +178,11 @@ class BorrowedManagement:
             pass
 
     def update_overdue_status(self):
-        # Update overdue and lost book fines
-
-        overdue_query = """
-        UPDATE borrowed_books 
-        SET status = 'Overdue',
-            fine_amount = DATEDIFF(CURDATE(), due_date) * 100,
-            updated_at = NOW()
-        WHERE status = 'Borrowed' AND due_date < CURDATE()
-        """
-        self.db.execute_query(overdue_query)
-
-        lost_query = """
-        UPDATE borrowed_books 
-        SET fine_amount = 1000,
-            updated_at = NOW()
-        WHERE status = 'Lost' AND (fine_amount IS NULL OR fine_amount = 0)
-        """
-        self.db.execute_query(lost_query)
+        # Update overdue and lost book fines, then expire uncollected holds
+        refresh_overdue(self.db, self.holds)
 
     def load_borrowed(self):
         # Load borrowed books from database ordered by due date
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
         filter_value = self.filter_var.get()
 
         if filter_value == "All":
@@ -203,20 +203,7 @@ class BorrowedManagement:
             """
             borrowed = self.db.fetch_all(query, (filter_value,))
 
-        for item in borrowed:
-            return_date = item['return_date'].strftime('%Y-%m-%d') if item['return_date'] else 'N/A'
-            updated_at = item['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if item.get('updated_at') else ''
-
-            self.tree.insert('', 'end', values=(
-                item['book_id'],
-                item['member_id'],
-                item['book_title'],
-                item['borrow_date'].strftime('%Y-%m-%d'),
-                return_date,
-                item['due_date'].strftime('%Y-%m-%d'),
-                item['status'],
-                format_currency(item['fine_amount']),
-                updated_at))
+        self.tree_loader.load(borrowed, LOAN_ROW_FORMAT, iid_key='borrow_id')
 
     def search_borrowed(self):
         # Search borrowed books by keyword
@@ -225,37 +212,16 @@ class BorrowedManagement:
         if not keyword:
             self.load_borrowed()
             return
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        query = """
-        SELECT bb.*, b.title as book_title
-        FROM borrowed_books bb
-        JOIN books b ON bb.book_id = b.book_id
-        WHERE bb.book_id LIKE %s OR bb.member_id LIKE %s OR b.title LIKE %s
-        ORDER BY bb.due_date ASC
-        """
 
         search_pattern = f"%{keyword}%"
-        borrowed = self.db.fetch_all(query, (search_pattern, search_pattern, search_pattern))
-
-        for item in borrowed:
-            return_date = item['return_date'].strftime('%Y-%m-%d') if item['return_date'] else 'N/A'
-            updated_at = item['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if item.get('updated_at') else ''
-
-            self.tree.insert('', 'end', values=(
-                item['book_id'],
-                item['member_id'],
-                item['book_title'],
-                item['borrow_date'].strftime('%Y-%m-%d'),
-                return_date,
-                item['due_date'].strftime('%Y-%m-%d'),
-                item['status'],
-                format_currency(item['fine_amount']),
-                updated_at))
+        borrowed = self.db.fetch_all(LOAN_SEARCH_QUERY, (search_pattern, search_pattern, search_pattern))
+
+        self.tree_loader.load(borrowed, LOAN_ROW_FORMAT, iid_key='borrow_id')
 
     def add_borrowed_dialog(self):
         """Show add borrowed book dialog with consistent styling"""
+        if not require('issue_and_return_books'):
+            return
         dialog = tk.Toplevel(self.parent)
         dialog.title("Issue Book")
         dialog.geometry("500x450")
@@ -313,51 +279,34 @@ class BorrowedManagement:
                 messagebox.showerror("Error", "All fields are required", parent=dialog)
                 return
 
-            # Check if book exists and is available
-            book = self.db.fetch_one("SELECT * FROM books WHERE book_id = %s", (book_id,))
-            if not book:
+            outcome, detail = issue_loan(self.db, self.holds, book_id, member_id, period)
+            if outcome == 'book_not_found':
                 messagebox.showerror("Error", "Book ID not found", parent=dialog)
-                return
-
-            if book['status'] != 'Available':
-                messagebox.showerror("Error", "Book is not available for borrowing", parent=dialog)
-                return
-
-            # Check if member exists
-            member = self.db.fetch_one("SELECT * FROM members WHERE member_id = %s", (member_id,))
-            if not member:
+            elif outcome == 'member_not_found':
                 messagebox.showerror("Error", "Member ID not found", parent=dialog)
-                return
-
-            # ACTIVATE INACTIVE MEMBER - NEW FUNCTIONALITY
-            now = datetime.now()
-            if member['status'] == 'Inactive':
-                # Update member status to Active
-                update_status_query = """
-                UPDATE members 
-                SET status = 'Active', updated_at = %s 
-                WHERE member_id = %s
-                """
-                self.db.execute_query(update_status_query, (now, member_id))
-                messagebox.showinfo("Member Status Updated",
-                                    f"Member {member_id} has been activated for borrowing",
-                                    parent=dialog)
-
-            # Calculate dates
-            borrow_date = datetime.now().date()
-            due_date = calculate_due_date(borrow_date, int(period))
-
-            # Insert borrowed record — include updated_at
-            query = """
-            INSERT INTO borrowed_books (book_id, member_id, borrow_date, due_date, status, updated_at)
-            VALUES (%s, %s, %s, %s, 'Borrowed', %s)
-            """
-
-            if self.db.execute_query(query, (book_id, member_id, borrow_date, due_date, now)):
-                # Update book status
-                self.db.execute_query("UPDATE books SET status = 'Borrowed', updated_at = %s WHERE book_id = %s",
-                                      (now, book_id))
-
+            elif outcome == 'unavailable':
+                hold = detail
+                if hold:
+                    message = f"Book is on hold for member {hold['member_id']}.\nPlace a hold for {member_id}?"
+                else:
+                    message = f"Book is not available for borrowing.\nPlace a hold for {member_id}?"
+
+                if messagebox.askyesno("Book Unavailable", message, parent=dialog):
+                    placed = self.holds.place_hold(book_id, member_id)
+                    if placed:
+                        position = placed[1] if placed[1] is not None else "pending (saved offline)"
+                        messagebox.showinfo("Hold Placed",
+                                            f"Hold placed successfully!\nQueue position: {position}",
+                                            parent=dialog)
+                        dialog.destroy()
+                    else:
+                        messagebox.showerror("Error", "Member already has a hold on this book", parent=dialog)
+            elif outcome == 'issued':
+                due_date, activated = detail
+                if activated:
+                    messagebox.showinfo("Member Status Updated",
+                                        f"Member {member_id} has been activated for borrowing",
+                                        parent=dialog)
                 messagebox.showinfo("Success",
                                     f"Book issued successfully!\nDue Date: {due_date.strftime('%Y-%m-%d')}",
                                     parent=dialog)
@@ -376,7 +325,7 @@ class BorrowedManagement:
             fg='white',
             width=12,
             cursor='hand2',
-            command=issue_book)
+            command=UI_PROFILER.wrap_action('BorrowedManagement.issue_book', issue_book))
         issue_btn.pack(side='left', padx=5)
 
         # Hover effects
@@ -481,21 +430,15 @@ class BorrowedManagement:
 
     def update_borrowed_dialog(self):
         # Show update borrowed book dialog with consistent styling matching membership update
+        if not require('issue_and_return_books'):
+            return
         selected = self.tree.selection()
         if not selected:
             return
 
-        values = self.tree.item(selected[0])['values']
-        book_id = values[0]
-        member_id = values[1]
-
-        # Get borrowed record
-        query = """
-            SELECT * FROM borrowed_books 
-            WHERE book_id = %s AND member_id = %s
-            ORDER BY borrow_id DESC LIMIT 1
-            """
-        borrowed = self.db.fetch_one(query, (book_id, member_id))
+        # Row iid is the borrow_id of the loan
+        borrow_id = selected[0]
+        borrowed = self.db.fetch_one("SELECT * FROM borrowed_books WHERE borrow_id = %s", (borrow_id,))
 
         if not borrowed:
             messagebox.showerror("Error", "Borrowed record not found")
@@ -592,44 +535,19 @@ class BorrowedManagement:
                 messagebox.showerror("Error", "Invalid date format or fine amount")
                 return
 
-            # Determine return date based on status
-            return_date = None
-            if status == "Returned":
-                return_date = datetime.now().date()
-
-            now = datetime.now()
-
-            # Update borrowed record
-            if return_date:
-                update_query = """
-                UPDATE borrowed_books 
-                SET book_id = %s, member_id = %s, borrow_date = %s, due_date = %s, 
-                    status = %s, fine_amount = %s, return_date = %s, updated_at = %s
-                WHERE borrow_id = %s
-                """
-                params = (new_book_id, new_member_id, borrow_date, due_date, status, fine, return_date, now,
-                          borrowed['borrow_id'])
-            else:
-                update_query = """
-                UPDATE borrowed_books 
-                SET book_id = %s, member_id = %s, borrow_date = %s, due_date = %s, 
-                    status = %s, fine_amount = %s, updated_at = %s
-                WHERE borrow_id = %s
-                """
-                params = (new_book_id, new_member_id, borrow_date, due_date, status, fine, now, borrowed['borrow_id'])
-
-            if self.db.execute_query(update_query, params):
-                # Update book status if changed to Returned
+            saved, next_hold = update_loan(self.db, self.holds, borrowed, new_book_id, new_member_id,
+                                           borrow_date, due_date, status, fine)
+            if saved:
                 if status == "Returned":
-                    self.db.execute_query("UPDATE books SET status = 'Available', updated_at = %s WHERE book_id = %s",
-                                          (now, new_book_id))
+                    if next_hold:
+                        messagebox.showinfo("Hold Ready",
+                                            f"Book {new_book_id} is now on hold for member {next_hold['member_id']} "
+                                            f"until {next_hold['expires_at'].strftime('%Y-%m-%d')}",
+                                            parent=dialog)
 
-                    # Check if member has any other borrowed books
-                    borrowed_count = self.db.fetch_one("""
-                        SELECT COUNT(*) as count 
-                        FROM borrowed_books 
-                        WHERE member_id = %s AND status = 'Borrowed'
-                    """, (new_member_id,))
+                    # Check if member has any other active loans
+                    borrowed_count = self.db.fetch_one(
+                        "SELECT active_loans AS count FROM members WHERE member_id = %s", (new_member_id,))
 
                     # If no other borrowed books, show notification about member status
                     if borrowed_count and borrowed_count['count'] == 0:
@@ -637,22 +555,11 @@ class BorrowedManagement:
                         messagebox.showinfo("Member Status",
                                             f"Member {new_member_id} has no more borrowed books. Consider reviewing their status.",
                                             parent=dialog)
-                elif status in ["Borrowed", "Overdue"]:
-                    self.db.execute_query("UPDATE books SET status = 'Borrowed', updated_at = %s WHERE book_id = %s",
-                                          (now, new_book_id))
-
-                elif status == "Lost":
-                    self.db.execute_query("""
-                        UPDATE borrowed_books 
-                        SET fine_amount = 1000, updated_at = %s 
-                        WHERE borrow_id = %s AND (fine_amount IS NULL OR fine_amount = 0)
-                    """, (now, borrowed['borrow_id']))
-                    self.db.execute_query("UPDATE books SET status = 'Lost', updated_at = %s WHERE book_id = %s",
-                                          (now, new_book_id))
-
                 messagebox.showinfo("Success", "Borrowed book updated successfully!")
                 dialog.destroy()
                 self.load_borrowed()
+            elif isinstance(self.db.last_error, StaleRowError):
+                messagebox.showerror("Error", "This loan was changed at another desk. Reopen it and try again.")
             else:
                 messagebox.showerror("Error", "Failed to update borrowed book")
 
@@ -664,7 +571,7 @@ class BorrowedManagement:
             fg='white',
             width=12,
             cursor='hand2',
-            command=update_book
+            command=UI_PROFILER.wrap_action('BorrowedManagement.update_book', update_book)
         )
         update_btn.pack(side='left', padx=5)
 
@@ -689,30 +596,30 @@ class BorrowedManagement:
 
     def delete_borrowed(self):
         """Delete borrowed record with confirmation"""
+        if not require('delete_records'):
+            return
         selected = self.tree.selection()
         if not selected:
             return
 
-        values = self.tree.item(selected[0])['values']
+        borrow_id = selected[0]
+        values = self.tree.item(borrow_id)['values']
         book_title = values[2]
 
         if messagebox.askyesno("Confirm Delete",
                                f"Are you sure you want to delete this borrowed record for '{book_title}'?"):
-            book_id = values[0]
-            member_id = values[1]
-
-            query = """
-            DELETE FROM borrowed_books 
-            WHERE book_id = %s AND member_id = %s 
-            ORDER BY borrow_id DESC LIMIT 1
-            """
+            loan = self.db.fetch_one(
+                "SELECT borrow_id, book_id, member_id, borrow_date, status, fine_amount FROM borrowed_books "
+                "WHERE borrow_id = %s", (borrow_id,))
+            if not loan:
+                messagebox.showerror("Error", "Borrowed record not found")
+                return
 
-            if self.db.execute_query(query, (book_id, member_id)):
-                # Update book status back to available
-                now = datetime.now()
-                self.db.execute_query("UPDATE books SET status = 'Available', updated_at = %s WHERE book_id = %s",
-                                      (now, book_id))
+            # Deleting a loan also takes it off the member's loan totals
+            if delete_loan(self.db, self.holds, loan):
                 messagebox.showinfo("Success", "Borrowed record deleted successfully!")
                 self.load_borrowed()
+            elif isinstance(self.db.last_error, StaleRowError):
+                messagebox.showerror("Error", "This loan was changed at another desk. Reload and try again.")
             else:
                 messagebox.showerror("Error", "Failed to delete record")
\ No newline at end of file
@@ -15,10 +15,101 @@ DB_CONFIG = {
     'password': '',               # Set your MySQL password
     'database': 'db_library'}
 
+# Offline Mode
+OFFLINE_QUEUE_PATH = 'offline_queue.db'   # Local write-ahead queue used while MySQL is unreachable
+OFFLINE_SYNC_INTERVAL_MS = 30000          # How often queued writes are replayed
+
 # Application Settings
 APP_TITLE = "Library Management System"
 APP_GEOMETRY = "1200x700"
 
+# Security Settings
+PASSWORD_SCRYPT_N = 2 ** 14       # scrypt CPU/memory cost (16 MiB per hash at r=8); password_benchmark.py suggests one
+PASSWORD_SCRYPT_R = 8             # scrypt block size
+PASSWORD_SCRYPT_P = 1             # scrypt parallelism
+LOGIN_TARGET_MS = 250             # Login latency password_benchmark.py picks the cost for
+LOGIN_POLL_INTERVAL_MS = 20       # How often the login page checks for the finished password check
+SESSION_IDLE_TIMEOUT_SECONDS = 900  # Idle time after which the desk locks back to the login page
+SESSION_CHECK_INTERVAL_MS = 30000   # How often idle sessions are looked for
+
+# What each librarian role may do; accounts without a role in librarian_roles get DEFAULT_ROLE
+ROLE_PERMISSIONS = {
+    'admin': ('manage_books', 'manage_members', 'import_members', 'issue_and_return_books', 'delete_records',
+              'export_reports'),
+    'librarian': ('manage_books', 'manage_members', 'import_members', 'issue_and_return_books', 'export_reports'),
+    'assistant': ('issue_and_return_books',)}
+DEFAULT_ROLE = 'librarian'
+
+# Circulation Settings
+HOLD_PICKUP_DAYS = 3              # Days a Ready hold is kept for the patron
+OVERDUE_FINE_PER_DAY = 100        # Fine charged per day past the due date
+LOST_BOOK_FINE = 1000             # Flat replacement fine for a lost book
+LOAN_COUNTER_CHECK_INTERVAL_MS = 3600000  # How often member loan totals are verified against borrowed_books
+
+# Table Loading
+TREE_FIRST_CHUNK = 50             # Rows inserted immediately (the first screenful)
+TREE_CHUNK_SIZE = 500             # Rows inserted per scheduled chunk after that
+TREE_CHUNK_DELAY_MS = 1           # Pause between chunks, lets Tk handle pending events
+TREE_HIDDEN_POLL_MS = 250         # How often a load paused on a hidden page checks again
+FORMAT_CACHE_SIZE = 100000        # Formatted values remembered per table column before starting over
+
+# Dashboard Settings
+PAGE_STALE_AFTER_SECONDS = 300    # Hidden pages older than this reload their data when shown again
+IMPORT_POLL_INTERVAL_MS = 50      # How often the patron page picks up validated member import chunks
+
+# Report Settings
+REPORT_STATS_TTL_SECONDS = 60     # How long the statistics cards are served from the snapshot
+ROLLUP_REFRESH_INTERVAL_MS = 900000  # How often the daily report rollups are brought up to date
+ROLLUP_OVERLAP_SECONDS = 300      # Loans updated this long before the last refresh are looked at again
+CUBE_CHANGE_RETENTION_HOURS = 24  # How long loan_cube_changes rows are kept; older cubes are rebuilt
+REPORT_POLL_INTERVAL_MS = 50      # How often the reports page checks for finished sections
+EXPORT_FETCH_SIZE = 5000          # Rows read from the server per batch while exporting
+EXPORT_PDF_ROWS_PER_PAGE = 48     # Table rows per exported PDF page
+TRENDING_CAPACITY = 200           # Counters kept per day for the trending titles
+TRENDING_WINDOW_DAYS = (7, 30)    # Windows offered in the Trending table
+TRENDING_PERSIST_INTERVAL_MS = 300000  # How often new checkouts are saved to trending_buckets
+
+# Recommendation Settings
+RECOMMENDATIONS_PER_BOOK = 10     # Co-borrowed books stored per title
+RECOMMENDATION_BATCH_SIZE = 500   # Books scored per sparse product batch
+RECOMMENDATION_REFRESH_INTERVAL_MS = 900000  # How often lists touched by new loans are recomputed
+
+# Profiling
+UI_PROFILE_ENV = 'LMS_UI_PROFILE'  # Set to 1 to time UI actions and event-loop lag
+UI_PROFILE_DIR = 'profiles'       # Where traces are written
+UI_PROFILE_HEARTBEAT_MS = 100     # Interval of the event-loop lag probe
+UI_PROFILE_LAG_THRESHOLD_MS = 50  # Probe delays at least this long are written to the trace
+UI_PROFILE_LAG_WINDOW = 50        # Probes the overlay's maximum lag is taken over (5 s)
+PROFILE_ACTIONS_ENV = 'LMS_PROFILE_ACTIONS'  # Set to N to capture cProfile/tracemalloc data for the first N actions
+PROFILE_ONLY_ENV = 'LMS_PROFILE_ONLY'        # Optional comma-separated method names to capture, e.g. load_borrowed
+PROFILE_HOTKEY = '<Control-P>'    # Ctrl+Shift+P arms (or disarms) capturing of the next actions
+PROFILE_ACTION_COUNT = 5          # Actions captured per hotkey press
+PROFILE_TRACEMALLOC_FRAMES = 25   # Stack depth kept per traced allocation
+
+# Synthetic Data
+GENERATOR_BATCH_SIZE = 10000      # Rows per INSERT batch when loading generated data
+GENERATOR_HISTORY_DAYS = 3 * 365  # Days of loan history generated up to `today`
+GENERATOR_BOOK_ATTEMPTS = 40      # Books tried per generated loan before it is dropped (all out)
+
+# Benchmarks
+BENCHMARK_SIZES = {               # Generated dataset per size: (books, members, loans)
+    'small': (5000, 2000, 50000),
+    'medium': (50000, 20000, 500000),
+    'large': (200000, 100000, 5000000)}
+BENCHMARK_RUNS = 20               # Timed runs per scenario
+BENCHMARK_BASELINE_PATH = 'benchmark_baseline.json'  # Results page_benchmark.py compares against
+BENCHMARK_TOLERANCE = 0.20        # Slowdown over the baseline reported as a regression
+
+# Load Simulation
+SIMULATOR_DESKS = 4               # Virtual circulation desks run at once
+SIMULATOR_DURATION_SECONDS = 60   # How long each simulation runs
+SIMULATOR_THINK_MS = 200          # Mean pause between one desk's operations (exponentially distributed)
+SIMULATOR_WORKLOADS = {           # name -> (operation weights, books the desks concentrate on or None for all)
+    'counter': ({'checkout': 35, 'checkin': 35, 'search': 20, 'renew': 8, 'overdue_sweep': 2}, None),
+    'rush': ({'checkout': 55, 'checkin': 30, 'search': 15}, None),
+    'browse': ({'search': 85, 'checkout': 8, 'checkin': 7}, None),
+    'contention': ({'checkout': 45, 'checkin': 35, 'renew': 20}, 20)}
+
 # Font Styles
 FONTS = {
     'title': ('Segoe UI', 25, 'bold'),        # Main titles
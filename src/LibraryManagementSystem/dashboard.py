@@ -1,21 +1,40 @@
 # dashboard.py
 
+import time
 import tkinter as tk
-from configuration import COLORS, FONTS
+from configuration import COLORS, FONTS, PAGE_STALE_AFTER_SECONDS
+from ui_profiler import UI_PROFILER
+from session_store import SESSIONS
+
+# Tables shown on each page; a committed write to one of them marks the page stale
+PAGE_TABLES = {
+    'catalog': {'books'},
+    'patrons': {'members'},
+    'circulation': {'borrowed_books', 'books', 'members'},
+    'reports': {'borrowed_books', 'books', 'members'}}
 
 class Dashboard:
     def __init__(self, root, db):
         self.root = root
         self.db = db
         self.current_page = None
+        self.current_name = None
         self.main_frame = None
         self.content_frame = None
+        self.pages = {}             # name -> (page, frame), kept alive while hidden
+        self.loaded_at = {}         # name -> time.monotonic() of the last load
+        self.stale = set()
+        self.last_switch_ms = None
+        self.db.add_write_listener(self.mark_stale)
+        UI_PROFILER.instrument(self)
 
     def show(self):
         # Display dashboard with sidebar navigation
         # Clear existing widgets
         for widget in self.root.winfo_children():
             widget.destroy()
+        self.pages = {}
+        self.current_name = None
 
         # Main container
         self.main_frame = tk.Frame(self.root, bg=COLORS['background'])
@@ -36,7 +55,17 @@ class Dashboard:
             font=FONTS['title'],
             bg=COLORS['primary'],
             fg='white')
-        logo.pack(pady=30)
+        logo.pack(pady=(30, 0))
+
+        # Signed-in librarian
+        session = SESSIONS.current
+        signed_in = tk.Label(
+            sidebar,
+            text=f"Signed in as {session.username}" if session else "",
+            font=FONTS['subtext'],
+            bg=COLORS['primary'],
+            fg='white')
+        signed_in.pack(pady=(0, 20))
 
         # Navigation buttons
         nav_buttons = [
@@ -90,44 +119,67 @@ class Dashboard:
         # Show default page (Book Management)
         self.show_book_management()
 
-    def clear_content(self):
-        # Clear content area
-        for widget in self.content_frame.winfo_children():
-            widget.destroy()
+    def mark_stale(self, tables):
+        # Database write listener: hidden pages showing a written table refresh on their next visit.
+        # The visible page reloads itself after its own writes.
+        for name, page_tables in PAGE_TABLES.items():
+            if name != self.current_name and page_tables & tables:
+                self.stale.add(name)
+
+    def show_page(self, name, page_class):
+        # Show a page, building it on the first visit. Later visits only unhide it,
+        # refreshing its data if it is stale or older than PAGE_STALE_AFTER_SECONDS.
+        started = time.perf_counter()
+        if self.current_name in self.pages:
+            self.pages[self.current_name][1].pack_forget()
+
+        if name not in self.pages:
+            frame = tk.Frame(self.content_frame, bg=COLORS['background'])
+            frame.pack(fill='both', expand=True)
+            page = UI_PROFILER.instrument(page_class(frame, self.db))
+            self.pages[name] = (page, frame)
+            self.current_name = name
+            page.show()
+            self.loaded_at[name] = time.monotonic()
+            self.stale.discard(name)
+        else:
+            page, frame = self.pages[name]
+            frame.pack(fill='both', expand=True)
+            self.current_name = name
+            if name in self.stale or time.monotonic() - self.loaded_at[name] > PAGE_STALE_AFTER_SECONDS:
+                self.stale.discard(name)
+                page.refresh()
+                self.loaded_at[name] = time.monotonic()
+
+        self.current_page = page
+        self.last_switch_ms = (time.perf_counter() - started) * 1000
 
     def show_book_management(self):
         # Show book management page
-        self.clear_content()
         from catalog_management import BookManagement
-        self.current_page = BookManagement(self.content_frame, self.db)
-        self.current_page.show()
+        self.show_page('catalog', BookManagement)
 
     def show_membership_management(self):
         # Show membership management page
-        self.clear_content()
         from patron_management import MembershipManagement
-        self.current_page = MembershipManagement(self.content_frame, self.db)
-        self.current_page.show()
+        self.show_page('patrons', MembershipManagement)
 
     def show_borrowed_management(self):
         # Show borrowed books management page
-        self.clear_content()
         from circulation_desk import BorrowedManagement
-        self.current_page = BorrowedManagement(self.content_frame, self.db)
-        self.current_page.show()
+        self.show_page('circulation', BorrowedManagement)
 
     def show_reports_analytics(self):
         # Show reports and analytics page
-        self.clear_content()
         from library_reports import ReportsAnalytics
-        self.current_page = ReportsAnalytics(self.content_frame, self.db)
-        self.current_page.show()
+        self.show_page('reports', ReportsAnalytics)
 
     def logout(self):
         # Handle logout
         from tkinter import messagebox
         if messagebox.askyesno("Logout", "Are you sure you want to logout?"):
-            # Return to login page
+            # End the session and return to login page
+            SESSIONS.end(SESSIONS.current)
             from authentication import AuthPage
             auth = AuthPage(self.root, self.db, self.show)
             auth.show()
\ No newline at end of file
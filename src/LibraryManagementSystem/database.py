@@ -1,21 +1,69 @@
 # database.py
 
+import re
 import mysql.connector
+from datetime import datetime
 from mysql.connector import Error
-from configuration import DB_CONFIG
+from configuration import DB_CONFIG, OFFLINE_QUEUE_PATH
+from offline_queue import OfflineQueue, queued_table, written_table
+from password_hashing import hash_password
+
+# Writes that target a single row; affecting zero rows on replay means the row changed meanwhile
+_KEYED_WRITE = re.compile(r'\bWHERE\b.*\b\w+_id\s*=\s*%s', re.IGNORECASE | re.DOTALL)
+
+# Schema added after the tables were first created. CREATE TABLE IF NOT EXISTS leaves existing
+# tables as they are, so migrate_tables() adds whatever a database is missing.
+# (table, column, definition)
+UPGRADE_COLUMNS = [
+    ('members', 'active_loans', "INT NOT NULL DEFAULT 0"),
+    ('members', 'total_loans', "INT NOT NULL DEFAULT 0"),
+    ('members', 'total_fines', "DECIMAL(12, 2) NOT NULL DEFAULT 0.00"),
+    ('members', 'email_key', "VARCHAR(100)"),
+    ('members', 'mobile_key', "VARCHAR(20)"),
+    ('members', 'name_key', "VARCHAR(100)"),
+    ('borrowed_books', 'updated_at', "TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP")]
+
+# (table, column, column type as information_schema reports it, rest of the definition)
+UPGRADE_ENUMS = [
+    ('books', 'status', "enum('Available','Borrowed','On Hold','Lost')", "DEFAULT 'Available' NOT NULL"),
+    ('borrowed_books', 'status', "enum('Borrowed','Returned','Overdue','Lost')", "NOT NULL DEFAULT 'Borrowed'")]
+
+# (table, index, columns)
+UPGRADE_INDEXES = [
+    ('members', 'idx_members_status', "(status, member_id)"),
+    ('members', 'idx_members_email_key', "(email_key)"),
+    ('members', 'idx_members_mobile_key', "(mobile_key)"),
+    ('members', 'idx_members_name_key', "(name_key)"),
+    ('borrowed_books', 'idx_borrowed_loan', "(book_id, member_id, borrow_id)"),
+    ('borrowed_books', 'idx_borrowed_member_history', "(member_id, borrow_date, borrow_id)"),
+    ('borrowed_books', 'idx_borrowed_status', "(status, due_date, fine_amount)"),
+    ('borrowed_books', 'idx_borrowed_updated', "(updated_at)"),
+    ('borrowed_books', 'idx_borrowed_date', "(borrow_date, book_id, status, fine_amount)")]
+
+class StaleRowError(Error):
+    # A guarded write matched no row: another client changed or removed it since it was read
+    pass
 
 class Database:
-    def __init__(self):
+    def __init__(self, config=DB_CONFIG, offline_queue_path=OFFLINE_QUEUE_PATH):
+        # Tools working on another schema pass its config and a private queue (':memory:'), so they
+        # never replay the desk's queued writes or queue their own for the live database
+        self.config = config
         self.connection = None
         self.cursor = None
+        self.offline = False
+        self.last_row_id = None
+        self.last_error = None      # Server error of the most recent failed write, e.g. a deadlock
+        self.offline_queue = OfflineQueue(offline_queue_path)
+        self.write_listeners = []
 
     def connect(self):
         # Establish database connection
         try:
-            self.connection = mysql.connector.connect(**DB_CONFIG)
+            self.connection = mysql.connector.connect(**self.config)
             self.cursor = self.connection.cursor(dictionary=True)
             print("Database connected successfully")
-            print(f"Connected to database: {DB_CONFIG['database']}")
+            print(f"Connected to database: {self.config['database']}")
             return True
         except Error as e:
             print(f"Error connecting to database: {e}")
@@ -49,6 +97,14 @@ class Database:
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
             """,
+            # Roles granted to each librarian (see ROLE_PERMISSIONS)
+            """
+            CREATE TABLE IF NOT EXISTS librarian_roles (
+                librarian_id INT NOT NULL,
+                role VARCHAR(20) NOT NULL,
+                PRIMARY KEY (librarian_id, role)
+            )
+            """,
             # Members table
             """
             CREATE TABLE IF NOT EXISTS members (
@@ -57,11 +113,31 @@ class Database:
                 email VARCHAR(100) UNIQUE NOT NULL,
                 mobile_number VARCHAR(20),
                 status ENUM('Active', 'Inactive') DEFAULT 'Active' NOT NULL,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+                active_loans INT NOT NULL DEFAULT 0,
+                total_loans INT NOT NULL DEFAULT 0,
+                total_fines DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
+                email_key VARCHAR(100),
+                mobile_key VARCHAR(20),
+                name_key VARCHAR(100),
+                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                INDEX idx_members_status (status, member_id),
+                INDEX idx_members_email_key (email_key),
+                INDEX idx_members_mobile_key (mobile_key),
+                INDEX idx_members_name_key (name_key)
+            )
+            """,
+            # Member name tokens (prefix search on any word of a name)
+            """
+            CREATE TABLE IF NOT EXISTS member_name_tokens (
+                token VARCHAR(50) NOT NULL,
+                member_id VARCHAR(15) NOT NULL,
+                PRIMARY KEY (token, member_id),
+                FOREIGN KEY (member_id) REFERENCES members(member_id) ON UPDATE CASCADE ON DELETE CASCADE
             )
             """,
-            # Books table
+            # Books table. On Hold copies are set aside for a Ready reservation; Lost copies belong to a
+            # loan marked Lost (the circulation desk always wrote 'Lost', which the ENUM used to reject)
             """
             CREATE TABLE IF NOT EXISTS books (
                 book_id VARCHAR(15) PRIMARY KEY,
@@ -69,8 +145,8 @@ class Database:
                 author VARCHAR(100) NOT NULL,
                 isbn VARCHAR(20) UNIQUE NOT NULL,
                 category VARCHAR(100) NOT NULL,
-                status ENUM('Available', 'Borrowed') DEFAULT 'Available' NOT NULL,
-                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                status ENUM('Available', 'Borrowed', 'On Hold', 'Lost') DEFAULT 'Available' NOT NULL,
+                added_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
             )
             """,
@@ -83,10 +159,101 @@ class Database:
                 borrow_date DATE NOT NULL,
                 due_date DATE NOT NULL,
                 return_date DATE,
-                status ENUM('Borrowed', 'Returned', 'Overdue') NOT NULL DEFAULT 'Borrowed',
+                status ENUM('Borrowed', 'Returned', 'Overdue', 'Lost') NOT NULL DEFAULT 'Borrowed',
                 fine_amount DECIMAL(10, 2) DEFAULT 0.00,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                INDEX idx_borrowed_loan (book_id, member_id, borrow_id),
+                INDEX idx_borrowed_member_history (member_id, borrow_date, borrow_id),
+                INDEX idx_borrowed_status (status, due_date, fine_amount),
+                INDEX idx_borrowed_updated (updated_at),
+                INDEX idx_borrowed_date (borrow_date, book_id, status, fine_amount),
+                FOREIGN KEY (book_id) REFERENCES books(book_id) ON UPDATE CASCADE ON DELETE CASCADE,
+                FOREIGN KEY (member_id) REFERENCES members(member_id) ON UPDATE CASCADE ON DELETE CASCADE
+            )
+            """,
+            # Reservations table (per-book FIFO hold queues)
+            """
+            CREATE TABLE IF NOT EXISTS reservations (
+                reservation_id INT AUTO_INCREMENT PRIMARY KEY,
+                book_id VARCHAR(15) NOT NULL,
+                member_id VARCHAR(15) NOT NULL,
+                status ENUM('Waiting', 'Ready', 'Fulfilled', 'Expired', 'Cancelled') NOT NULL DEFAULT 'Waiting',
+                reserved_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                ready_at DATETIME,
+                expires_at DATETIME,
+                INDEX idx_reservations_queue (book_id, status, reservation_id),
+                INDEX idx_reservations_expiry (status, expires_at),
                 FOREIGN KEY (book_id) REFERENCES books(book_id) ON UPDATE CASCADE ON DELETE CASCADE,
-                FOREIGN KEY (member_id) REFERENCES members(member_id) ON UPDATE CASCADE DELETE CASCADE
+                FOREIGN KEY (member_id) REFERENCES members(member_id) ON UPDATE CASCADE ON DELETE CASCADE
+            )
+            """,
+            # Daily report rollups (loans per book per day, loans and fines per member per day)
+            """
+            CREATE TABLE IF NOT EXISTS book_daily_loans (
+                loan_date DATE NOT NULL,
+                book_id VARCHAR(15) NOT NULL,
+                loans INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (loan_date, book_id)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS member_daily_loans (
+                loan_date DATE NOT NULL,
+                member_id VARCHAR(15) NOT NULL,
+                loans INT NOT NULL DEFAULT 0,
+                fines DECIMAL(12, 2) NOT NULL DEFAULT 0.00,
+                PRIMARY KEY (loan_date, member_id)
+            )
+            """,
+            # Rollup cells invalidated by deleted or moved loans, and the refresh watermark
+            """
+            CREATE TABLE IF NOT EXISTS rollup_dirty (
+                loan_date DATE NOT NULL,
+                book_id VARCHAR(15) NOT NULL,
+                member_id VARCHAR(15) NOT NULL,
+                PRIMARY KEY (loan_date, book_id, member_id)
+            )
+            """,
+            # Months whose loans were deleted or moved, read by every desk's loan cube (see loan_cube.py)
+            """
+            CREATE TABLE IF NOT EXISTS loan_cube_changes (
+                change_id BIGINT AUTO_INCREMENT PRIMARY KEY,
+                loan_month INT NOT NULL,
+                changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                INDEX idx_cube_changes_changed (changed_at)
+            )
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS rollup_state (
+                name VARCHAR(20) PRIMARY KEY,
+                last_borrow_id INT NOT NULL DEFAULT 0,
+                refreshed_at DATETIME NOT NULL
+            )
+            """,
+            # Per-day checkout counts behind the trending titles (see trending_titles.py)
+            """
+            CREATE TABLE IF NOT EXISTS trending_buckets (
+                bucket_date DATE NOT NULL,
+                book_id VARCHAR(15) NOT NULL,
+                loans INT NOT NULL DEFAULT 0,
+                PRIMARY KEY (bucket_date, book_id)
+            )
+            """,
+            # Precomputed "also borrowed" lists (see book_recommendations.py)
+            """
+            CREATE TABLE IF NOT EXISTS book_recommendations (
+                book_id VARCHAR(15) NOT NULL,
+                position TINYINT UNSIGNED NOT NULL,
+                similar_book_id VARCHAR(15) NOT NULL,
+                score FLOAT NOT NULL,
+                PRIMARY KEY (book_id, position)
+            )
+            """,
+            # Offline writes already replayed (keeps replay idempotent)
+            """
+            CREATE TABLE IF NOT EXISTS applied_offline_ops (
+                op_id CHAR(32) PRIMARY KEY,
+                applied_at DATETIME NOT NULL
             )
             """
         ]
@@ -98,61 +265,341 @@ class Database:
             print("Tables created successfully")
         except Error as e:
             print(f"Error creating tables: {e}")
+        self.migrate_tables()
+
+    def migrate_tables(self):
+        # Add the columns, ENUM values and indexes of UPGRADE_* that a database created by an older
+        # version lacks; checks information_schema first, so it is a no-op on an up-to-date schema
+        try:
+            self.cursor.execute("""
+                SELECT TABLE_NAME AS table_name, COLUMN_NAME AS column_name, COLUMN_TYPE AS column_type
+                FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE()
+            """)
+            columns = {(row['table_name'], row['column_name']): row['column_type'] for row in self.cursor.fetchall()}
+            self.cursor.execute("""
+                SELECT DISTINCT TABLE_NAME AS table_name, INDEX_NAME AS index_name
+                FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE()
+            """)
+            indexes = {(row['table_name'], row['index_name']) for row in self.cursor.fetchall()}
+
+            changes = []
+            for table, column, definition in UPGRADE_COLUMNS:
+                if (table, column) not in columns:
+                    changes.append(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            for table, column, column_type, definition in UPGRADE_ENUMS:
+                if columns.get((table, column), column_type) != column_type:
+                    changes.append(f"ALTER TABLE {table} MODIFY COLUMN {column} {column_type} {definition}")
+            for table, index, index_columns in UPGRADE_INDEXES:
+                if (table, index) not in indexes:
+                    changes.append(f"ALTER TABLE {table} ADD INDEX {index} {index_columns}")
+
+            for change in changes:
+                self.cursor.execute(change)
+            if changes:
+                print(f"Schema upgraded ({len(changes)} changes)")
+        except Error as e:
+            print(f"Error upgrading tables: {e}")
 
     def insert_default_librarian(self):
-        # Insert default librarian account
-        query = """
-        INSERT IGNORE INTO librarians (username, password)
-        VALUES ('slvirtudazo', '554893')
-        """
+        # Insert default librarian account, its password stored as a scrypt hash, with the admin role
         try:
-            self.cursor.execute(query)
+            self.cursor.execute("SELECT 1 FROM librarians WHERE username = %s", ('slvirtudazo',))
+            if not self.cursor.fetchall():
+                self.cursor.execute("INSERT IGNORE INTO librarians (username, password) VALUES (%s, %s)",
+                                    ('slvirtudazo', hash_password('554893')))
+                print("Default librarian created (username: slvirtudazo, password: 554893)")
+            self.cursor.execute("""
+            INSERT IGNORE INTO librarian_roles (librarian_id, role)
+            SELECT librarian_id, 'admin' FROM librarians WHERE username = %s
+            """, ('slvirtudazo',))
             self.connection.commit()
-            print("Default librarian created (username: slvirtudazo, password: 554893)")
         except Error as e:
             print(f"Error creating default librarian: {e}")
 
     def execute_query(self, query, params=None):
         # Execute a query with optional parameters
+        # Circulation and patron writes are queued locally while the server is unreachable
+        self.last_row_id = None
+        if self.offline or self.offline_queue.pending_count():
+            self.sync_offline_writes()
+            if self.offline:
+                return self.queue_offline_write(query, params)
+
         try:
             if params:
                 self.cursor.execute(query, params)
             else:
                 self.cursor.execute(query)
+            changed = self.cursor.rowcount > 0
             self.connection.commit()
+            self.last_row_id = self.cursor.lastrowid
+            if changed:
+                self.notify_writes([query])
             return True
         except Error as e:
             print(f"Query error: {e}")
+            self.last_error = e
+            if self.connection_lost():
+                return self.queue_offline_write(query, params)
+            return False
+
+    def execute_transaction(self, statements, guarded=()):
+        # Execute a list of (query, params) atomically, rolling back all of them on error.
+        # Statements whose index is in `guarded` must change a row, otherwise the transaction
+        # is rolled back with last_error set to a StaleRowError.
+        self.last_row_id = None
+        if self.offline or self.offline_queue.pending_count():
+            self.sync_offline_writes()
+            if self.offline:
+                return self.queue_offline_writes(statements)
+
+        try:
+            changed = []
+            for index, (query, params) in enumerate(statements):
+                if params:
+                    self.cursor.execute(query, params)
+                else:
+                    self.cursor.execute(query)
+                if index in guarded and self.cursor.rowcount == 0:
+                    raise StaleRowError(f"Row in {written_table(query)} was changed by someone else")
+                if self.last_row_id is None and self.cursor.lastrowid:
+                    self.last_row_id = self.cursor.lastrowid
+                if self.cursor.rowcount > 0:
+                    changed.append(query)
+            self.connection.commit()
+            self.notify_writes(changed)
+            return True
+        except Error as e:
+            print(f"Transaction error: {e}")
+            self.last_error = e
+            try:
+                self.connection.rollback()
+            except Error:
+                pass
+            if self.connection_lost():
+                return self.queue_offline_writes(statements)
+            return False
+
+    def execute_batch(self, batches):
+        # Execute a list of (query, rows) with executemany in a single transaction
+        if self.offline or self.offline_queue.pending_count():
+            self.sync_offline_writes()
+            if self.offline:
+                return self.queue_offline_writes([(query, row) for query, rows in batches for row in rows])
+
+        try:
+            changed = []
+            for query, rows in batches:
+                if rows:
+                    self.cursor.executemany(query, rows)
+                    if self.cursor.rowcount > 0:
+                        changed.append(query)
+            self.connection.commit()
+            self.notify_writes(changed)
+            return True
+        except Error as e:
+            print(f"Batch error: {e}")
+            try:
+                self.connection.rollback()
+            except Error:
+                pass
+            if self.connection_lost():
+                return self.queue_offline_writes([(query, row) for query, rows in batches for row in rows])
             return False
 
+    def add_write_listener(self, listener):
+        # Register listener(tables) to be called after writes are committed, e.g. to drop cached reports
+        if listener not in self.write_listeners:
+            self.write_listeners.append(listener)
+
+    def notify_writes(self, queries):
+        # Tell listeners which tables the committed queries changed; callers pass only statements that changed rows
+        tables = {written_table(query) for query in queries} - {None}
+        if tables:
+            for listener in self.write_listeners:
+                listener(tables)
+
     def fetch_all(self, query, params=None):
         # Fetch all results from a query
+        if self.offline:
+            return self.offline_queue.recall(query, params) or []
         try:
             if params:
                 self.cursor.execute(query, params)
             else:
                 self.cursor.execute(query)
-            return self.cursor.fetchall()
+            result = self.cursor.fetchall()
+            self.offline_queue.remember(query, params, result, len(result))
+            return result
         except Error as e:
             print(f"Fetch error: {e}")
+            if self.connection_lost():
+                return self.offline_queue.recall(query, params) or []
             return []
 
+    def fetch_columns(self, query, params=None):
+        # Fetch a result as one list per column (tuple cursor, no per-row dicts)
+        if self.offline:
+            return self.offline_queue.recall(query, params) or ()
+        cursor = None
+        try:
+            cursor = self.connection.cursor()
+            cursor.execute(query, params or ())
+            rows = cursor.fetchall()
+            columns = tuple(list(column) for column in zip(*rows)) if rows else \
+                tuple([] for _ in cursor.description or ())
+            self.offline_queue.remember(query, params, columns, len(rows))
+            return columns
+        except Error as e:
+            print(f"Fetch error: {e}")
+            if self.connection_lost():
+                return self.offline_queue.recall(query, params) or ()
+            return ()
+        finally:
+            if cursor:
+                cursor.close()
+
+    def stream_rows(self, query, params=None, batch_size=1000):
+        # Yield a large result as batches of tuples from an unbuffered cursor, so rows are read
+        # off the server as they are consumed instead of all at once; errors are raised to the caller
+        if self.offline:
+            raise Error("Database is offline")
+        cursor = self.connection.cursor(buffered=False)
+        exhausted = False
+        try:
+            cursor.execute(query, params or ())
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    exhausted = True
+                    break
+                yield rows
+        finally:
+            # A consumer that stops early (or fails) leaves rows unread, and an unbuffered cursor
+            # refuses to close with "Unread result found" until they are drained
+            try:
+                if not exhausted:
+                    while cursor.fetchmany(batch_size):
+                        pass
+            finally:
+                cursor.close()
+
     def fetch_one(self, query, params=None):
         # Fetch one result from a query
+        if self.offline:
+            return self.offline_queue.recall(query, params)
         try:
             if params:
                 self.cursor.execute(query, params)
             else:
                 self.cursor.execute(query)
-            return self.cursor.fetchone()
+            result = self.cursor.fetchone()
+            self.offline_queue.remember(query, params, result)
+            return result
         except Error as e:
             print(f"Fetch error: {e}")
+            if self.connection_lost():
+                return self.offline_queue.recall(query, params)
             return None
 
+    def connection_lost(self):
+        # Check whether the last error was the server going away, and switch to offline mode if so
+        try:
+            lost = self.connection is None or not self.connection.is_connected()
+        except Error:
+            lost = True
+        if lost and not self.offline:
+            print("Database connection lost, serving reads from local snapshot")
+        self.offline = self.offline or lost
+        return lost
+
+    def queue_offline_write(self, query, params=None):
+        # Capture a write in the local queue, only for circulation and patron tables
+        return self.queue_offline_writes([(query, params)])
+
+    def queue_offline_writes(self, statements):
+        # Capture a group of writes only if every one of them can be queued, so none is half-applied
+        if not all(queued_table(query) for query, _ in statements):
+            print("Query error: database is offline")
+            return False
+        self.offline_queue.enqueue_group(statements)
+        return True
+
+    def reconnect(self):
+        # Try to re-establish the server connection
+        try:
+            if self.connection is not None:
+                self.connection.reconnect(attempts=1, delay=0)
+            else:
+                self.connection = mysql.connector.connect(**self.config)
+            self.cursor = self.connection.cursor(dictionary=True)
+            self.offline = False
+            return True
+        except Error:
+            self.offline = True
+            return False
+
+    def sync_offline_writes(self):
+        # Replay queued writes in order once the server is back, returns (applied, conflicts)
+        applied, conflicts = 0, []
+        if self.offline and not self.reconnect():
+            return applied, conflicts
+
+        for group in self.offline_queue.pending():
+            seqs = [seq for seq, *_ in group]
+            try:
+                # A group's op_ids are recorded together, so the first one tells whether it was applied
+                self.cursor.execute("SELECT op_id FROM applied_offline_ops WHERE op_id = %s", (group[0][1],))
+                if self.cursor.fetchone():
+                    self.offline_queue.mark_done(seqs)
+                    continue
+
+                conflict = None
+                for seq, op_id, table, query, params in group:
+                    if params:
+                        self.cursor.execute(query, params)
+                    else:
+                        self.cursor.execute(query)
+                    if self.cursor.rowcount == 0 and _KEYED_WRITE.search(query):
+                        conflict = f"Row in {table} was changed or removed before the offline write was replayed"
+                        break
+
+                if conflict:
+                    # The whole transaction is dropped, so e.g. counter adjustments never apply without their loan
+                    self.connection.rollback()
+                    self.offline_queue.mark_conflict(seqs, conflict)
+                    conflicts.append((group[0][1], group[0][2], conflict))
+                    continue
+
+                self.cursor.executemany("INSERT INTO applied_offline_ops (op_id, applied_at) VALUES (%s, %s)",
+                                        [(op_id, datetime.now()) for _, op_id, *_ in group])
+                self.connection.commit()
+                self.offline_queue.mark_done(seqs)
+                self.notify_writes([query for *_, query, _ in group])
+                applied += len(group)
+            except Error as e:
+                try:
+                    self.connection.rollback()
+                except Error:
+                    pass
+                if self.connection_lost():
+                    # Server dropped again, keep the rest of the queue for the next attempt
+                    break
+                self.offline_queue.mark_conflict(seqs, str(e))
+                conflicts.append((group[0][1], group[0][2], str(e)))
+
+        if applied or conflicts:
+            print(f"Offline sync: {applied} writes replayed, {len(conflicts)} conflicts")
+        return applied, conflicts
+
     def close(self):
         # Close database connection
-        if self.cursor:
-            self.cursor.close()
-        if self.connection:
-            self.connection.close()
+        try:
+            if self.cursor:
+                self.cursor.close()
+            if self.connection:
+                self.connection.close()
+        except Error:
+            pass
+        self.offline_queue.close()
         print("Database connection closed")
\ No newline at end of file
@@ -0,0 +1,318 @@
+# dataset_generator.py
+
+import argparse
+import bisect
+import csv
+import itertools
+import os
+import random
+from datetime import date, datetime, timedelta
+from configuration import (DB_CONFIG, GENERATOR_BATCH_SIZE, GENERATOR_HISTORY_DAYS, GENERATOR_BOOK_ATTEMPTS,
+                           LOST_BOOK_FINE)
+from utilities import calculate_fine, normalize_email, normalize_mobile, normalize_name, name_tokens
+from catalog_management import BOOK_CATEGORIES
+from report_rollups import ReportRollups
+
+FIRST_NAMES = [
+    "Maria", "Jose", "Juan", "Ana", "Mark", "Angelica", "John", "Kristine", "Michael", "Jasmine", "Paolo",
+    "Camille", "Carlo", "Patricia", "Miguel", "Andrea", "Rafael", "Nicole", "Gabriel", "Bea", "Joshua",
+    "Katrina", "Christian", "Francesca", "Daniel", "Isabel", "Adrian", "Sofia", "Luis", "Therese"]
+LAST_NAMES = [
+    "Santos", "Reyes", "Cruz", "Bautista", "Ocampo", "Garcia", "Mendoza", "Torres", "Tomas", "Andrada",
+    "Castillo", "Flores", "Villanueva", "Ramos", "Castro", "Rivera", "Aquino", "Navarro", "Salazar",
+    "Mercado", "Dela Cruz", "De Leon", "Gonzales", "Lopez", "Aguilar", "Domingo", "Pascual", "Soriano"]
+EMAIL_DOMAINS = ["gmail.com", "yahoo.com", "outlook.com", "up.edu.ph", "dlsu.edu.ph", "ateneo.edu"]
+
+TITLE_WORDS = {
+    'adjectives': ["Silent", "Hidden", "Last", "Golden", "Broken", "Secret", "Endless", "Forgotten", "Crimson",
+                   "Distant", "Quiet", "Burning", "Lost", "Bright", "Northern"],
+    'nouns': ["River", "Kingdom", "Garden", "Letter", "Island", "Promise", "Empire", "Harbor", "Season",
+              "Mountain", "Archive", "Voyage", "Light", "Storm", "City"]}
+CATEGORY_TITLES = {
+    "Art": "Drawing the {noun}", "Biography": "A Life by the {noun}", "Business": "Managing the {noun}",
+    "Cooking": "Recipes from the {adjective} {noun}", "History": "A History of the {adjective} {noun}",
+    "Non-Fiction": "Understanding the {noun}", "Poetry": "Verses of the {adjective} {noun}",
+    "Science": "The Science of the {noun}", "Technology": "Engineering the {adjective} {noun}"}
+
+# Loan period in days and how often it is chosen
+LOAN_PERIODS = ([7, 14, 21, 30], [15, 65, 15, 5])
+
+def isbn13(number):
+    """Valid ISBN-13 (978 prefix and check digit) that is unique per number below 10**9"""
+    # Multiplying by a prime coprime to 10**9 permutes the range, so numbers do not look sequential
+    body = f"978{(number * 7919 + 104729) % 10 ** 9:09d}"
+    total = sum(int(digit) * (3 if index % 2 else 1) for index, digit in enumerate(body))
+    return body + str((10 - total % 10) % 10)
+
+def zipf_weights(count, exponent):
+    # Cumulative weights for picking index i with probability proportional to 1 / (i + 1) ** exponent
+    return list(itertools.accumulate(1.0 / (rank ** exponent) for rank in range(1, count + 1)))
+
+class DatasetGenerator:
+    """Deterministic synthetic library data.
+
+    The same seed, sizes and `today` always produce the same rows. Books carry valid ISBN-13s
+    and the catalog's 15 categories, members valid emails and +63 mobile numbers, and loans
+    follow skewed book/member popularity with mostly on-time returns, some late returns with
+    fines, open loans in the last weeks (overdue once past due) and a few lost books. A book
+    is never out on two loans at once; a loan that finds no book on the shelf is dropped, so
+    very small catalogs can end up with slightly fewer loans than asked for.
+    Rows are yielded in batches so millions of loans never sit in memory at once.
+    """
+
+    def __init__(self, books, members, loans, seed=42, today=None, batch_size=GENERATOR_BATCH_SIZE):
+        self.book_count = books
+        self.member_count = members
+        self.loan_count = loans
+        self.seed = seed
+        self.today = today or date.today()
+        self.batch_size = batch_size
+        self.start = self.today - timedelta(days=GENERATOR_HISTORY_DAYS)
+        self.book_width = max(6, len(str(books)))
+        self.member_width = max(6, len(str(members)))
+
+    def book_id(self, number):
+        return f"BK-{number:0{self.book_width}d}"
+
+    def member_id(self, number):
+        return f"MEM-{number:0{self.member_width}d}"
+
+    def _rng(self, stream):
+        # Independent stream per table so changing one size does not reshuffle the others
+        return random.Random(f"{self.seed}:{stream}")
+
+    def _batches(self, rows):
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == self.batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def _timestamp(self, rng, earliest, latest):
+        seconds = int((datetime.combine(latest, datetime.min.time()) -
+                       datetime.combine(earliest, datetime.min.time())).total_seconds())
+        return datetime.combine(earliest, datetime.min.time()) + timedelta(seconds=rng.randrange(max(seconds, 1)))
+
+    def books(self):
+        """(book_id, title, author, isbn, category, added_at) batches; status is set after the loans"""
+        rng = self._rng('books')
+        authors = [f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}" for _ in range(max(self.book_count // 4, 1))]
+        author_weights = zipf_weights(len(authors), 0.8)
+        category_weights = [rng.uniform(0.5, 2.0) for _ in BOOK_CATEGORIES]
+
+        def rows():
+            for number in range(1, self.book_count + 1):
+                category = rng.choices(BOOK_CATEGORIES, category_weights)[0]
+                adjective, noun = rng.choice(TITLE_WORDS['adjectives']), rng.choice(TITLE_WORDS['nouns'])
+                title = CATEGORY_TITLES.get(category, "The {adjective} {noun}").format(adjective=adjective, noun=noun)
+                if number > len(TITLE_WORDS['adjectives']) * len(TITLE_WORDS['nouns']):
+                    title += f", Vol. {rng.randrange(1, 10)}"
+                author = authors[bisect.bisect_left(author_weights, rng.random() * author_weights[-1])]
+                added_at = self._timestamp(rng, self.start - timedelta(days=365), self.start)
+                yield self.book_id(number), title, author, isbn13(number), category, added_at
+        return self._batches(rows())
+
+    def members(self):
+        """(member_id, full_name, email, mobile_number, status, email_key, mobile_key, name_key, added_at) batches"""
+        rng = self._rng('members')
+
+        def rows():
+            for number in range(1, self.member_count + 1):
+                first, last = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+                full_name = f"{first} {last}"
+                email = f"{first}.{last.replace(' ', '')}{number}@{rng.choice(EMAIL_DOMAINS)}".lower()
+                mobile = f"+63 9{rng.randrange(100):02d} {rng.randrange(1000):03d} {rng.randrange(10000):04d}"
+                status = 'Active' if rng.random() < 0.85 else 'Inactive'
+                added_at = self._timestamp(rng, self.start - timedelta(days=730), self.today)
+                yield (self.member_id(number), full_name, email, mobile, status, normalize_email(email),
+                       normalize_mobile(mobile), normalize_name(full_name), added_at)
+        return self._batches(rows())
+
+    def member_tokens(self, member_batch):
+        # member_name_tokens rows for a batch of members
+        return [(token, member[0]) for member in member_batch for token in sorted(name_tokens(member[1]))]
+
+    def _loans_per_day(self):
+        # Loans on each day of the history: volume grows over time and weekends are quieter.
+        # The fractional parts are carried forward so the days add up to exactly loan_count.
+        days = (self.today - self.start).days
+        weights = [(1 + day / days) * (0.6 if (self.start + timedelta(days=day)).weekday() >= 5 else 1.0)
+                   for day in range(days)]
+        scale = self.loan_count / sum(weights)
+        carry = 0.0
+        for day, weight in enumerate(weights):
+            exact = weight * scale + carry
+            count = int(exact) if day < days - 1 else round(exact)
+            carry = exact - count
+            yield self.start + timedelta(days=day), count
+
+    def loans(self):
+        """(book_id, member_id, borrow_date, due_date, return_date, status, fine_amount) batches in borrow order"""
+        rng = self._rng('loans')
+        book_weights = zipf_weights(self.book_count, 0.9)
+        member_weights = zipf_weights(self.member_count, 0.7)
+        # Popularity ranks are shuffled so popular titles and patrons are spread over the ID range
+        book_order = list(range(1, self.book_count + 1))
+        member_order = list(range(1, self.member_count + 1))
+        rng.shuffle(book_order)
+        rng.shuffle(member_order)
+        # Date each book is back on the shelf; a book is never lent out twice at the same time
+        free_on = [self.start] * (self.book_count + 1)
+        book_ids = [None] + [self.book_id(number) for number in range(1, self.book_count + 1)]
+        member_ids = [None] + [self.member_id(number) for number in range(1, self.member_count + 1)]
+        periods = [timedelta(days=days) for days in LOAN_PERIODS[0]]
+        period_weights = list(itertools.accumulate(LOAN_PERIODS[1]))
+
+        def pick_book(borrow_date):
+            # Popular titles first; when they are all out the patron settles for any available one
+            for attempt in range(GENERATOR_BOOK_ATTEMPTS):
+                if attempt < 4:
+                    book = book_order[bisect.bisect_left(book_weights, rng.random() * book_weights[-1])]
+                else:
+                    book = rng.randrange(1, self.book_count + 1)
+                if free_on[book] <= borrow_date:
+                    return book
+            return None
+
+        def rows():
+            for borrow_date, count in self._loans_per_day():
+                for _ in range(count):
+                    book = pick_book(borrow_date)
+                    if book is None:
+                        continue
+                    member = member_order[bisect.bisect_left(member_weights, rng.random() * member_weights[-1])]
+                    due_date = borrow_date + periods[bisect.bisect(period_weights, rng.random() * period_weights[-1])]
+
+                    # Most loans come back by the due date, about one in five late, three in a thousand never.
+                    # Fines follow the app's rules: OVERDUE_FINE_PER_DAY per day late, LOST_BOOK_FINE when lost
+                    outcome = rng.random()
+                    if outcome < 0.78:
+                        return_date = borrow_date + timedelta(days=rng.randrange((due_date - borrow_date).days + 1))
+                    elif outcome < 0.997:
+                        return_date = due_date + timedelta(days=int(rng.expovariate(1 / 6)) + 1)
+                    else:
+                        return_date = None
+
+                    if return_date is not None and return_date <= self.today:
+                        status, fine = 'Returned', calculate_fine(due_date, return_date)
+                        free_on[book] = return_date
+                    elif return_date is None and (self.today - due_date).days > 60:
+                        status, fine = 'Lost', LOST_BOOK_FINE
+                        free_on[book] = date.max
+                    else:
+                        # Still out today
+                        return_date = None
+                        status = 'Overdue' if due_date < self.today else 'Borrowed'
+                        fine = calculate_fine(due_date, self.today) if status == 'Overdue' else 0
+                        free_on[book] = date.max
+                    yield book_ids[book], member_ids[member], borrow_date, due_date, return_date, status, fine
+        return self._batches(rows())
+
+# Statements used by the MySQL loader
+INSERT_BOOKS = """
+INSERT INTO books (book_id, title, author, isbn, category, status, added_at, updated_at)
+VALUES (%s, %s, %s, %s, %s, 'Available', %s, NULL)
+"""
+INSERT_MEMBERS = """
+INSERT INTO members (member_id, full_name, email, mobile_number, status, email_key, mobile_key, name_key,
+                     added_at, updated_at)
+VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, NULL)
+"""
+INSERT_TOKENS = "INSERT IGNORE INTO member_name_tokens (token, member_id) VALUES (%s, %s)"
+INSERT_LOANS = """
+INSERT INTO borrowed_books (book_id, member_id, borrow_date, due_date, return_date, status, fine_amount)
+VALUES (%s, %s, %s, %s, %s, %s, %s)
+"""
+# Derived data the app maintains incrementally, recomputed once after the bulk load
+# (updated_at is kept so generated rows do not all look edited today)
+FINISH_STATEMENTS = [
+    ("""
+    UPDATE books b
+    JOIN (SELECT book_id, MAX(status = 'Lost') AS lost FROM borrowed_books
+          WHERE status IN ('Borrowed', 'Overdue', 'Lost') GROUP BY book_id) open_loans
+      ON open_loans.book_id = b.book_id
+    SET b.status = IF(open_loans.lost, 'Lost', 'Borrowed'), b.updated_at = b.updated_at
+    """, None),
+    ("""
+    UPDATE members m
+    JOIN (SELECT member_id, SUM(status IN ('Borrowed', 'Overdue')) AS active_loans, COUNT(*) AS total_loans,
+                 SUM(COALESCE(fine_amount, 0)) AS total_fines
+          FROM borrowed_books GROUP BY member_id) totals
+      ON totals.member_id = m.member_id
+    SET m.active_loans = totals.active_loans, m.total_loans = totals.total_loans, m.total_fines = totals.total_fines,
+        m.updated_at = m.updated_at
+    """, None)]
+
+def load_mysql(generator, db):
+    """Bulk-load the generated rows into db's (empty) schema, then derive statuses, totals and rollups"""
+    existing = db.fetch_one("SELECT COUNT(*) AS count FROM books")
+    if existing is None or existing['count']:
+        raise SystemExit("The target schema already has books; generate into an empty database")
+
+    # Keys are generated unique and in order, so per-row unique and foreign key checks can be skipped
+    db.cursor.execute("SET SESSION unique_checks = 0, foreign_key_checks = 0")
+    try:
+        for table, query, batches in (('books', INSERT_BOOKS, generator.books()),
+                                      ('members', INSERT_MEMBERS, generator.members()),
+                                      ('borrowed_books', INSERT_LOANS, generator.loans())):
+            written = 0
+            for batch in batches:
+                statements = [(query, batch)]
+                if table == 'members':
+                    statements.append((INSERT_TOKENS, generator.member_tokens(batch)))
+                if not db.execute_batch(statements):
+                    raise SystemExit(f"Loading {table} failed")
+                written += len(batch)
+                print(f"  {table}: {written}")
+    finally:
+        db.cursor.execute("SET SESSION unique_checks = 1, foreign_key_checks = 1")
+
+    db.execute_transaction(FINISH_STATEMENTS)
+    ReportRollups(db).rebuild()
+
+def write_csv(generator, directory):
+    """Write the generated tables as CSV files (for LOAD DATA INFILE or other local backends)"""
+    os.makedirs(directory, exist_ok=True)
+    tables = (
+        ('books', ['book_id', 'title', 'author', 'isbn', 'category', 'added_at'], generator.books()),
+        ('members', ['member_id', 'full_name', 'email', 'mobile_number', 'status', 'email_key', 'mobile_key',
+                     'name_key', 'added_at'], generator.members()),
+        ('borrowed_books', ['book_id', 'member_id', 'borrow_date', 'due_date', 'return_date', 'status',
+                            'fine_amount'], generator.loans()))
+    for table, columns, batches in tables:
+        with open(os.path.join(directory, f"{table}.csv"), 'w', newline='', encoding='utf-8') as file:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            for batch in batches:
+                writer.writerows(batch)
+        print(f"  {table}.csv written")
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic library dataset")
+    parser.add_argument('--books', type=int, default=100000)
+    parser.add_argument('--members', type=int, default=50000)
+    parser.add_argument('--loans', type=int, default=1000000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--today', type=date.fromisoformat, help="date the history ends (default: today)")
+    parser.add_argument('--database', default=f"{DB_CONFIG['database']}_synthetic",
+                        help="MySQL schema to create and fill (never the live one by default)")
+    parser.add_argument('--csv', metavar='DIRECTORY', help="write CSV files instead of loading MySQL")
+    args = parser.parse_args()
+
+    generator = DatasetGenerator(args.books, args.members, args.loans, args.seed, args.today)
+    started = datetime.now()
+    print(f"Generating {args.books} books, {args.members} members and {args.loans} loans (seed {args.seed})...")
+    if args.csv:
+        write_csv(generator, args.csv)
+    else:
+        from statistics_benchmark import connect_bench_db
+        db = connect_bench_db(args.database)
+        load_mysql(generator, db)
+        db.close()
+    print(f"Done in {(datetime.now() - started).total_seconds():.1f} s")
+
+if __name__ == "__main__":
+    main()
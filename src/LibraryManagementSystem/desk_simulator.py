@@ -0,0 +1,352 @@
+# desk_simulator.py
+
+import argparse
+import os
+import random
+import statistics
+import threading
+import time
+from collections import Counter, defaultdict
+from contextlib import redirect_stdout
+from datetime import timedelta
+from configuration import (DB_CONFIG, BENCHMARK_SIZES, SIMULATOR_DESKS, SIMULATOR_DURATION_SECONDS,
+                           SIMULATOR_THINK_MS, SIMULATOR_WORKLOADS)
+from catalog_management import BOOK_SEARCH_QUERY
+from database import Database, StaleRowError
+from dataset_generator import DatasetGenerator, load_mysql, LAST_NAMES, TITLE_WORDS
+from loan_counters import ACTIVE_LOAN_STATUSES, find_counter_drift
+from loan_operations import LOAN_SEARCH_QUERY, issue_loan, update_loan, refresh_overdue
+from patron_search import search_members
+from reservation_queue import ReservationQueue
+from statistics_benchmark import connect_bench_db, percentile
+from trending_titles import TrendingTitles
+
+# MySQL errors a desk's write can fail with under contention
+ER_LOCK_WAIT_TIMEOUT = 1205
+ER_LOCK_DEADLOCK = 1213
+
+# Books with more than one open loan
+DOUBLE_ISSUED = """
+SELECT book_id, COUNT(*) AS open_loans
+FROM borrowed_books
+WHERE status IN ('Borrowed', 'Overdue')
+GROUP BY book_id
+HAVING COUNT(*) > 1
+"""
+
+# Books marked Borrowed without an open loan, or with an open loan but not marked Borrowed
+BOOK_STATUS_DRIFT = """
+SELECT b.book_id, b.status, COUNT(bb.borrow_id) AS open_loans
+FROM books b
+LEFT JOIN borrowed_books bb ON bb.book_id = b.book_id AND bb.status IN ('Borrowed', 'Overdue')
+GROUP BY b.book_id, b.status
+HAVING (b.status = 'Borrowed') <> (COUNT(bb.borrow_id) > 0)
+"""
+
+# Server-wide lock counters, sampled before and after a run
+LOCK_STATUS = "SHOW GLOBAL STATUS LIKE 'Innodb_row_lock_%'"
+LOCK_METRICS = """
+SELECT NAME, COUNT FROM information_schema.INNODB_METRICS
+WHERE NAME IN ('lock_deadlocks', 'lock_timeouts')
+"""
+
+def connect_desk(name):
+    # Connection for one desk thread. The offline queue is in memory: a desk must not replay the
+    # live client's queued writes into the simulation schema, and SQLite objects stay in their thread.
+    db = Database({**DB_CONFIG, 'database': name}, ':memory:')
+    if not db.connect():
+        raise RuntimeError(f"Cannot connect to {name}")
+    return db
+
+def integrity_violations(db):
+    """Keys of the rows breaking each circulation invariant"""
+    return {'double-issued books': {row['book_id'] for row in db.fetch_all(DOUBLE_ISSUED)},
+            'book status drift': {row['book_id'] for row in db.fetch_all(BOOK_STATUS_DRIFT)},
+            'member total drift': {row['member_id'] for row in find_counter_drift(db)}}
+
+def lock_counters(db):
+    counters = {row['Variable_name']: int(row['Value']) for row in db.fetch_all(LOCK_STATUS)}
+    counters.update({row['NAME']: int(row['COUNT']) for row in db.fetch_all(LOCK_METRICS)})
+    return counters
+
+class OpenLoans:
+    # borrow_ids of open loans the desks may return or renew, shared by every desk
+
+    def __init__(self, borrow_ids):
+        self.lock = threading.Lock()
+        self.borrow_ids = list(borrow_ids)
+
+    def add(self, borrow_id):
+        with self.lock:
+            self.borrow_ids.append(borrow_id)
+
+    def take(self, rng):
+        # Remove and return a random loan (a patron bringing the book back), None if there is none
+        with self.lock:
+            if not self.borrow_ids:
+                return None
+            index = rng.randrange(len(self.borrow_ids))
+            self.borrow_ids[index], self.borrow_ids[-1] = self.borrow_ids[-1], self.borrow_ids[index]
+            return self.borrow_ids.pop()
+
+    def pick(self, rng):
+        # A random loan, left in the pool
+        with self.lock:
+            return rng.choice(self.borrow_ids) if self.borrow_ids else None
+
+class VirtualDesk:
+    # One circulation desk: its own connection, hold queue and trending counters, as a separate
+    # client would have. Operations go through the same functions as the Circulation Desk dialogs.
+
+    def __init__(self, number, simulation):
+        self.number = number
+        self.simulation = simulation
+        self.rng = random.Random(simulation.seed * 1000 + number)
+        self.db = None
+        self.holds = None
+        self.trending = TrendingTitles()
+        self.paused = 0.0
+        self.latencies = defaultdict(list)  # operation -> milliseconds, think time excluded
+        self.outcomes = Counter()           # (operation, outcome) -> count
+
+    def think(self):
+        # Librarian time between (or inside) operations, not counted as latency
+        pause = self.rng.expovariate(1 / self.simulation.think_ms) / 1000 if self.simulation.think_ms else 0
+        time.sleep(pause)
+        self.paused += pause
+
+    def run(self):
+        operations, weights = zip(*self.simulation.operations.items())
+        try:
+            self.db = connect_desk(self.simulation.database)
+            self.holds = ReservationQueue(self.db)
+            while time.monotonic() < self.simulation.stop_at:
+                self.think()
+                operation = self.rng.choices(operations, weights)[0]
+                self.db.last_error = None
+                self.paused = 0.0
+                started = time.perf_counter()
+                try:
+                    outcome = getattr(self, operation)()
+                except Exception as e:
+                    outcome = f"error {type(e).__name__}"
+                self.latencies[operation].append((time.perf_counter() - started - self.paused) * 1000)
+                self.outcomes[operation, outcome] += 1
+        except Exception as e:
+            self.outcomes['connect', f"error {type(e).__name__}"] += 1
+        finally:
+            if self.db is not None:
+                self.db.close()
+
+    def failure(self):
+        # Outcome of a write that was not committed
+        if isinstance(self.db.last_error, StaleRowError):
+            return 'changed by another desk'
+        errno = getattr(self.db.last_error, 'errno', None)
+        return {ER_LOCK_DEADLOCK: 'deadlock', ER_LOCK_WAIT_TIMEOUT: 'lock wait timeout'}.get(errno, 'failed')
+
+    def open_loan(self, borrow_id):
+        # The loan as the update dialog reads it when opened, None once it has been closed
+        borrowed = self.db.fetch_one("SELECT * FROM borrowed_books WHERE borrow_id = %s", (borrow_id,))
+        return borrowed if borrowed and borrowed['status'] in ACTIVE_LOAN_STATUSES else None
+
+    def checkout(self):
+        simulation = self.simulation
+        book_id = self.rng.choice(simulation.hot_books or simulation.books)
+        member_id = self.rng.choice(simulation.members)
+        outcome, _ = issue_loan(self.db, self.holds, book_id, member_id, self.rng.choice([7, 14, 21]),
+                                trending=self.trending)
+        if outcome == 'failed':
+            return self.failure()
+        if outcome == 'issued' and self.db.last_row_id:
+            simulation.open_loans.add(self.db.last_row_id)
+        return outcome
+
+    def checkin(self):
+        borrow_id = self.simulation.open_loans.take(self.rng)
+        if borrow_id is None:
+            return 'no open loans'
+        borrowed = self.open_loan(borrow_id)
+        if not borrowed:
+            return 'already closed'
+
+        # The update dialog is open while the librarian checks the book
+        self.think()
+        saved, _ = update_loan(self.db, self.holds, borrowed, borrowed['book_id'], borrowed['member_id'],
+                               borrowed['borrow_date'], borrowed['due_date'], 'Returned', borrowed['fine_amount'] or 0)
+        return 'returned' if saved else self.failure()
+
+    def renew(self):
+        # Extend an open loan by a week through the update dialog
+        borrow_id = self.simulation.open_loans.pick(self.rng)
+        if borrow_id is None:
+            return 'no open loans'
+        borrowed = self.open_loan(borrow_id)
+        if not borrowed:
+            return 'already closed'
+
+        self.think()
+        saved, _ = update_loan(self.db, self.holds, borrowed, borrowed['book_id'], borrowed['member_id'],
+                               borrowed['borrow_date'], borrowed['due_date'] + timedelta(days=7),
+                               borrowed['status'], borrowed['fine_amount'] or 0)
+        return 'renewed' if saved else self.failure()
+
+    def search(self):
+        # One of the three page searches with a keyword a librarian might type
+        kind = self.rng.choice(['books', 'members', 'loans'])
+        if kind == 'members':
+            search_members(self.db, self.rng.choice(LAST_NAMES))
+        else:
+            pattern = f"%{self.rng.choice(TITLE_WORDS['nouns'])}%"
+            if kind == 'books':
+                self.db.fetch_all(BOOK_SEARCH_QUERY, (pattern,) * 4)
+            else:
+                self.db.fetch_all(LOAN_SEARCH_QUERY, (pattern,) * 3)
+        return kind
+
+    def overdue_sweep(self):
+        # What opening the Circulation Desk page runs before loading the loans
+        refresh_overdue(self.db, self.holds)
+        return self.failure() if self.db.last_error else 'done'
+
+class LoadSimulation:
+    """N virtual desks running a workload against one schema for a fixed time"""
+
+    def __init__(self, database, workload, desks, duration, think_ms, seed=42, hot_books=None):
+        self.database = database
+        self.operations, hot_count = SIMULATOR_WORKLOADS[workload]
+        self.duration = duration
+        self.think_ms = think_ms
+        self.seed = seed
+        self.stop_at = None
+        self.hot_count = hot_books if hot_books is not None else hot_count
+        self.books = []
+        self.members = []
+        self.hot_books = None
+        self.open_loans = None
+        self.desks = [VirtualDesk(number, self) for number in range(1, desks + 1)]
+
+    def prepare(self, db):
+        # Ids the desks draw from, and the open loans they can return
+        self.books = [row['book_id'] for row in db.fetch_all("SELECT book_id FROM books ORDER BY book_id")]
+        self.members = [row['member_id'] for row in db.fetch_all("SELECT member_id FROM members ORDER BY member_id")]
+        if not self.books or not self.members:
+            raise SystemExit("The simulation schema has no books or members")
+
+        query = "SELECT borrow_id FROM borrowed_books WHERE status IN ('Borrowed', 'Overdue')"
+        params = None
+        if self.hot_count:
+            # Every desk works the same few titles, so checkouts and returns collide on them
+            self.hot_books = random.Random(self.seed).sample(self.books, min(self.hot_count, len(self.books)))
+            query += f" AND book_id IN ({', '.join(['%s'] * len(self.hot_books))})"
+            params = tuple(self.hot_books)
+        self.open_loans = OpenLoans(row['borrow_id'] for row in db.fetch_all(query, params))
+
+    def run(self):
+        # Start every desk at once and wait for them; returns the elapsed seconds
+        threads = [threading.Thread(target=desk.run, name=f"desk-{desk.number}", daemon=True)
+                   for desk in self.desks]
+        started = time.monotonic()
+        self.stop_at = started + self.duration
+        # Write errors are counted per desk instead of printed by every connection
+        with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        return time.monotonic() - started
+
+    def latencies(self):
+        merged = defaultdict(list)
+        for desk in self.desks:
+            for operation, timings in desk.latencies.items():
+                merged[operation].extend(timings)
+        return merged
+
+    def outcomes(self):
+        return sum((desk.outcomes for desk in self.desks), Counter())
+
+def prepare_schema(database, size, seed):
+    # Simulation schema, generated on first use; runs keep changing it afterwards
+    db = connect_bench_db(database)
+    existing = db.fetch_one("SELECT COUNT(*) AS count FROM books")
+    if existing and existing['count']:
+        print(f"Using {database} ({existing['count']} books)")
+    else:
+        books, members, loans = BENCHMARK_SIZES[size]
+        print(f"Generating {books} books, {members} members and {loans} loans into {database}...")
+        load_mysql(DatasetGenerator(books, members, loans, seed), db)
+    return db
+
+def print_report(simulation, elapsed, locks_before, locks_after, violations_before, violations_after):
+    latencies, outcomes = simulation.latencies(), simulation.outcomes()
+    total = sum(len(timings) for timings in latencies.values())
+    print(f"\n{len(simulation.desks)} desks, {elapsed:.1f} s, {total} operations, {total / elapsed:.1f} ops/s")
+    print(f"{'operation':<14} {'count':>7} {'ops/s':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}  "
+          f"outcomes")
+    for operation, timings in sorted(latencies.items()):
+        counts = ', '.join(f"{outcome} {count}" for (name, outcome), count in sorted(outcomes.items())
+                           if name == operation)
+        print(f"{operation:<14} {len(timings):7d} {len(timings) / elapsed:7.1f} {statistics.median(timings):9.1f} "
+              f"{percentile(timings, 0.95):9.1f} {percentile(timings, 0.99):9.1f} {max(timings):9.1f}  {counts}")
+    for (name, outcome), count in sorted(outcomes.items()):
+        if name == 'connect':
+            print(f"desk connection failures: {count} ({outcome})")
+
+    failed = Counter()
+    for (_, outcome), count in outcomes.items():
+        failed[outcome] += count
+    delta = {name: locks_after.get(name, 0) - locks_before.get(name, 0) for name in locks_after}
+    print(f"\nDesk writes lost to deadlocks: {failed['deadlock']}, to lock wait timeouts: "
+          f"{failed['lock wait timeout']}, other failures: {failed['failed']}")
+    print(f"Server (all clients): {delta.get('Innodb_row_lock_waits', 0)} row lock waits, "
+          f"{delta.get('Innodb_row_lock_time', 0)} ms waited, "
+          f"{delta.get('lock_deadlocks', 0)} deadlocks, {delta.get('lock_timeouts', 0)} lock wait timeouts")
+
+    print("\nIntegrity:")
+    new_violations = 0
+    for check, after in violations_after.items():
+        new = sorted(after - violations_before[check])
+        new_violations += len(new)
+        examples = f"  e.g. {', '.join(new[:5])}" if new else ""
+        print(f"  {check:<20} {len(new):6d} new ({len(violations_before[check])} before the run){examples}")
+    return new_violations
+
+def main():
+    parser = argparse.ArgumentParser(description="Drive concurrent virtual circulation desks against one database")
+    parser.add_argument('--desks', type=int, default=SIMULATOR_DESKS)
+    parser.add_argument('--duration', type=float, default=SIMULATOR_DURATION_SECONDS, help="seconds")
+    parser.add_argument('--workload', choices=list(SIMULATOR_WORKLOADS), default='counter')
+    parser.add_argument('--think-ms', type=float, default=SIMULATOR_THINK_MS,
+                        help="mean pause between a desk's operations (0 = back to back)")
+    parser.add_argument('--hot-books', type=int, help="concentrate on this many titles (overrides the workload)")
+    parser.add_argument('--size', choices=list(BENCHMARK_SIZES), default='small',
+                        help="dataset generated when the schema is empty")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--database', default=f"{DB_CONFIG['database']}_simulation",
+                        help="MySQL schema the desks share (never the live one by default)")
+    args = parser.parse_args()
+
+    db = prepare_schema(args.database, args.size, args.seed)
+    simulation = LoadSimulation(args.database, args.workload, args.desks, args.duration, args.think_ms,
+                                args.seed, args.hot_books)
+    simulation.prepare(db)
+
+    db.connection.commit()
+    violations_before = integrity_violations(db)
+    locks_before = lock_counters(db)
+    hot = f", {len(simulation.hot_books)} hot titles" if simulation.hot_books else ""
+    print(f"Running workload '{args.workload}' on {args.desks} desks for {args.duration:.0f} s{hot}...")
+    elapsed = simulation.run()
+    # End this connection's read snapshot so the checks see what the desks committed
+    db.connection.commit()
+    locks_after = lock_counters(db)
+    violations_after = integrity_violations(db)
+
+    new_violations = print_report(simulation, elapsed, locks_before, locks_after, violations_before, violations_after)
+    db.close()
+    if new_violations:
+        raise SystemExit(f"{new_violations} new integrity violations")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+# format_benchmark.py
+
+import argparse
+import random
+from datetime import datetime, timedelta
+from decimal import Decimal
+from utilities import format_currency
+from catalog_management import BOOK_ROW_FORMAT
+from patron_management import MEMBER_ROW_FORMAT
+from circulation_desk import LOAN_ROW_FORMAT
+from statistics_benchmark import time_runs, report
+
+# Per-row formatting the table pages used before RowFormat
+def legacy_book_row(book):
+    return (
+        book['book_id'], book['title'], book['author'], book['isbn'], book['category'], book['status'],
+        book['added_at'].strftime("%Y-%m-%d %H:%M:%S") if book['added_at'] else "",
+        book['updated_at'].strftime("%Y-%m-%d %H:%M:%S") if book['updated_at'] else "")
+
+def legacy_member_row(member):
+    added_at = member['added_at'].strftime('%Y-%m-%d %H:%M:%S') if member['added_at'] else ''
+    updated_at = member['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if member['updated_at'] else ''
+    borrowed_text = (f"{member['borrowed_count']} "
+                     f"book") if member['borrowed_count'] == 1 else f"{member['borrowed_count']} books"
+    return (member['member_id'], member['full_name'], member['email'], member['mobile_number'],
+            member['status'], borrowed_text, added_at, updated_at)
+
+def legacy_loan_row(item):
+    return_date = item['return_date'].strftime('%Y-%m-%d') if item['return_date'] else 'N/A'
+    updated_at = item['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if item.get('updated_at') else ''
+    return (item['book_id'], item['member_id'], item['book_title'], item['borrow_date'].strftime('%Y-%m-%d'),
+            return_date, item['due_date'].strftime('%Y-%m-%d'), item['status'],
+            format_currency(item['fine_amount']), updated_at)
+
+def sample_rows(count, seed=42):
+    # Row dicts shaped like the page queries' results, with production-like value repetition
+    rng = random.Random(seed)
+    start = datetime(2023, 1, 1, 8)
+    books, members, loans = [], [], []
+    for number in range(1, count + 1):
+        added_at = start + timedelta(days=rng.randrange(1000), seconds=rng.randrange(36000))
+        updated_at = added_at + timedelta(days=rng.randrange(30)) if rng.random() < 0.4 else None
+        books.append({'book_id': f"BK-{number:06d}", 'title': f"Title {number}", 'author': f"Author {number % 5000}",
+                      'isbn': f"978{number:010d}", 'category': f"Category {number % 15}",
+                      'status': rng.choice(['Available', 'Borrowed']), 'added_at': added_at, 'updated_at': updated_at})
+        members.append({'member_id': f"MEM-{number:06d}", 'full_name': f"Member {number}",
+                        'email': f"member{number}@example.com", 'mobile_number': f"+63 917 {number % 1000:03d} 0000",
+                        'status': 'Active', 'borrowed_count': rng.choice([0, 0, 1, 2, 3]),
+                        'added_at': added_at, 'updated_at': updated_at})
+        borrow_date = start.date() + timedelta(days=rng.randrange(1000))
+        status = rng.choices(['Returned', 'Borrowed', 'Overdue'], [85, 9, 6])[0]
+        loans.append({'borrow_id': number, 'book_id': f"BK-{rng.randrange(1, count + 1):06d}",
+                      'member_id': f"MEM-{rng.randrange(1, count + 1):06d}", 'book_title': f"Title {number}",
+                      'borrow_date': borrow_date, 'due_date': borrow_date + timedelta(days=14),
+                      'return_date': borrow_date + timedelta(days=rng.randrange(20)) if status == 'Returned' else None,
+                      'status': status, 'fine_amount': Decimal(rng.randrange(0, 3000, 50) if status == 'Overdue' else 0),
+                      'updated_at': updated_at})
+    return books, members, loans
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare per-row and batch table row formatting")
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--runs', type=int, default=10)
+    args = parser.parse_args()
+
+    books, members, loans = sample_rows(args.rows)
+    for name, rows, legacy, row_format in (('books', books, legacy_book_row, BOOK_ROW_FORMAT),
+                                           ('members', members, legacy_member_row, MEMBER_ROW_FORMAT),
+                                           ('loans', loans, legacy_loan_row, LOAN_ROW_FORMAT)):
+        if row_format.format_rows(rows) != [legacy(row) for row in rows]:
+            raise SystemExit(f"{name}: batch formatting differs from the per-row output")
+        report(f"{name}: per row", time_runs(lambda: [legacy(row) for row in rows], args.runs))
+        report(f"{name}: batch", time_runs(lambda: row_format.format_rows(rows), args.runs))
+
+if __name__ == "__main__":
+    main()
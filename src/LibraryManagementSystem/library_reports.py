@@ -1,14 +1,98 @@
 # library_reports.py
 
 import tkinter as tk
-from tkinter import ttk
-from configuration import COLORS, FONTS
+from tkinter import ttk, messagebox, filedialog
+import numpy as np
+from datetime import date, datetime, timedelta
+from configuration import COLORS, FONTS, REPORT_STATS_TTL_SECONDS, REPORT_POLL_INTERVAL_MS, TRENDING_WINDOW_DAYS
 from utilities import format_currency
+from report_cache import TTLSnapshot
+from report_rollups import ReportRollups
+from borrowing_trends import BorrowingTrends
+from trending_titles import TRENDING_TITLES
+from loan_cube import LOAN_CUBE
+from report_worker import REPORT_WORKER
+from ui_profiler import UI_PROFILER
+from session_store import require
+
+# All statistics cards in one pass over members and one over borrowed_books
+STATISTICS_QUERY = """
+SELECT
+    m.active_members,
+    m.inactive_members,
+    l.borrowed_books,
+    l.overdue_books,
+    l.total_fines
+FROM (
+    SELECT
+        COALESCE(SUM(status = 'Active'), 0) AS active_members,
+        COALESCE(SUM(status = 'Inactive'), 0) AS inactive_members
+    FROM members
+) m
+CROSS JOIN (
+    SELECT
+        COALESCE(SUM(status = 'Borrowed'), 0) AS borrowed_books,
+        COALESCE(SUM(status = 'Overdue'), 0) AS overdue_books,
+        COALESCE(SUM(fine_amount), 0) AS total_fines
+    FROM borrowed_books
+    WHERE status IN ('Borrowed', 'Overdue')
+) l
+"""
+
+# Shared across page visits, dropped on circulation and patron writes
+STATISTICS_SNAPSHOT = TTLSnapshot(REPORT_STATS_TTL_SECONDS, ('members', 'borrowed_books'))
+
+# Loan analysis choices: group-by dimensions and measures answered from the loan cube
+ANALYSIS_GROUPS = {
+    "Category": ('category',),
+    "Month": ('month',),
+    "Status": ('status',),
+    "Category × Month": ('category', 'month')}
+ANALYSIS_MEASURES = ["Loans", "Fines", "Overdue Rate", "Lost Rate"]
+
+REPORT_PERIODS = ["All Time", "Last 7 Days", "Last 30 Days", "Last 12 Months", "This Year"]
+
+def period_range(period, today=None):
+    # (start_date, end_date) for a REPORT_PERIODS entry, None meaning unbounded
+    today = today or date.today()
+    if period == "Last 7 Days":
+        return today - timedelta(days=6), today
+    if period == "Last 30 Days":
+        return today - timedelta(days=29), today
+    if period == "Last 12 Months":
+        return today - timedelta(days=364), today
+    if period == "This Year":
+        return date(today.year, 1, 1), today
+    return None, None
 
 class ReportsAnalytics:
     def __init__(self, parent, db):
         self.parent = parent
         self.db = db
+        self.db.add_write_listener(STATISTICS_SNAPSHOT.invalidate_on_write)
+        self.worker = REPORT_WORKER
+        self.renderers = {}
+        self.section_status = {}
+        self.pending_sections = 0
+        self.content = None
+        self.card_values = []
+        self.period_var = tk.StringVar(value="All Time")
+        self.borrowers_tree = None
+        self.books_tree = None
+        self.trending_window_var = tk.StringVar(value=f"Last {TRENDING_WINDOW_DAYS[0]} Days")
+        self.trending_tree = None
+        self.analysis_group_var = tk.StringVar(value="Category × Month")
+        self.analysis_measure_var = tk.StringVar(value="Overdue Rate")
+        self.analysis_category_var = tk.StringVar(value="All")
+        self.analysis_category_combo = None
+        self.analysis_tree = None
+        trend_start, trend_end = period_range("Last 12 Months")
+        self.trend_from_var = tk.StringVar(value=trend_start.strftime('%Y-%m-%d'))
+        self.trend_to_var = tk.StringVar(value=trend_end.strftime('%Y-%m-%d'))
+        self.trend_summary = None
+        self.trend_canvas = None
+        self.monthly_tree = None
+        self.category_tree = None
 
     def show(self):
         # Display reports and analytics interface
@@ -32,6 +116,40 @@ class ReportsAnalytics:
             fg=COLORS['text'])
         subtitle.pack(anchor='w')
 
+        # Period for the ranking tables
+        period_frame = tk.Frame(self.parent, bg=COLORS['background'])
+        period_frame.pack(fill='x', padx=20, pady=(0, 10))
+
+        (tk.Label(
+            period_frame,
+            text="Period:",
+            font=FONTS['small'],
+            bg=COLORS['background'],
+            fg=COLORS['text']).
+         pack(side='left'))
+
+        period_combo = ttk.Combobox(
+            period_frame,
+            textvariable=self.period_var,
+            values=REPORT_PERIODS,
+            state='readonly',
+            width=18)
+        period_combo.pack(side='left', padx=5)
+        period_combo.bind('<<ComboboxSelected>>', lambda e: self.load_rankings())
+
+        export_btn = tk.Button(
+            period_frame,
+            text="Export…",
+            font=FONTS['small'],
+            bg=COLORS['primary'],
+            fg='white',
+            relief='flat',
+            cursor='hand2',
+            command=self.export_dialog)
+        export_btn.pack(side='right')
+        export_btn.bind('<Enter>', lambda e: export_btn.configure(bg=COLORS['secondary']))
+        export_btn.bind('<Leave>', lambda e: export_btn.configure(bg=COLORS['primary']))
+
         # Scrollable content frame
         canvas = tk.Canvas(self.parent, bg=COLORS['background'], highlightthickness=0)
         scrollbar = ttk.Scrollbar(self.parent, orient="vertical", command=canvas.yview)
@@ -47,44 +165,20 @@ class ReportsAnalytics:
         canvas.pack(side="left", fill="both", expand=True, padx=20)
         scrollbar.pack(side="right", fill="y")
 
-        # Statistics Cards
+        self.content = scrollable_frame
+
+        # Statistics Cards, filled in by the report worker
         cards_frame = tk.Frame(scrollable_frame, bg=COLORS['background'])
-        cards_frame.pack(fill='x', pady=20)
-
-        # Get statistics
-        stats = self.get_statistics()
-
-        # Card 1: Total Members
-        self.create_card(
-            cards_frame,
-            "Total Members",
-            f"{stats['active_members']} active | {stats['inactive_members']} inactive",
-            "patron account summary",
-            0)
-
-        # Card 2: Currently Borrowed Books
-        self.create_card(
-            cards_frame,
-            "Currently Borrowed",
-            f"{stats['borrowed_books']} {'book' if stats['borrowed_books'] <= 1 else 'books'}",
-            "total items on loan",
-            1)
-
-        # Card 3: Overdue Books
-        self.create_card(
-            cards_frame,
-            "Overdue Books",
-            f"{stats['overdue_books']} {'book' if stats['overdue_books'] <= 1 else 'books'}",
-            "follow-up required",
-            2)
-
-        # Card 4: Total Fines
-        self.create_card(
-            cards_frame,
-            "Total Fines",
-            format_currency(stats['total_fines']),
-            "unpaid penalties",
-            3)
+        cards_frame.pack(fill='x', pady=(20, 0))
+
+        cards = [
+            ("Total Members", "patron account summary"),
+            ("Currently Borrowed", "total items on loan"),
+            ("Overdue Books", "follow-up required"),
+            ("Total Fines", "unpaid penalties")]
+        self.card_values = [self.create_card(cards_frame, title, "…", subtitle, column)
+                            for column, (title, subtitle) in enumerate(cards)]
+        self.add_section_status(scrollable_frame, 'statistics', bg=COLORS['background'], padx=10)
 
         # Tables container
         tables_frame = tk.Frame(scrollable_frame, bg=COLORS['background'])
@@ -96,32 +190,101 @@ class ReportsAnalytics:
         # Table 2: Most Popular Books
         self.create_popular_books_table(tables_frame)
 
-    def get_statistics(self):
-        # Get all statistics from database
-        stats = {}
-
-        # Active members
-        result = self.db.fetch_one("SELECT COUNT(*) as count FROM members WHERE status = 'Active'")
-        stats['active_members'] = result['count'] if result else 0
-
-        # Inactive members
-        result = self.db.fetch_one("SELECT COUNT(*) as count FROM members WHERE status = 'Inactive'")
-        stats['inactive_members'] = result['count'] if result else 0
+        # Table 3: Trending titles from recent checkouts
+        self.create_trending_table(tables_frame)
+
+        # Borrowing trends for a chosen date range
+        self.create_trends_section(tables_frame)
+
+        # Slice and roll up loans by category, month and status
+        self.create_analysis_section(tables_frame)
+
+        # Layout is drawn, now compute each section in the background
+        self.refresh()
+
+    def refresh(self):
+        # Recompute every section
+        self.load_statistics_cards()
+        self.load_analysis(refresh=True)
+        self.load_rankings(refresh=True)
+        self.load_trending()
+        self.load_trends()
+
+    def add_section_status(self, parent, section, bg='white', padx=0):
+        # Per-section progress line: loading, computation time or the section's error
+        label = tk.Label(parent, text="", font=FONTS['subtext'], bg=bg, fg=COLORS['secondary'])
+        label.pack(anchor='w', padx=padx)
+        self.section_status[section] = label
+
+    def set_section_status(self, section, text, color=None):
+        label = self.section_status.get(section)
+        if label is not None and label.winfo_exists():
+            label.config(text=text, fg=color or COLORS['secondary'])
+
+    def submit(self, section, compute, render):
+        # Run compute(db) on the report worker, render(result) on the UI thread once it is done
+        self.renderers[section] = render
+        self.set_section_status(section, "Loading…")
+        compute = UI_PROFILER.wrap_action(f"{type(self).__name__}.compute_{section}", compute)
+        self.worker.submit(self, section, compute)
+        self.pending_sections += 1
+        if self.pending_sections == 1:
+            self.parent.after(REPORT_POLL_INTERVAL_MS, self.poll_results)
+
+    def poll_results(self):
+        # Render finished sections; a failing section only marks itself as failed
+        if self.content is None or not self.content.winfo_exists():
+            return
+
+        for owner, section, result, error, elapsed in self.worker.results():
+            if owner is not self:
+                continue
+            self.pending_sections -= 1
+            if error is None:
+                try:
+                    self.renderers[section](result)
+                except Exception as e:
+                    error = e
+
+            if error is None:
+                self.set_section_status(section, f"Updated in {elapsed:.0f} ms")
+            else:
+                print(f"Report section {section} failed: {error}")
+                self.set_section_status(section, f"Could not load this section: {error}", COLORS['accent'])
+
+        if self.pending_sections > 0:
+            self.parent.after(REPORT_POLL_INTERVAL_MS, self.poll_results)
 
-        # Currently borrowed books
-        result = self.db.fetch_one("SELECT COUNT(*) as count FROM borrowed_books WHERE status = 'Borrowed'")
-        stats['borrowed_books'] = result['count'] if result else 0
-
-        # Overdue books
-        result = self.db.fetch_one("SELECT COUNT(*) as count FROM borrowed_books WHERE status = 'Overdue'")
-        stats['overdue_books'] = result['count'] if result else 0
-
-        # Total fines
-        result = self.db.fetch_one(
-            "SELECT SUM(fine_amount) as total FROM borrowed_books WHERE status IN ('Overdue', 'Borrowed')")
-        stats['total_fines'] = result['total'] if result and result['total'] else 0
-
-        return stats
+    def get_statistics(self):
+        # Get all statistics, served from the snapshot while it is fresh
+        return STATISTICS_SNAPSHOT.get(self.load_statistics)
+
+    def load_statistics(self, db=None):
+        # Get all statistics from database in a single aggregate query
+        result = (db or self.db).fetch_one(STATISTICS_QUERY)
+        if not result:
+            return {'active_members': 0, 'inactive_members': 0, 'borrowed_books': 0,
+                    'overdue_books': 0, 'total_fines': 0}
+
+        return {
+            'active_members': int(result['active_members']),
+            'inactive_members': int(result['inactive_members']),
+            'borrowed_books': int(result['borrowed_books']),
+            'overdue_books': int(result['overdue_books']),
+            'total_fines': result['total_fines']}
+
+    def load_statistics_cards(self):
+        # Statistics cards, computed on the report worker
+        self.submit('statistics',
+                    lambda db: STATISTICS_SNAPSHOT.get(lambda: self.load_statistics(db)),
+                    self.render_statistics)
+
+    def render_statistics(self, stats):
+        members, borrowed, overdue, fines = self.card_values
+        members.config(text=f"{stats['active_members']} active | {stats['inactive_members']} inactive")
+        borrowed.config(text=f"{stats['borrowed_books']} {'book' if stats['borrowed_books'] <= 1 else 'books'}")
+        overdue.config(text=f"{stats['overdue_books']} {'book' if stats['overdue_books'] <= 1 else 'books'}")
+        fines.config(text=format_currency(stats['total_fines']))
 
     @staticmethod
     def create_card(parent, title, value, subtitle, column):
@@ -135,8 +298,10 @@ class ReportsAnalytics:
         parent.grid_columnconfigure(column, weight=1)
 
         tk.Label(card, text=title, font=FONTS['small'], bg='white', fg=COLORS['text']).pack(pady=(15, 5))
-        tk.Label(card, text=value, font=FONTS['heading'], bg='white', fg=COLORS['primary']).pack(pady=5)
+        value_label = tk.Label(card, text=value, font=FONTS['heading'], bg='white', fg=COLORS['primary'])
+        value_label.pack(pady=5)
         tk.Label(card, text=subtitle, font=FONTS['small'], bg='white', fg=COLORS['secondary']).pack(pady=(5, 15))
+        return value_label
 
     def create_top_borrowers_table(self, parent):
         # Create top borrowers table - Members with the most borrowed books
@@ -148,6 +313,7 @@ class ReportsAnalytics:
 
         tk.Label(header_frame, text="Top Borrowers", font=FONTS['subheading'], bg='white', fg=COLORS['text']).pack(anchor='w')
         tk.Label(header_frame, text="Members with the most borrowed books", font=FONTS['small'], bg='white', fg=COLORS['secondary']).pack(anchor='w')
+        self.add_section_status(header_frame, 'top_borrowers')
 
         table_frame = tk.Frame(container, bg='white')
         table_frame.pack(fill='both', expand=True, padx=20, pady=(0, 15))
@@ -170,21 +336,29 @@ class ReportsAnalytics:
         tree.column('total_fines', width=150)
 
         tree.pack(fill='both', expand=True)
-
-        query = """
-        SELECT 
-            m.member_id,
-            m.full_name,
-            COUNT(bb.borrow_id) as total_borrowed,
-            COALESCE(SUM(bb.fine_amount), 0) as total_fines
-        FROM members m
-        LEFT JOIN borrowed_books bb ON m.member_id = bb.member_id
-        GROUP BY m.member_id, m.full_name
-        HAVING total_borrowed > 0
-        ORDER BY total_borrowed DESC
-        LIMIT 10
-        """
-        borrowers = self.db.fetch_all(query)
+        self.borrowers_tree = tree
+
+    def load_rankings(self, refresh=False):
+        # Fill both ranking tables for the selected period from the daily rollups
+        start_date, end_date = period_range(self.period_var.get())
+        self.load_top_borrowers(start_date, end_date, refresh)
+        self.load_popular_books(start_date, end_date)
+
+    def load_top_borrowers(self, start_date=None, end_date=None, refresh=False):
+        # Members with the most borrowed books in the period
+        def compute(db):
+            rollups = ReportRollups(db)
+            if refresh:
+                # Bring the daily rollups up to date before ranking from them
+                rollups.refresh()
+            return rollups.top_borrowers(start_date, end_date)
+
+        self.submit('top_borrowers', compute, self.render_top_borrowers)
+
+    def render_top_borrowers(self, borrowers):
+        tree = self.borrowers_tree
+        for item in tree.get_children():
+            tree.delete(item)
 
         for idx, borrower in enumerate(borrowers, 1):
             tree.insert('', 'end', values=(
@@ -204,6 +378,7 @@ class ReportsAnalytics:
 
         tk.Label(header_frame, text="Most Popular Books", font=FONTS['subheading'], bg='white', fg=COLORS['text']).pack(anchor='w')
         tk.Label(header_frame, text="Books borrowed most of the time", font=FONTS['small'], bg='white', fg=COLORS['secondary']).pack(anchor='w')
+        self.add_section_status(header_frame, 'popular_books')
 
         table_frame = tk.Frame(container, bg='white')
         table_frame.pack(fill='both', expand=True, padx=20, pady=(0, 15))
@@ -224,24 +399,422 @@ class ReportsAnalytics:
         tree.column('times_borrowed', width=150)
 
         tree.pack(fill='both', expand=True)
+        self.books_tree = tree
 
-        query = """
-        SELECT 
-            b.book_id,
-            b.title,
-            b.author,
-            COUNT(bb.borrow_id) as borrow_count
-        FROM books b
-        LEFT JOIN borrowed_books bb ON b.book_id = bb.book_id
-        GROUP BY b.book_id, b.title, b.author
-        HAVING borrow_count > 0
-        ORDER BY borrow_count DESC
-        LIMIT 10
-        """
-        books = self.db.fetch_all(query)
+    def load_popular_books(self, start_date=None, end_date=None):
+        # Books borrowed most often in the period
+        self.submit('popular_books',
+                    lambda db: ReportRollups(db).popular_books(start_date, end_date),
+                    self.render_popular_books)
+
+    def render_popular_books(self, books):
+        tree = self.books_tree
+        for item in tree.get_children():
+            tree.delete(item)
 
         for idx, book in enumerate(books, 1):
             tree.insert('', 'end', values=(
                 f"#{idx}",
                 f"{book['title']} – {book['author']}",
-                f"{book['borrow_count']}x"))
\ No newline at end of file
+                f"{book['borrow_count']}x"))
+
+    def create_trending_table(self, parent):
+        # Create trending table - Books borrowed most in the last days, from the streaming counters
+        container = tk.Frame(parent, bg='white', relief='solid', borderwidth=1)
+        container.pack(fill='both', expand=True, padx=10, pady=10)
+
+        header_frame = tk.Frame(container, bg='white')
+        header_frame.pack(fill='x', padx=20, pady=15)
+
+        window_combo = ttk.Combobox(
+            header_frame,
+            textvariable=self.trending_window_var,
+            values=[f"Last {days} Days" for days in TRENDING_WINDOW_DAYS],
+            state='readonly',
+            width=14)
+        window_combo.pack(side='right')
+        window_combo.bind('<<ComboboxSelected>>', lambda e: self.load_trending())
+
+        tk.Label(header_frame, text="Trending", font=FONTS['subheading'], bg='white', fg=COLORS['text']).pack(anchor='w')
+        tk.Label(header_frame, text="Books borrowed most in recent days", font=FONTS['small'], bg='white', fg=COLORS['secondary']).pack(anchor='w')
+        self.add_section_status(header_frame, 'trending')
+
+        table_frame = tk.Frame(container, bg='white')
+        table_frame.pack(fill='both', expand=True, padx=20, pady=(0, 15))
+
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical")
+        scrollbar.pack(side='right', fill='y')
+
+        columns = ('rank', 'book', 'times_borrowed')
+        tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=5, yscrollcommand=scrollbar.set)
+        scrollbar.config(command=tree.yview)
+
+        tree.heading('rank', text='Rank')
+        tree.heading('book', text='Book')
+        tree.heading('times_borrowed', text='Times Borrowed')
+
+        tree.column('rank', width=80)
+        tree.column('book', width=450)
+        tree.column('times_borrowed', width=150)
+
+        tree.pack(fill='both', expand=True)
+        self.trending_tree = tree
+
+    def load_trending(self):
+        # Top titles in the selected window, counts are estimates with their error bound.
+        # The counters are in memory (checkouts feed them, the maintenance worker reloads every desk's
+        # saved counts), only the titles are looked up in the background.
+        if not TRENDING_TITLES.loaded:
+            TRENDING_TITLES.load(self.db)
+        days = int(self.trending_window_var.get().split()[1])
+        trending = TRENDING_TITLES.top(days)
+
+        def compute(db):
+            if not trending:
+                return trending, {}
+            placeholders = ", ".join(["%s"] * len(trending))
+            books = db.fetch_all(
+                f"SELECT book_id, title, author FROM books WHERE book_id IN ({placeholders})",
+                tuple(book_id for book_id, _, _ in trending))
+            return trending, {book['book_id']: book for book in books}
+
+        self.submit('trending', compute, self.render_trending)
+
+    def render_trending(self, result):
+        trending, books = result
+        tree = self.trending_tree
+        for item in tree.get_children():
+            tree.delete(item)
+
+        for idx, (book_id, loans, error) in enumerate(trending, 1):
+            book = books.get(book_id)
+            label = f"{book['title']} – {book['author']}" if book else book_id
+            count = f"{loans}x" if not error else f"~{loans}x (±{error})"
+            tree.insert('', 'end', values=(f"#{idx}", label, count))
+
+    def create_trends_section(self, parent):
+        # Create borrowing trends section - date range, daily chart, monthly and category tables
+        container = tk.Frame(parent, bg='white', relief='solid', borderwidth=1)
+        container.pack(fill='both', expand=True, padx=10, pady=10)
+
+        header_frame = tk.Frame(container, bg='white')
+        header_frame.pack(fill='x', padx=20, pady=15)
+
+        tk.Label(header_frame, text="Borrowing Trends", font=FONTS['subheading'], bg='white', fg=COLORS['text']).pack(anchor='w')
+        tk.Label(header_frame, text="Daily loans with 7-day average, monthly change and category mix", font=FONTS['small'], bg='white', fg=COLORS['secondary']).pack(anchor='w')
+        self.add_section_status(header_frame, 'trends')
+
+        # Date range selector
+        range_frame = tk.Frame(container, bg='white')
+        range_frame.pack(fill='x', padx=20, pady=(0, 10))
+
+        tk.Label(range_frame, text="From (YYYY-MM-DD):", font=FONTS['small'], bg='white', fg=COLORS['text']).pack(side='left')
+        tk.Entry(range_frame, textvariable=self.trend_from_var, font=FONTS['small'], width=12).pack(side='left', padx=5)
+        tk.Label(range_frame, text="To:", font=FONTS['small'], bg='white', fg=COLORS['text']).pack(side='left', padx=(10, 0))
+        tk.Entry(range_frame, textvariable=self.trend_to_var, font=FONTS['small'], width=12).pack(side='left', padx=5)
+
+        tk.Button(
+            range_frame,
+            text="Apply",
+            font=FONTS['small'],
+            bg=COLORS['primary'],
+            fg='white',
+            relief='flat',
+            cursor='hand2',
+            command=self.load_trends).pack(side='left', padx=10)
+
+        self.trend_summary = tk.Label(range_frame, text="", font=FONTS['small'], bg='white', fg=COLORS['secondary'])
+        self.trend_summary.pack(side='right')
+
+        # Daily chart
+        self.trend_canvas = tk.Canvas(container, height=220, bg='white', highlightthickness=0)
+        self.trend_canvas.pack(fill='x', padx=20, pady=(0, 10))
+
+        tables = tk.Frame(container, bg='white')
+        tables.pack(fill='both', expand=True, padx=20, pady=(0, 15))
+
+        # Monthly counts with year-over-year change
+        columns = ('month', 'loans', 'last_year', 'change')
+        tree = ttk.Treeview(tables, columns=columns, show='headings', height=6)
+        tree.heading('month', text='Month')
+        tree.heading('loans', text='Loans')
+        tree.heading('last_year', text='Year Before')
+        tree.heading('change', text='Change')
+        for column in columns:
+            tree.column(column, width=110)
+        tree.pack(side='left', fill='both', expand=True, padx=(0, 10))
+        self.monthly_tree = tree
+
+        # Category mix
+        columns = ('category', 'loans', 'share')
+        tree = ttk.Treeview(tables, columns=columns, show='headings', height=6)
+        tree.heading('category', text='Category')
+        tree.heading('loans', text='Loans')
+        tree.heading('share', text='Share')
+        tree.column('category', width=180)
+        tree.column('loans', width=90)
+        tree.column('share', width=90)
+        tree.pack(side='left', fill='both', expand=True)
+        self.category_tree = tree
+
+    def load_trends(self):
+        # Compute the trends for the selected date range from the daily rollups
+        try:
+            start_date = datetime.strptime(self.trend_from_var.get().strip(), '%Y-%m-%d').date()
+            end_date = datetime.strptime(self.trend_to_var.get().strip(), '%Y-%m-%d').date()
+        except ValueError:
+            messagebox.showerror("Error", "Please enter dates as YYYY-MM-DD")
+            return
+        if start_date > end_date:
+            messagebox.showerror("Error", "The start date must be on or before the end date")
+            return
+
+        def compute(db):
+            trends = BorrowingTrends.load(db, start_date, end_date)
+            _, weekly = trends.weekly()
+            days, counts = trends.daily()
+            return {
+                'total': trends.total(),
+                'weekly_average': weekly.mean() if len(weekly) else 0,
+                'days': days,
+                'counts': counts,
+                'average': trends.moving_average(7),
+                'year_over_year': trends.year_over_year(),
+                'category_mix': trends.category_mix()}
+
+        self.submit('trends', compute, self.render_trends)
+
+    def render_trends(self, trends):
+        self.trend_summary.config(text=f"{trends['total']} loans | {trends['weekly_average']:.1f} per week")
+        self.draw_trend_chart(trends['days'], trends['counts'], trends['average'])
+
+        tree = self.monthly_tree
+        for item in tree.get_children():
+            tree.delete(item)
+        for month, loans, last_year, delta in trends['year_over_year']:
+            change = "—" if delta is None else f"{delta:+.0%}"
+            tree.insert('', 'end', values=(month, loans, last_year, change))
+
+        tree = self.category_tree
+        for item in tree.get_children():
+            tree.delete(item)
+        for category, loans, share in trends['category_mix']:
+            tree.insert('', 'end', values=(category, loans, f"{share:.0%}"))
+
+    def draw_trend_chart(self, days, counts, average):
+        # Line chart of daily loans (taupe) with the moving average (olive)
+        canvas = self.trend_canvas
+        canvas.delete('all')
+        canvas.update_idletasks()
+        width = max(canvas.winfo_width(), 600)
+        height = int(canvas.cget('height'))
+        left, right, top, bottom = 40, 10, 10, 25
+
+        if not len(counts) or not counts.max():
+            canvas.create_text(width // 2, height // 2, text="No loans in this range", font=FONTS['small'], fill=COLORS['secondary'])
+            return
+
+        peak = float(counts.max())
+        step = (width - left - right) / max(len(counts) - 1, 1)
+        scale = (height - top - bottom) / peak
+
+        def points(series):
+            return [value
+                    for i, count in enumerate(series)
+                    for value in (left + i * step, height - bottom - count * scale)]
+
+        canvas.create_line(left, height - bottom, width - right, height - bottom, fill=COLORS['secondary'])
+        canvas.create_text(left - 5, top, text=str(int(peak)), anchor='e', font=FONTS['small'], fill=COLORS['secondary'])
+        canvas.create_text(left, height - 5, text=str(days[0]), anchor='sw', font=FONTS['small'], fill=COLORS['secondary'])
+        canvas.create_text(width - right, height - 5, text=str(days[-1]), anchor='se', font=FONTS['small'], fill=COLORS['secondary'])
+
+        if len(counts) > 1:
+            canvas.create_line(*points(counts), fill=COLORS['secondary'])
+            canvas.create_line(*points(average), fill=COLORS['primary'], width=2)
+        else:
+            x, y = points(counts)
+            canvas.create_oval(x - 3, y - 3, x + 3, y + 3, fill=COLORS['primary'], outline='')
+
+    def create_analysis_section(self, parent):
+        # Create loan analysis section - group by, measure and category filter over the loan cube
+        container = tk.Frame(parent, bg='white', relief='solid', borderwidth=1)
+        container.pack(fill='both', expand=True, padx=10, pady=10)
+
+        header_frame = tk.Frame(container, bg='white')
+        header_frame.pack(fill='x', padx=20, pady=15)
+
+        tk.Label(header_frame, text="Loan Analysis", font=FONTS['subheading'], bg='white', fg=COLORS['text']).pack(anchor='w')
+        tk.Label(header_frame, text="Loans, fines and overdue or lost rates by category, month and status", font=FONTS['small'], bg='white', fg=COLORS['secondary']).pack(anchor='w')
+        self.add_section_status(header_frame, 'analysis')
+
+        controls = tk.Frame(container, bg='white')
+        controls.pack(fill='x', padx=20, pady=(0, 10))
+
+        for label, variable, values, width in (
+                ("Group by:", self.analysis_group_var, list(ANALYSIS_GROUPS), 18),
+                ("Measure:", self.analysis_measure_var, ANALYSIS_MEASURES, 14),
+                ("Category:", self.analysis_category_var, ["All"], 16)):
+            tk.Label(controls, text=label, font=FONTS['small'], bg='white', fg=COLORS['text']).pack(side='left', padx=(0, 5))
+            combo = ttk.Combobox(controls, textvariable=variable, values=values, state='readonly', width=width)
+            combo.pack(side='left', padx=(0, 15))
+            combo.bind('<<ComboboxSelected>>', lambda e: self.load_analysis())
+        self.analysis_category_combo = combo
+
+        table_frame = tk.Frame(container, bg='white')
+        table_frame.pack(fill='both', expand=True, padx=20, pady=(0, 15))
+
+        scrollbar = ttk.Scrollbar(table_frame, orient="vertical")
+        scrollbar.pack(side='right', fill='y')
+
+        columns = ('group', 'value')
+        tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=8, yscrollcommand=scrollbar.set)
+        scrollbar.config(command=tree.yview)
+
+        tree.heading('group', text='Group')
+        tree.heading('value', text='Value')
+        tree.column('group', width=400)
+        tree.column('value', width=150)
+
+        tree.pack(fill='both', expand=True)
+        self.analysis_tree = tree
+
+    def load_analysis(self, refresh=False):
+        # Answer the selected roll-up from the loan cube's arrays
+        by = ANALYSIS_GROUPS[self.analysis_group_var.get()]
+        measure = self.analysis_measure_var.get()
+        category = None if self.analysis_category_var.get() == "All" else self.analysis_category_var.get()
+
+        def compute(db):
+            with LOAN_CUBE.lock:
+                if refresh:
+                    LOAN_CUBE.refresh(db)
+                if measure.endswith("Rate"):
+                    labels, values = LOAN_CUBE.rate(measure.split()[0], by, category=category)
+                else:
+                    labels, values = LOAN_CUBE.aggregate(by, measure.lower(), category=category)
+                return LOAN_CUBE.labels('category'), measure, labels, values
+
+        self.submit('analysis', compute, self.render_analysis)
+
+    def render_analysis(self, result):
+        categories, measure, labels, values = result
+        self.analysis_category_combo['values'] = ["All"] + categories
+
+        tree = self.analysis_tree
+        for item in tree.get_children():
+            tree.delete(item)
+
+        for index in np.ndindex(values.shape):
+            value = values[index]
+            if measure.endswith("Rate"):
+                if np.isnan(value):
+                    continue
+                text = f"{value:.1%}"
+            elif not value:
+                continue
+            elif measure == "Fines":
+                text = format_currency(value)
+            else:
+                text = f"{int(value)} loans"
+            group = " / ".join(str(labels[axis][position]) for axis, position in enumerate(index))
+            tree.insert('', 'end', values=(group, text))
+
+    def export_dialog(self):
+        # Export a report section for the selected period to CSV or PDF in the background
+        if not require('export_reports'):
+            return
+        from report_export import EXPORT_SECTIONS, EXPORT_FORMATS, ReportExport
+
+        dialog = tk.Toplevel(self.parent)
+        dialog.title("Export Report")
+        dialog.geometry("420x300")
+        dialog.configure(bg='white')
+        dialog.resizable(False, False)
+
+        dialog.update_idletasks()
+        x = (dialog.winfo_screenwidth() // 2) - (420 // 2)
+        y = (dialog.winfo_screenheight() // 2) - (300 // 2)
+        dialog.geometry(f'420x300+{x}+{y}')
+
+        tk.Label(dialog, text="Export Report", font=FONTS['heading'], bg='white', fg=COLORS['text']).pack(pady=15)
+
+        form_frame = tk.Frame(dialog, bg='white')
+        form_frame.pack(padx=30, fill='x')
+
+        tk.Label(form_frame, text="Section", font=FONTS['small'], bg='white').pack(anchor='w')
+        section_combo = ttk.Combobox(form_frame, values=list(EXPORT_SECTIONS), state='readonly', width=37)
+        section_combo.pack(anchor='w', pady=(0, 10))
+        section_combo.set(list(EXPORT_SECTIONS)[0])
+
+        format_var = tk.StringVar(value=EXPORT_FORMATS[0])
+        format_frame = tk.Frame(form_frame, bg='white')
+        format_frame.pack(anchor='w')
+        for export_format in EXPORT_FORMATS:
+            tk.Radiobutton(format_frame, text=export_format, variable=format_var, value=export_format,
+                           font=FONTS['small'], bg='white').pack(side='left', padx=(0, 15))
+
+        tk.Label(form_frame, text=f"Period: {self.period_var.get()}", font=FONTS['subtext'], bg='white',
+                 fg=COLORS['secondary']).pack(anchor='w', pady=(5, 0))
+
+        progress = ttk.Progressbar(form_frame, length=360, mode='determinate')
+        progress.pack(pady=(10, 0))
+        status_label = tk.Label(form_frame, text="", font=FONTS['small'], bg='white', fg=COLORS['secondary'])
+        status_label.pack(anchor='w')
+
+        btn_frame = tk.Frame(dialog, bg='white')
+        btn_frame.pack(pady=10)
+        job = None
+
+        def watch():
+            # Poll the export thread for progress until it finishes
+            if not dialog.winfo_exists():
+                return
+            if not job.finished:
+                if job.total_rows:
+                    progress['value'] = min(job.rows_written / job.total_rows * 100, 100)
+                    status_label.config(text=f"{job.rows_written:,} of {job.total_rows:,} rows")
+                else:
+                    status_label.config(text=f"{job.rows_written:,} rows")
+                dialog.after(200, watch)
+                return
+
+            if job.error:
+                messagebox.showerror("Error", f"Export failed: {job.error}", parent=dialog)
+            elif job.cancelled:
+                status_label.config(text="Export cancelled")
+                return
+            else:
+                messagebox.showinfo("Export Finished", f"{job.rows_written:,} rows exported to:\n{job.path}", parent=dialog)
+            dialog.destroy()
+
+        def start_export():
+            nonlocal job
+            export_format = format_var.get()
+            extension = export_format.lower()
+            path = filedialog.asksaveasfilename(
+                parent=dialog,
+                title="Export Report",
+                defaultextension=f".{extension}",
+                initialfile=f"{section_combo.get().lower().replace(' ', '_')}.{extension}",
+                filetypes=[(f"{export_format} files", f"*.{extension}")])
+            if not path:
+                return
+
+            start_date, end_date = period_range(self.period_var.get())
+            job = ReportExport(section_combo.get(), export_format, path, start_date, end_date)
+            job.start()
+            export_btn.config(state='disabled')
+            status_label.config(text="Starting export…")
+            watch()
+
+        def cancel():
+            if job and not job.finished:
+                job.cancel()
+            else:
+                dialog.destroy()
+
+        export_btn = tk.Button(btn_frame, text="Export", font=FONTS['small'], bg=COLORS['primary'], fg='white',
+                               width=12, cursor='hand2', command=start_export)
+        export_btn.pack(side='left', padx=5)
+        tk.Button(btn_frame, text="Cancel", font=FONTS['small'], bg=COLORS['secondary'], fg='white',
+                  width=12, cursor='hand2', command=cancel).pack(side='left', padx=5)
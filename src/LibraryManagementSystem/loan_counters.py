@@ -0,0 +1,85 @@
+# loan_counters.py
+
+from decimal import Decimal
+
+# Loan statuses that count towards members.active_loans
+ACTIVE_LOAN_STATUSES = ('Borrowed', 'Overdue')
+
+# Maintained per-member summary: active_loans, total_loans (lifetime) and total_fines (lifetime)
+ADJUST_MEMBER_TOTALS = """
+UPDATE members
+SET active_loans = GREATEST(active_loans + %s, 0),
+    total_loans = GREATEST(total_loans + %s, 0),
+    total_fines = total_fines + %s
+WHERE member_id = %s
+"""
+
+def is_active_loan(status):
+    """Check whether a loan status counts as an active loan"""
+    return status in ACTIVE_LOAN_STATUSES
+
+def _contribution(loan):
+    # (active, total, fines) a loan adds to its member's summary
+    if not loan:
+        return 0, 0, Decimal('0')
+    _, status, fine = loan
+    return (1 if is_active_loan(status) else 0), 1, Decimal(str(fine or 0))
+
+def counter_adjustments(old_loan, new_loan):
+    """Build the (query, params) statements that move a loan's contribution to the member totals.
+
+    old_loan and new_loan are (member_id, status, fine_amount) tuples, or None for a loan
+    being created or deleted. Returns an empty list when nothing changes, so callers can
+    append the result to the transaction that changes the loan itself.
+    """
+    old_member = old_loan[0] if old_loan else None
+    new_member = new_loan[0] if new_loan else None
+    old_active, old_total, old_fine = _contribution(old_loan)
+    new_active, new_total, new_fine = _contribution(new_loan)
+
+    if old_member == new_member:
+        deltas = {old_member: (new_active - old_active, new_total - old_total, new_fine - old_fine)}
+    else:
+        deltas = {old_member: (-old_active, -old_total, -old_fine),
+                  new_member: (new_active, new_total, new_fine)}
+
+    return [(ADJUST_MEMBER_TOTALS, (active, total, fine, member_id))
+            for member_id, (active, total, fine) in deltas.items()
+            if member_id and (active or total or fine)]
+
+def find_counter_drift(db):
+    """Return members whose maintained totals differ from their loans in borrowed_books"""
+    query = """
+    SELECT m.member_id, m.active_loans, m.total_loans, m.total_fines,
+           COALESCE(actual.active_loans, 0) AS actual_active,
+           COALESCE(actual.total_loans, 0) AS actual_total,
+           COALESCE(actual.total_fines, 0) AS actual_fines
+    FROM members m
+    LEFT JOIN (
+        SELECT member_id,
+               SUM(status IN ('Borrowed', 'Overdue')) AS active_loans,
+               COUNT(*) AS total_loans,
+               SUM(COALESCE(fine_amount, 0)) AS total_fines
+        FROM borrowed_books
+        GROUP BY member_id
+    ) actual ON actual.member_id = m.member_id
+    WHERE m.active_loans <> COALESCE(actual.active_loans, 0)
+       OR m.total_loans <> COALESCE(actual.total_loans, 0)
+       OR m.total_fines <> COALESCE(actual.total_fines, 0)
+    """
+    return db.fetch_all(query)
+
+def verify_member_totals(db, repair=True):
+    """Detect drift in the maintained member totals and optionally repair it.
+
+    Returns the list of drifted rows as found before the repair.
+    """
+    drift = find_counter_drift(db)
+    if drift and repair:
+        statements = [
+            ("UPDATE members SET active_loans = %s, total_loans = %s, total_fines = %s WHERE member_id = %s",
+             (row['actual_active'], row['actual_total'], row['actual_fines'], row['member_id']))
+            for row in drift]
+        if db.execute_transaction(statements):
+            print(f"Repaired loan totals for {len(drift)} members")
+    return drift
@@ -0,0 +1,198 @@
+# loan_cube.py
+
+import threading
+from datetime import timedelta
+import numpy as np
+from configuration import ROLLUP_OVERLAP_SECONDS, CUBE_CHANGE_RETENTION_HOURS
+
+DIMENSIONS = ('category', 'month', 'status')
+LOAN_STATUSES = ('Borrowed', 'Returned', 'Overdue', 'Lost')
+
+# Loans and fines per (category, month, status) cell; month is YYYYMM
+CUBE_QUERY = """
+SELECT b.category, EXTRACT(YEAR_MONTH FROM bb.borrow_date) AS month, bb.status,
+       COUNT(*) AS loans, COALESCE(SUM(bb.fine_amount), 0) AS fines
+FROM borrowed_books bb
+JOIN books b ON b.book_id = bb.book_id
+"""
+CUBE_GROUP_BY = " GROUP BY b.category, month, bb.status"
+
+# Records the month of a loan that was deleted or moved to another month, book or status
+MARK_MONTH = """
+INSERT INTO loan_cube_changes (loan_month) VALUES (EXTRACT(YEAR_MONTH FROM %s))
+"""
+
+def changed_month_statement(borrow_date):
+    """Statement for the loan-changing transaction that has every loan cube re-read the loan's old month"""
+    return MARK_MONTH, (borrow_date,)
+
+def month_label(month):
+    # 202604 -> '2026-04'
+    return f"{int(month) // 100}-{int(month) % 100:02d}"
+
+def _month_bounds(month):
+    # First day of the month and of the next month, as 'YYYY-MM-DD'
+    year, number = divmod(int(month), 100)
+    following = (year + 1, 1) if number == 12 else (year, number + 1)
+    return f"{year}-{number:02d}-01", f"{following[0]}-{following[1]:02d}-01"
+
+class LoanCube:
+    # In-process aggregate cube over category x month x loan status with loan counts
+    # and fine totals held in two dense NumPy arrays. Slice/dice/roll-up queries index
+    # and sum the arrays without touching the database. refresh() re-aggregates only
+    # the months holding new, updated or deleted loans, one borrow_date range read each.
+    # Deleted and moved loans are found through loan_cube_changes, which is shared by the
+    # cubes of every desk: rows are read by time (with the rollups' overlap window) and
+    # never consumed, and pruned after CUBE_CHANGE_RETENTION_HOURS. A cube older than that
+    # is rebuilt instead.
+
+    def __init__(self):
+        # Held while the cube is rebuilt or refreshed; the reports worker and the scheduled refresh share it
+        self.lock = threading.RLock()
+        self.reset()
+
+    def reset(self):
+        self.categories = []
+        self.months = []
+        self.statuses = list(LOAN_STATUSES)
+        self.loans = np.zeros((0, 0, len(LOAN_STATUSES)), dtype=np.int64)
+        self.fines = np.zeros((0, 0, len(LOAN_STATUSES)), dtype=np.float64)
+        self.last_borrow_id = None
+        self.refreshed_at = None
+
+    def labels(self, dimension):
+        return {'category': self.categories, 'month': [month_label(m) for m in self.months],
+                'status': self.statuses}[dimension]
+
+    def _position(self, dimension, value):
+        # Index of a label on its axis, inserting a zero slice (in sorted order) if it is new
+        axis = DIMENSIONS.index(dimension)
+        values = {'category': self.categories, 'month': self.months, 'status': self.statuses}[dimension]
+        if value in values:
+            return values.index(value)
+
+        position = int(np.searchsorted(np.array(values, dtype=object), value)) if values else 0
+        values.insert(position, value)
+        self.loans = np.insert(self.loans, position, 0, axis=axis)
+        self.fines = np.insert(self.fines, position, 0, axis=axis)
+        return position
+
+    def _fill(self, columns):
+        # Write fetched (category, month, status, loans, fines) columns into their cells
+        for category, month, status, loans, fines in zip(*columns):
+            cell = (self._position('category', category), self._position('month', int(month)),
+                    self._position('status', status))
+            self.loans[cell] = int(loans)
+            self.fines[cell] = float(fines)
+
+    def _marker(self, db):
+        return db.fetch_one("SELECT COALESCE(MAX(borrow_id), 0) AS last_id, NOW() AS now FROM borrowed_books")
+
+    def build(self, db):
+        # Aggregate every loan into a fresh cube
+        with self.lock:
+            return self._build(db)
+
+    def _build(self, db):
+        marker = self._marker(db)
+        if not marker:
+            return False
+        columns = db.fetch_columns(CUBE_QUERY + " WHERE bb.borrow_id <= %s" + CUBE_GROUP_BY, (marker['last_id'],))
+
+        self.reset()
+        if columns:
+            self._fill(columns)
+        self.last_borrow_id, self.refreshed_at = marker['last_id'], marker['now']
+        return True
+
+    def refresh(self, db):
+        # Re-aggregate the months touched since the last build or refresh, returns their number
+        with self.lock:
+            return self._refresh(db)
+
+    def _refresh(self, db):
+        if db.offline:
+            return 0
+        if self.last_borrow_id is None:
+            self._build(db)
+            return -1
+
+        marker = self._marker(db)
+        if not marker:
+            return 0
+
+        # Changes older than the retained log may have been pruned unseen
+        if marker['now'] - self.refreshed_at > timedelta(hours=CUBE_CHANGE_RETENTION_HOURS):
+            self._build(db)
+            return -1
+
+        since = (self.refreshed_at, ROLLUP_OVERLAP_SECONDS)
+        touched = db.fetch_columns("""
+            SELECT EXTRACT(YEAR_MONTH FROM borrow_date) FROM borrowed_books WHERE borrow_id > %s AND borrow_id <= %s
+            UNION
+            SELECT EXTRACT(YEAR_MONTH FROM borrow_date) FROM borrowed_books WHERE updated_at >= %s - INTERVAL %s SECOND
+            UNION
+            SELECT loan_month FROM loan_cube_changes WHERE changed_at >= %s - INTERVAL %s SECOND
+        """, (self.last_borrow_id, marker['last_id']) + since + since)
+        months = sorted(int(month) for month in touched[0]) if touched else []
+
+        for month in months:
+            first_day, next_month = _month_bounds(month)
+            columns = db.fetch_columns(
+                CUBE_QUERY + " WHERE bb.borrow_date >= %s AND bb.borrow_date < %s" + CUBE_GROUP_BY,
+                (first_day, next_month))
+            if month in self.months:
+                position = self.months.index(month)
+                self.loans[:, position, :] = 0
+                self.fines[:, position, :] = 0
+            if columns:
+                self._fill(columns)
+
+        self.last_borrow_id, self.refreshed_at = marker['last_id'], marker['now']
+        db.execute_query("DELETE FROM loan_cube_changes WHERE changed_at < NOW() - INTERVAL %s HOUR",
+                         (CUBE_CHANGE_RETENTION_HOURS,))
+        return len(months)
+
+    def _select(self, array, category=None, month=None, status=None):
+        # Slice (one label) or dice (a list of labels) the array; None keeps the whole axis
+        for axis, (dimension, selected) in enumerate(zip(DIMENSIONS, (category, month, status))):
+            if selected is None:
+                continue
+            wanted = selected if isinstance(selected, (list, tuple, set)) else [selected]
+            labels = self.labels(dimension)
+            indexes = [labels.index(value) for value in wanted if value in labels]
+            array = np.take(array, indexes, axis=axis)
+        return array
+
+    def aggregate(self, by=('category', 'month'), measure='loans', category=None, month=None, status=None):
+        """Roll the cube up onto the `by` dimensions.
+
+        measure is 'loans' or 'fines'; category, month and status filter the cube first
+        (a single label slices, a list of labels dices; month labels are 'YYYY-MM').
+        Returns (labels per `by` dimension, array shaped like `by`).
+        """
+        array = self._select(self.loans if measure == 'loans' else self.fines, category, month, status)
+        kept = [DIMENSIONS.index(dimension) for dimension in by]
+        array = array.sum(axis=tuple(axis for axis in range(len(DIMENSIONS)) if axis not in kept))
+        # Summing keeps the remaining axes in cube order, move them into `by` order
+        array = np.transpose(array, np.argsort(np.argsort(kept)))
+
+        labels = []
+        for dimension in by:
+            selected = {'category': category, 'month': month, 'status': status}[dimension]
+            axis_labels = self.labels(dimension)
+            if selected is not None:
+                wanted = selected if isinstance(selected, (list, tuple, set)) else [selected]
+                axis_labels = [value for value in wanted if value in axis_labels]
+            labels.append(axis_labels)
+        return labels, array
+
+    def rate(self, status='Overdue', by=('category', 'month'), category=None, month=None):
+        # Share of loans in `status` per `by` cell, NaN where there were no loans
+        labels, matching = self.aggregate(by, 'loans', category, month, status)
+        _, total = self.aggregate(by, 'loans', category, month)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return labels, np.where(total > 0, matching / total, np.nan)
+
+# Shared by the reports page and the scheduled rollup refresh
+LOAN_CUBE = LoanCube()
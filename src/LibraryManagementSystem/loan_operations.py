@@ -0,0 +1,207 @@
+# loan_operations.py
+
+from datetime import datetime
+from configuration import OVERDUE_FINE_PER_DAY, LOST_BOOK_FINE
+from database import StaleRowError
+from utilities import calculate_due_date
+from loan_counters import counter_adjustments, is_active_loan
+from report_rollups import dirty_cell_statement
+from loan_cube import changed_month_statement
+from trending_titles import TRENDING_TITLES
+
+# Circulation writes shared by the Circulation Desk dialogs and the desk simulator; callers
+# decide how to present the outcome.
+
+# Loans whose book id, member id or title contain a keyword (three %keyword% parameters)
+LOAN_SEARCH_QUERY = """
+SELECT bb.*, b.title as book_title
+FROM borrowed_books bb
+JOIN books b ON bb.book_id = b.book_id
+WHERE bb.book_id LIKE %s OR bb.member_id LIKE %s OR b.title LIKE %s
+ORDER BY bb.due_date ASC
+"""
+
+OVERDUE_TOTALS = f"""
+UPDATE members m
+JOIN (
+    SELECT member_id, SUM(DATEDIFF(CURDATE(), due_date) * {OVERDUE_FINE_PER_DAY} - COALESCE(fine_amount, 0)) AS delta
+    FROM borrowed_books
+    WHERE status = 'Borrowed' AND due_date < CURDATE()
+    GROUP BY member_id
+) d ON d.member_id = m.member_id
+SET m.total_fines = m.total_fines + d.delta
+"""
+
+OVERDUE_LOANS = f"""
+UPDATE borrowed_books
+SET status = 'Overdue',
+    fine_amount = DATEDIFF(CURDATE(), due_date) * {OVERDUE_FINE_PER_DAY},
+    updated_at = NOW()
+WHERE status = 'Borrowed' AND due_date < CURDATE()
+"""
+
+LOST_TOTALS = f"""
+UPDATE members m
+JOIN (
+    SELECT member_id, COUNT(*) * {LOST_BOOK_FINE} AS delta
+    FROM borrowed_books
+    WHERE status = 'Lost' AND (fine_amount IS NULL OR fine_amount = 0)
+    GROUP BY member_id
+) d ON d.member_id = m.member_id
+SET m.total_fines = m.total_fines + d.delta
+"""
+
+LOST_LOANS = f"""
+UPDATE borrowed_books
+SET fine_amount = {LOST_BOOK_FINE},
+    updated_at = NOW()
+WHERE status = 'Lost' AND (fine_amount IS NULL OR fine_amount = 0)
+"""
+
+# Takes the copy only if it is still Available, or On Hold with a Ready hold for this member;
+# another desk issuing the same copy in the meantime makes it change no row
+ISSUE_BOOK = """
+UPDATE books SET status = 'Borrowed', updated_at = %s
+WHERE book_id = %s
+  AND (status = 'Available'
+       OR (status = 'On Hold' AND EXISTS (
+           SELECT 1 FROM reservations r WHERE r.book_id = %s AND r.member_id = %s AND r.status = 'Ready')))
+"""
+
+def issue_loan(db, holds, book_id, member_id, period, now=None, trending=TRENDING_TITLES):
+    """Lend a book to a member for `period` days, activating an inactive member first.
+
+    Returns (outcome, detail): ('issued', (due_date, member_activated)), ('book_not_found', None),
+    ('member_not_found', None), ('unavailable', hold the copy is set aside for, or None; None too
+    when another desk took the copy first) or ('failed', None).
+    """
+    book = db.fetch_one("SELECT * FROM books WHERE book_id = %s", (book_id,))
+    if not book:
+        return 'book_not_found', None
+
+    member = db.fetch_one("SELECT * FROM members WHERE member_id = %s", (member_id,))
+    if not member:
+        return 'member_not_found', None
+
+    # Available copies go to anyone, copies On Hold only to the patron the hold is ready for
+    allowed, hold = holds.can_issue(book, member_id)
+    if not allowed:
+        return 'unavailable', hold
+
+    now = now or datetime.now()
+    activated = member['status'] == 'Inactive'
+    if activated:
+        db.execute_query("UPDATE members SET status = 'Active', updated_at = %s WHERE member_id = %s",
+                         (now, member_id))
+
+    borrow_date = now.date()
+    due_date = calculate_due_date(borrow_date, int(period))
+    query = """
+    INSERT INTO borrowed_books (book_id, member_id, borrow_date, due_date, status)
+    VALUES (%s, %s, %s, %s, 'Borrowed')
+    """
+
+    # Loan, book status and the member's loan totals change together; the checks above were made on
+    # rows read earlier, so the book update re-checks them and rolls everything back if it lost the race
+    statements = [
+        (query, (book_id, member_id, borrow_date, due_date)),
+        (ISSUE_BOOK, (now, book_id, book_id, member_id))]
+    statements += counter_adjustments(None, (member_id, 'Borrowed', 0))
+
+    if not db.execute_transaction(statements, guarded={1}):
+        if isinstance(db.last_error, StaleRowError):
+            return 'unavailable', None
+        return 'failed', None
+
+    trending.record(book_id, borrow_date)
+    if hold:
+        holds.fulfil(hold['reservation_id'])
+    return 'issued', (due_date, activated)
+
+def update_loan(db, holds, borrowed, book_id, member_id, borrow_date, due_date, status, fine, now=None):
+    """Save an edited loan; setting the status to Returned checks the book back in.
+
+    borrowed is the loan row as it was read before the edit. The save only applies while the
+    loan still has that status and fine, so two desks closing the same loan cannot both adjust
+    the member totals. Returns (saved, hold the returned copy was set aside for, or None).
+    """
+    # Lost books carry the replacement fine unless one was entered
+    if status == "Lost" and not fine:
+        fine = float(LOST_BOOK_FINE)
+
+    now = now or datetime.now()
+    if status == "Returned":
+        update_query = """
+        UPDATE borrowed_books
+        SET book_id = %s, member_id = %s, borrow_date = %s, due_date = %s,
+            status = %s, fine_amount = %s, return_date = %s, updated_at = CURRENT_TIMESTAMP
+        WHERE borrow_id = %s AND status = %s AND fine_amount <=> %s
+        """
+        params = (book_id, member_id, borrow_date, due_date, status, fine, now.date(),
+                  borrowed['borrow_id'], borrowed['status'], borrowed['fine_amount'])
+    else:
+        update_query = """
+        UPDATE borrowed_books
+        SET book_id = %s, member_id = %s, borrow_date = %s, due_date = %s,
+            status = %s, fine_amount = %s, updated_at = CURRENT_TIMESTAMP
+        WHERE borrow_id = %s AND status = %s AND fine_amount <=> %s
+        """
+        params = (book_id, member_id, borrow_date, due_date, status, fine,
+                  borrowed['borrow_id'], borrowed['status'], borrowed['fine_amount'])
+
+    # Loan update and member loan totals change together
+    statements = [(update_query, params)]
+    statements += counter_adjustments((borrowed['member_id'], borrowed['status'], borrowed['fine_amount']),
+                                      (member_id, status, fine))
+    # The loan may move to another rollup cell, so its old cell is recomputed on the next refresh
+    statements.append(dirty_cell_statement(borrowed['book_id'], borrowed['member_id'], borrowed['borrow_date']))
+    statements.append(changed_month_statement(borrowed['borrow_date']))
+
+    if not db.execute_transaction(statements, guarded={0}):
+        return False, None
+
+    # A loan moved to another copy no longer holds the copy it was on
+    if book_id != borrowed['book_id'] and is_active_loan(borrowed['status']):
+        holds.release_book(borrowed['book_id'], now)
+
+    next_hold = None
+    if status == "Returned":
+        # Hand the copy to the next patron in the hold queue, or shelve it; re-saving a loan
+        # that was already returned must not touch a copy that may be lent out again
+        if borrowed['status'] != "Returned":
+            next_hold = holds.release_book(book_id, now)
+    elif status in ["Borrowed", "Overdue"]:
+        db.execute_query("UPDATE books SET status = 'Borrowed', updated_at = %s WHERE book_id = %s", (now, book_id))
+    elif status == "Lost":
+        db.execute_query("UPDATE books SET status = 'Lost', updated_at = %s WHERE book_id = %s", (now, book_id))
+    return True, next_hold
+
+def delete_loan(db, holds, loan, now=None):
+    """Delete a loan, taking it off the member totals and releasing its copy if it was still out.
+
+    loan is the row as read before the delete (borrow_id, book_id, member_id, borrow_date, status,
+    fine_amount); the delete only applies while the loan is unchanged. Returns True if deleted.
+    """
+    statements = [("DELETE FROM borrowed_books WHERE borrow_id = %s AND status = %s AND fine_amount <=> %s",
+                   (loan['borrow_id'], loan['status'], loan['fine_amount']))]
+    statements += counter_adjustments((loan['member_id'], loan['status'], loan['fine_amount']), None)
+    statements.append(dirty_cell_statement(loan['book_id'], loan['member_id'], loan['borrow_date']))
+    statements.append(changed_month_statement(loan['borrow_date']))
+    if not db.execute_transaction(statements, guarded={0}):
+        return False
+
+    # Release the book to the hold queue or back to available, unless this loan was already closed
+    if loan['status'] != 'Returned':
+        holds.release_book(loan['book_id'], now or datetime.now())
+    return True
+
+def refresh_overdue(db, holds):
+    """Mark loans past due as Overdue, charge fines on overdue and lost loans and expire holds.
+
+    Each fine change is added to the members' lifetime fine totals in the same transaction.
+    """
+    db.execute_transaction([(OVERDUE_TOTALS, None), (OVERDUE_LOANS, None)])
+    db.execute_transaction([(LOST_TOTALS, None), (LOST_LOANS, None)])
+
+    # Expire uncollected holds and pass each copy to the next patron in line
+    holds.expire_holds()
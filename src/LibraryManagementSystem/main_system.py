@@ -2,10 +2,23 @@
 
 import tkinter as tk
 from tkinter import messagebox
-from configuration import APP_TITLE, APP_GEOMETRY, COLORS
+from configuration import (APP_TITLE, APP_GEOMETRY, COLORS, OFFLINE_SYNC_INTERVAL_MS, LOAN_COUNTER_CHECK_INTERVAL_MS,
+                           ROLLUP_REFRESH_INTERVAL_MS, TRENDING_PERSIST_INTERVAL_MS,
+                           RECOMMENDATION_REFRESH_INTERVAL_MS, REPORT_POLL_INTERVAL_MS, PROFILE_HOTKEY,
+                           SESSION_CHECK_INTERVAL_MS, SESSION_IDLE_TIMEOUT_SECONDS)
 from database import Database
+from loan_counters import verify_member_totals
+from patron_search import backfill_search_keys
+from report_rollups import ReportRollups
+from trending_titles import TRENDING_TITLES
+from loan_cube import LOAN_CUBE
+from book_recommendations import BookRecommender
+from report_worker import MAINTENANCE_WORKER
 from authentication import AuthPage
 from dashboard import Dashboard
+from ui_profiler import UI_PROFILER, profiling_requested
+from action_profiler import ACTION_PROFILER
+from session_store import SESSIONS
 
 class LibraryManagementSystem:
     def __init__(self):
@@ -15,7 +28,14 @@ class LibraryManagementSystem:
         self.root.configure(bg=COLORS['background'])
         self.center_window()
         self.db = Database()
+        self.profiling_job = None
+        # One dashboard for the app's lifetime, it registers a write listener on self.db
+        self.dashboard = None
+        # Maintenance job -> (compute(db), interval in ms), run on the maintenance worker
+        self.maintenance_jobs = {}
         self.setup_database()
+        if profiling_requested():
+            UI_PROFILER.start(self.root, self.db)
         self.show_auth_page()
 
     def center_window(self):
@@ -40,12 +60,21 @@ class LibraryManagementSystem:
                 self.root.destroy()
                 return
 
-            # Create tables
+            # Create tables, adding columns and indexes missing from older databases
             self.db.create_tables()
 
             # Insert default librarian
             self.db.insert_default_librarian()
 
+            # Repair any drift in the maintained member loan totals
+            verify_member_totals(self.db)
+
+            # Create search keys for members added before they existed
+            backfill_search_keys(self.db)
+
+            # Restore the trending title counters
+            TRENDING_TITLES.load(self.db)
+
         except Exception as e:
             messagebox.showerror(
                 "Setup Error",
@@ -58,21 +87,126 @@ class LibraryManagementSystem:
         auth.show()
 
     def show_dashboard(self):
-        # Display main dashboard
-        dashboard = Dashboard(self.root, self.db)
-        dashboard.show()
+        # Display main dashboard, rebuilt for the signed-in librarian after a session lock
+        if self.dashboard is None:
+            self.dashboard = Dashboard(self.root, self.db)
+        self.dashboard.show()
 
     def run(self):
         # Start the application
         # Handle window close event
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
 
+        # Replay writes queued while the database was unreachable
+        self.root.after(OFFLINE_SYNC_INTERVAL_MS, self.sync_offline_writes)
+
+        # Periodically check the member loan totals against borrowed_books
+        self.schedule_maintenance('loan_counters', self.verify_loan_counters, LOAN_COUNTER_CHECK_INTERVAL_MS)
+
+        # Keep the daily report rollups up to date
+        self.schedule_maintenance('rollups', self.refresh_rollups, ROLLUP_REFRESH_INTERVAL_MS)
+
+        # Save new checkouts to the trending title counters and pick up the other desks'
+        self.schedule_maintenance('trending', self.sync_trending, TRENDING_PERSIST_INTERVAL_MS)
+
+        # Recompute the co-borrowing lists touched by new loans
+        self.schedule_maintenance('recommendations', self.refresh_recommendations, RECOMMENDATION_REFRESH_INTERVAL_MS)
+        self.root.after(REPORT_POLL_INTERVAL_MS, self.poll_maintenance)
+
+        # Keypresses and clicks keep the session alive; idle sessions lock the desk
+        self.root.bind_all('<Any-KeyPress>', lambda e: SESSIONS.touch(), add='+')
+        self.root.bind_all('<Any-ButtonPress>', lambda e: SESSIONS.touch(), add='+')
+        self.root.after(SESSION_CHECK_INTERVAL_MS, self.check_session)
+
+        # cProfile/tracemalloc capture of the next UI actions, from the environment or the hotkey
+        self.root.bind_all(PROFILE_HOTKEY, self.toggle_action_profiling)
+        ACTION_PROFILER.arm_from_environment()
+        self.show_profiling_state()
+
         # Start main loop
         self.root.mainloop()
 
+    def sync_offline_writes(self):
+        # Periodically replay the offline write queue and report conflicts
+        if self.db.offline or self.db.offline_queue.pending_count():
+            applied, conflicts = self.db.sync_offline_writes()
+            if conflicts:
+                details = "\n".join(f"- {table}: {reason}" for _, table, reason in conflicts[:10])
+                messagebox.showwarning(
+                    "Offline Sync",
+                    f"{applied} offline changes were saved, {len(conflicts)} could not be applied:\n\n{details}")
+        self.root.after(OFFLINE_SYNC_INTERVAL_MS, self.sync_offline_writes)
+
+    def schedule_maintenance(self, job, compute, interval):
+        # Run compute(db) on the maintenance worker every `interval` ms, counted from the end of the last run
+        self.maintenance_jobs[job] = (compute, interval)
+        self.root.after(interval, self.submit_maintenance, job)
+
+    def submit_maintenance(self, job):
+        MAINTENANCE_WORKER.submit(self, job, self.maintenance_jobs[job][0])
+
+    def poll_maintenance(self):
+        # Pick up finished maintenance jobs on the UI thread and schedule their next run
+        for _, job, _, error, _ in MAINTENANCE_WORKER.results():
+            if error is not None:
+                print(f"Maintenance job {job} failed: {error}")
+            self.root.after(self.maintenance_jobs[job][1], self.submit_maintenance, job)
+        self.root.after(REPORT_POLL_INTERVAL_MS, self.poll_maintenance)
+
+    @staticmethod
+    def verify_loan_counters(db):
+        # Detect and repair member loan total drift (maintenance job, gets the worker's connection)
+        if not db.offline:
+            verify_member_totals(db)
+
+    @staticmethod
+    def refresh_rollups(db):
+        # Scheduled incremental refresh of the loan cube and the report rollups
+        LOAN_CUBE.refresh(db)
+        ReportRollups(db).refresh()
+
+    @staticmethod
+    def refresh_recommendations(db):
+        # Scheduled incremental refresh of the book recommendations
+        BookRecommender(db).refresh()
+
+    @staticmethod
+    def sync_trending(db):
+        # Scheduled save and reload of the trending title counters
+        TRENDING_TITLES.sync(db)
+
+    def check_session(self):
+        # Lock back to the login page once the desk's session has been idle too long
+        current = SESSIONS.current
+        if current in SESSIONS.expire_idle():
+            self.show_auth_page()
+            messagebox.showinfo(
+                "Session Locked",
+                f"{current.username} was signed out after {SESSION_IDLE_TIMEOUT_SECONDS // 60} minutes of inactivity.")
+        self.root.after(SESSION_CHECK_INTERVAL_MS, self.check_session)
+
+    def toggle_action_profiling(self, event=None):
+        # Hotkey: capture the next actions, or stop a capture in progress
+        ACTION_PROFILER.toggle()
+        self.show_profiling_state()
+
+    def show_profiling_state(self):
+        # Title shows how many actions are still to be captured while armed
+        if self.profiling_job is not None:
+            self.root.after_cancel(self.profiling_job)
+            self.profiling_job = None
+        if ACTION_PROFILER.armed:
+            self.root.title(f"{APP_TITLE} - profiling next {ACTION_PROFILER.remaining} actions")
+            self.profiling_job = self.root.after(500, self.show_profiling_state)
+        else:
+            self.root.title(APP_TITLE)
+
     def on_closing(self):
         # Handle application closing
         if messagebox.askokcancel("Quit", "Do you want to quit?"):
+            TRENDING_TITLES.persist(self.db)
+            UI_PROFILER.stop()
+            ACTION_PROFILER.disarm()
             self.db.close()
             self.root.destroy()
 
@@ -0,0 +1,83 @@
+# member_history.py
+
+HISTORY_PAGE_SIZE = 20
+
+_HISTORY_COLUMNS = """
+SELECT bb.borrow_id, bb.book_id, b.title AS book_title, bb.borrow_date, bb.due_date,
+       bb.return_date, bb.status, bb.fine_amount
+FROM borrowed_books bb
+JOIN books b ON bb.book_id = b.book_id
+"""
+
+class MemberHistory:
+    # Keyset pagination over a member's loans, newest first.
+    # Pages are anchored on (borrow_date, borrow_id) of their first and last rows,
+    # so every page is one range read on idx_borrowed_member_history however
+    # many loans the member has; there is no OFFSET to skip over.
+
+    def __init__(self, db, member_id, page_size=HISTORY_PAGE_SIZE):
+        self.db = db
+        self.member_id = member_id
+        self.page_size = page_size
+        self.rows = []
+        self.has_older = False
+        self.has_newer = False
+
+    def first_page(self):
+        # Most recent loans
+        query = _HISTORY_COLUMNS + """
+        WHERE bb.member_id = %s
+        ORDER BY bb.borrow_date DESC, bb.borrow_id DESC
+        LIMIT %s
+        """
+        rows = self.db.fetch_all(query, (self.member_id, self.page_size + 1))
+        self.has_newer = False
+        self.has_older = len(rows) > self.page_size
+        self.rows = rows[:self.page_size]
+        return self.rows
+
+    def older_page(self):
+        # Loans before the last row of the current page
+        if not self.rows:
+            return self.first_page()
+
+        last = self.rows[-1]
+        query = _HISTORY_COLUMNS + """
+        WHERE bb.member_id = %s
+          AND (bb.borrow_date < %s OR (bb.borrow_date = %s AND bb.borrow_id < %s))
+        ORDER BY bb.borrow_date DESC, bb.borrow_id DESC
+        LIMIT %s
+        """
+        rows = self.db.fetch_all(query, (self.member_id, last['borrow_date'], last['borrow_date'],
+                                         last['borrow_id'], self.page_size + 1))
+        if rows:
+            self.has_newer = True
+            self.has_older = len(rows) > self.page_size
+            self.rows = rows[:self.page_size]
+        return self.rows
+
+    def newer_page(self):
+        # Loans after the first row of the current page
+        if not self.rows:
+            return self.first_page()
+
+        first = self.rows[0]
+        query = _HISTORY_COLUMNS + """
+        WHERE bb.member_id = %s
+          AND (bb.borrow_date > %s OR (bb.borrow_date = %s AND bb.borrow_id > %s))
+        ORDER BY bb.borrow_date ASC, bb.borrow_id ASC
+        LIMIT %s
+        """
+        rows = self.db.fetch_all(query, (self.member_id, first['borrow_date'], first['borrow_date'],
+                                         first['borrow_id'], self.page_size + 1))
+        if rows:
+            self.has_older = True
+            self.has_newer = len(rows) > self.page_size
+            self.rows = list(reversed(rows[:self.page_size]))
+        return self.rows
+
+    def totals(self):
+        # Lifetime totals from the maintained member summary, not from borrowed_books
+        return self.db.fetch_one(
+            "SELECT active_loans, total_loans, total_fines FROM members WHERE member_id = %s",
+            (self.member_id,))
@@ -0,0 +1,172 @@
+# offline_queue.py
+
+import json
+import re
+import sqlite3
+import uuid
+from collections import OrderedDict
+from datetime import datetime, date, timedelta
+from decimal import Decimal
+
+# Tables whose writes are captured while MySQL is unreachable (circulation and patron data)
+QUEUED_TABLES = {'borrowed_books', 'members', 'member_name_tokens', 'books', 'reservations', 'rollup_dirty',
+                 'loan_cube_changes'}
+
+_WRITE_PATTERN = re.compile(r'^\s*(?:INSERT\s+(?:IGNORE\s+)?INTO|UPDATE|DELETE\s+FROM)\s+`?(\w+)`?', re.IGNORECASE)
+
+def _encode(value):
+    # Tag non-JSON types so queued parameters round-trip exactly
+    if isinstance(value, datetime):
+        return {'__type__': 'datetime', 'value': value.isoformat()}
+    if isinstance(value, date):
+        return {'__type__': 'date', 'value': value.isoformat()}
+    if isinstance(value, Decimal):
+        return {'__type__': 'decimal', 'value': str(value)}
+    if isinstance(value, timedelta):
+        return {'__type__': 'timedelta', 'value': value.total_seconds()}
+    raise TypeError(f"Cannot queue parameter of type {type(value).__name__}")
+
+def _decode(obj):
+    kind = obj.get('__type__')
+    if kind == 'datetime':
+        return datetime.fromisoformat(obj['value'])
+    if kind == 'date':
+        return date.fromisoformat(obj['value'])
+    if kind == 'decimal':
+        return Decimal(obj['value'])
+    if kind == 'timedelta':
+        return timedelta(seconds=obj['value'])
+    return obj
+
+def written_table(query):
+    # Table an INSERT, UPDATE or DELETE writes to, or None for any other statement
+    match = _WRITE_PATTERN.match(query)
+    return match.group(1).lower() if match else None
+
+def queued_table(query):
+    # Table name if the query is a write that should be queued offline, else None
+    table = written_table(query)
+    return table if table in QUEUED_TABLES else None
+
+class OfflineQueue:
+    # Durable write-ahead queue in a local SQLite file.
+    # Writes are appended with a sequence number, an op_id and the group_id of the transaction
+    # they belong to; replay applies each group in sequence order as one MySQL transaction and
+    # records its op_ids in applied_offline_ops in that transaction, so a replay interrupted
+    # halfway is safe to rerun and a group is never half-applied.
+
+    def __init__(self, path, snapshot_size=256, snapshot_max_rows=200):
+        self.path = path
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS pending_writes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                op_id TEXT UNIQUE NOT NULL,
+                table_name TEXT NOT NULL,
+                query TEXT NOT NULL,
+                params TEXT,
+                queued_at TEXT NOT NULL,
+                group_id TEXT
+            )
+        """)
+        # Queues written before writes were grouped: each old write is its own group
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(pending_writes)")]
+        if 'group_id' not in columns:
+            self.conn.execute("ALTER TABLE pending_writes ADD COLUMN group_id TEXT")
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS conflicts (
+                seq INTEGER PRIMARY KEY,
+                op_id TEXT NOT NULL,
+                table_name TEXT NOT NULL,
+                query TEXT NOT NULL,
+                params TEXT,
+                reason TEXT NOT NULL,
+                reported_at TEXT NOT NULL
+            )
+        """)
+        self.conn.commit()
+
+        # Last known result of small reads (lookups the dialogs make), served if the server
+        # goes away during this session; whole-table results are not kept
+        self.snapshot = OrderedDict()
+        self.snapshot_size = snapshot_size
+        self.snapshot_max_rows = snapshot_max_rows
+
+    def enqueue(self, query, params=None):
+        # Append a single write to the queue, returns its op_id
+        return self.enqueue_group([(query, params)])[0]
+
+    def enqueue_group(self, statements):
+        # Append the (query, params) of one transaction as a group, returns their op_ids
+        group_id = uuid.uuid4().hex
+        op_ids = [uuid.uuid4().hex for _ in statements]
+        queued_at = datetime.now().isoformat()
+        self.conn.executemany(
+            "INSERT INTO pending_writes (op_id, table_name, query, params, queued_at, group_id) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            [(op_id, queued_table(query) or '', query, json.dumps(list(params) if params else None, default=_encode),
+              queued_at, group_id)
+             for op_id, (query, params) in zip(op_ids, statements)])
+        self.conn.commit()
+        return op_ids
+
+    def pending_count(self):
+        return self.conn.execute("SELECT COUNT(*) FROM pending_writes").fetchone()[0]
+
+    def pending(self):
+        # Queued transactions in the order they were captured, each a list of
+        # (seq, op_id, table_name, query, params)
+        rows = self.conn.execute(
+            "SELECT seq, op_id, table_name, query, params, COALESCE(group_id, op_id) "
+            "FROM pending_writes ORDER BY seq").fetchall()
+        group, group_id = [], None
+        for seq, op_id, table_name, query, params, row_group in rows:
+            if group and row_group != group_id:
+                yield group
+                group = []
+            group_id = row_group
+            decoded = json.loads(params, object_hook=_decode) if params else None
+            group.append((seq, op_id, table_name, query, tuple(decoded) if decoded else None))
+        if group:
+            yield group
+
+    def mark_done(self, seqs):
+        self.conn.executemany("DELETE FROM pending_writes WHERE seq = ?", [(seq,) for seq in seqs])
+        self.conn.commit()
+
+    def mark_conflict(self, seqs, reason):
+        # Move writes that could not be applied to the conflicts table
+        reported_at = datetime.now().isoformat()
+        for seq in seqs:
+            self.conn.execute("""
+                INSERT INTO conflicts (seq, op_id, table_name, query, params, reason, reported_at)
+                SELECT seq, op_id, table_name, query, params, ?, ? FROM pending_writes WHERE seq = ?
+            """, (reason, reported_at, seq))
+            self.conn.execute("DELETE FROM pending_writes WHERE seq = ?", (seq,))
+        self.conn.commit()
+
+    def conflicts(self):
+        return self.conn.execute(
+            "SELECT seq, table_name, query, reason, reported_at FROM conflicts ORDER BY seq").fetchall()
+
+    def clear_conflicts(self):
+        self.conn.execute("DELETE FROM conflicts")
+        self.conn.commit()
+
+    def remember(self, query, params, result, rows=1):
+        # Keep the latest result of a read for offline use, unless it has more than snapshot_max_rows rows
+        key = (query, tuple(params) if params else None)
+        if rows > self.snapshot_max_rows:
+            self.snapshot.pop(key, None)
+            return
+        self.snapshot[key] = result
+        self.snapshot.move_to_end(key)
+        while len(self.snapshot) > self.snapshot_size:
+            self.snapshot.popitem(last=False)
+
+    def recall(self, query, params):
+        # Last known result of a read, or None if it was never seen
+        return self.snapshot.get((query, tuple(params) if params else None))
+
+    def close(self):
+        self.conn.close()
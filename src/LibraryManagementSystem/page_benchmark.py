@@ -0,0 +1,201 @@
+# page_benchmark.py
+
+import argparse
+import json
+import os
+import statistics
+import time
+import tkinter as tk
+import tracemalloc
+from datetime import datetime
+from configuration import (APP_GEOMETRY, DB_CONFIG, BENCHMARK_SIZES, BENCHMARK_RUNS, BENCHMARK_BASELINE_PATH,
+                           BENCHMARK_TOLERANCE)
+from dashboard import Dashboard
+from dataset_generator import DatasetGenerator, load_mysql
+from library_reports import STATISTICS_SNAPSHOT, period_range
+from report_rollups import ReportRollups
+from report_worker import REPORT_WORKER
+from statistics_benchmark import connect_bench_db, percentile
+
+# Search keywords that hit a realistic share of the generated rows
+BOOK_KEYWORD = 'Garden'
+MEMBER_KEYWORD = 'santos'
+LOAN_KEYWORD = 'Kingdom'
+
+def search(var, keyword, method):
+    # Type a keyword into a page's search box and run its search
+    def run():
+        var.set(keyword)
+        method()
+    return run
+
+def statistics_card(page):
+    # get_statistics with the snapshot expired, so every run queries the server
+    def run():
+        STATISTICS_SNAPSHOT.invalidate()
+        page.get_statistics()
+    return run
+
+def ranking(page, table):
+    # One ranking table computed and rendered synchronously (the page runs it on the report worker)
+    rollups = ReportRollups(page.db)
+    compute = getattr(rollups, table)
+    render = getattr(page, f"render_{table}")
+    return lambda: render(compute(*period_range(page.period_var.get())))
+
+# (scenario, page name, Dashboard method that shows the page, page -> timed callable)
+SCENARIOS = [
+    ('load_books', 'catalog', 'show_book_management', lambda page: page.load_books),
+    ('search_books', 'catalog', 'show_book_management',
+     lambda page: search(page.search_var, BOOK_KEYWORD, page.search_books)),
+    ('load_members', 'patrons', 'show_membership_management', lambda page: page.load_members),
+    ('search_members', 'patrons', 'show_membership_management',
+     lambda page: search(page.search_var, MEMBER_KEYWORD, page.search_members)),
+    ('load_borrowed', 'circulation', 'show_borrowed_management', lambda page: page.load_borrowed),
+    ('search_borrowed', 'circulation', 'show_borrowed_management',
+     lambda page: search(page.search_var, LOAN_KEYWORD, page.search_borrowed)),
+    ('update_overdue_status', 'circulation', 'show_borrowed_management', lambda page: page.update_overdue_status),
+    ('get_statistics', 'reports', 'show_reports_analytics', statistics_card),
+    ('top_borrowers', 'reports', 'show_reports_analytics', lambda page: ranking(page, 'top_borrowers')),
+    ('popular_books', 'reports', 'show_reports_analytics', lambda page: ranking(page, 'popular_books'))]
+
+def prepare_dataset(size):
+    # Benchmark schema for a size, generated on first use and reused afterwards
+    books, members, loans = BENCHMARK_SIZES[size]
+    db = connect_bench_db(f"{DB_CONFIG['database']}_bench_{size}")
+    existing = db.fetch_one("SELECT COUNT(*) AS count FROM books")
+    if existing and existing['count']:
+        print(f"{size}: reusing the existing benchmark data ({existing['count']} books)")
+    else:
+        print(f"{size}: generating {books} books, {members} members and {loans} loans...")
+        load_mysql(DatasetGenerator(books, members, loans), db)
+    return db
+
+def settle(root, page):
+    # Let the page finish: every queued Treeview chunk inserted and report sections rendered
+    while True:
+        root.update()
+        loader = getattr(page, 'tree_loader', None)
+        if not (loader is not None and loader.loading) and not getattr(page, 'pending_sections', 0):
+            return
+        time.sleep(0.001)
+
+def measure(root, page, run):
+    # Milliseconds from the call to the last row drawn
+    started = time.perf_counter()
+    run()
+    settle(root, page)
+    return (time.perf_counter() - started) * 1000
+
+def run_scenario(root, page, run, runs):
+    """Latency percentiles over `runs` timed calls plus the Python memory peak of one traced call"""
+    measure(root, page, run)  # warm-up: connection, caches and first-use formatting
+    timings = [measure(root, page, run) for _ in range(runs)]
+
+    # Traced separately, tracemalloc slows the timed calls down
+    tracemalloc.start()
+    measure(root, page, run)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 0.95), 2),
+            'p99_ms': round(percentile(timings, 0.99), 2),
+            'peak_kib': round(peak / 1024, 1)}
+
+def run_size(size, runs, only):
+    db = prepare_dataset(size)
+
+    # Report sections shown with the reports page read the benchmark schema too
+    REPORT_WORKER.connect = lambda: connect_bench_db(f"{DB_CONFIG['database']}_bench_{size}")
+    REPORT_WORKER.db = None
+
+    root = tk.Tk()
+    root.geometry(APP_GEOMETRY)
+    dashboard = Dashboard(root, db)
+    dashboard.show()
+    root.update()
+
+    results = {}
+    for scenario, name, method, make_run in SCENARIOS:
+        if only and scenario not in only:
+            continue
+        getattr(dashboard, method)()
+        page = dashboard.pages[name][0]
+        settle(root, page)
+        results[scenario] = run_scenario(root, page, make_run(page), runs)
+        print_result(size, scenario, results[scenario])
+
+    root.destroy()
+    db.close()
+    return results
+
+def print_result(size, scenario, result, flags=()):
+    print(f"{size:<7} {scenario:<24} p50 {result['p50_ms']:9.2f} ms  p95 {result['p95_ms']:9.2f} ms  "
+          f"p99 {result['p99_ms']:9.2f} ms  peak {result['peak_kib']:10.1f} KiB  {' '.join(flags)}")
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+def save_baseline(path, results):
+    # Merge into the stored baseline so sizes and scenarios not run this time are kept
+    baseline = load_baseline(path)
+    for size, scenarios in results.items():
+        baseline.setdefault(size, {}).update(scenarios)
+    baseline['_saved_at'] = datetime.now().isoformat(timespec='seconds')
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(baseline, file, indent=2, sort_keys=True)
+
+def regressions(result, baseline, tolerance):
+    # Measurements more than `tolerance` above the baseline's
+    flags = []
+    for key in ('p50_ms', 'p95_ms', 'peak_kib'):
+        if key in baseline and result[key] > baseline[key] * (1 + tolerance):
+            flags.append(f"{key} {baseline[key]} -> {result[key]} (+{result[key] / max(baseline[key], 1e-9) - 1:.0%})")
+    return flags
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every page's query and render path")
+    parser.add_argument('--sizes', nargs='+', choices=list(BENCHMARK_SIZES), default=['small', 'medium'])
+    parser.add_argument('--runs', type=int, default=BENCHMARK_RUNS)
+    parser.add_argument('--only', nargs='+', choices=[scenario for scenario, *_ in SCENARIOS],
+                        help="benchmark only these scenarios")
+    parser.add_argument('--baseline', default=BENCHMARK_BASELINE_PATH)
+    parser.add_argument('--tolerance', type=float, default=BENCHMARK_TOLERANCE,
+                        help="slowdown (0.2 = 20%%) over the baseline reported as a regression")
+    parser.add_argument('--save-baseline', action='store_true', help="store these results as the new baseline")
+    args = parser.parse_args()
+
+    results = {size: run_size(size, args.runs, args.only) for size in args.sizes}
+
+    if args.save_baseline:
+        save_baseline(args.baseline, results)
+        print(f"\nBaseline saved to {args.baseline}")
+        return
+
+    baseline = load_baseline(args.baseline)
+    if not baseline:
+        print(f"\nNo baseline at {args.baseline}; run with --save-baseline to create one")
+        return
+
+    print(f"\nCompared with the baseline of {baseline.get('_saved_at', 'unknown date')} "
+          f"(tolerance {args.tolerance:.0%}):")
+    regressed = 0
+    for size, scenarios in results.items():
+        for scenario, result in scenarios.items():
+            expected = baseline.get(size, {}).get(scenario)
+            if expected is None:
+                print_result(size, scenario, result, ["(no baseline)"])
+                continue
+            flags = regressions(result, expected, args.tolerance)
+            print_result(size, scenario, result, ["REGRESSION:"] + flags if flags else ["ok"])
+            regressed += bool(flags)
+
+    if regressed:
+        raise SystemExit(f"{regressed} scenario(s) regressed")
+
+if __name__ == "__main__":
+    main()
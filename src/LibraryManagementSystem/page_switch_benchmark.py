@@ -0,0 +1,75 @@
+# page_switch_benchmark.py
+
+import argparse
+import time
+import tkinter as tk
+from configuration import APP_GEOMETRY, DB_CONFIG
+from dashboard import Dashboard
+from statistics_benchmark import connect_bench_db, seed, report
+
+# (page name, Dashboard method that shows it)
+PAGES = [
+    ('catalog', 'show_book_management'),
+    ('patrons', 'show_membership_management'),
+    ('circulation', 'show_borrowed_management'),
+    ('reports', 'show_reports_analytics')]
+
+def switch(root, dashboard, method):
+    # Show a page and let Tk finish laying it out and drawing it
+    getattr(dashboard, method)()
+    root.update()
+
+def drop_page(dashboard, name):
+    # Destroy a cached page so the next visit builds it from scratch
+    if name in dashboard.pages:
+        _, frame = dashboard.pages.pop(name)
+        frame.destroy()
+
+def time_switches(root, dashboard, method, away, runs, prepare):
+    # Milliseconds to switch to a page from another one; prepare() runs untimed before each switch
+    timings = []
+    for _ in range(runs):
+        switch(root, dashboard, away)
+        prepare()
+        started = time.perf_counter()
+        switch(root, dashboard, method)
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure dashboard page-switch latency")
+    parser.add_argument('--loans', type=int, default=200000)
+    parser.add_argument('--members', type=int, default=5000)
+    parser.add_argument('--books', type=int, default=10000)
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--database', default=f"{DB_CONFIG['database']}_bench")
+    args = parser.parse_args()
+
+    db = connect_bench_db(args.database)
+    seed(db, args.loans, members=args.members, books=args.books)
+
+    root = tk.Tk()
+    root.geometry(APP_GEOMETRY)
+    dashboard = Dashboard(root, db)
+    dashboard.show()
+    root.update()
+
+    for index, (name, method) in enumerate(PAGES):
+        away = PAGES[index - 1][1]
+
+        # Destroyed and rebuilt on every visit, as before pages were kept alive
+        report(f"{name}: rebuilt", time_switches(
+            root, dashboard, method, away, args.runs, lambda: drop_page(dashboard, name)))
+
+        # Kept alive, nothing changed since the last visit
+        report(f"{name}: cached", time_switches(root, dashboard, method, away, args.runs, lambda: None))
+
+        # Kept alive, a write touched one of its tables
+        report(f"{name}: stale", time_switches(
+            root, dashboard, method, away, args.runs, lambda: dashboard.stale.add(name)))
+
+    root.destroy()
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+# password_benchmark.py
+
+import argparse
+import statistics
+from configuration import LOGIN_TARGET_MS, PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P
+from password_hashing import hash_password
+from statistics_benchmark import time_runs, report
+
+def choose_cost(target_ms, r, p, runs, smallest=2 ** 12, largest=2 ** 20):
+    """Largest power-of-two scrypt n whose median hash time stays within target_ms.
+
+    Returns (n, median ms); n is `smallest` if even that is slower than the target.
+    """
+    chosen = (smallest, None)
+    n = smallest
+    while n <= largest:
+        timings = time_runs(lambda: hash_password("benchmark-password", n, r, p), runs)
+        report(f"n=2**{n.bit_length() - 1} ({128 * n * r // 2 ** 20} MiB)", timings)
+        median = statistics.median(timings)
+        if median > target_ms:
+            break
+        chosen = (n, median)
+        n *= 2
+    return chosen
+
+def main():
+    parser = argparse.ArgumentParser(description="Pick the scrypt cost for a target login latency")
+    parser.add_argument('--target-ms', type=float, default=LOGIN_TARGET_MS)
+    parser.add_argument('--r', type=int, default=PASSWORD_SCRYPT_R)
+    parser.add_argument('--p', type=int, default=PASSWORD_SCRYPT_P)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    n, median = choose_cost(args.target_ms, args.r, args.p, args.runs)
+    print()
+    if median is None:
+        print(f"Even n=2**{n.bit_length() - 1} is slower than {args.target_ms:.0f} ms on this machine")
+    else:
+        print(f"Suggested: PASSWORD_SCRYPT_N = 2 ** {n.bit_length() - 1}   ({median:.0f} ms per login, "
+              f"target {args.target_ms:.0f} ms)")
+    print(f"Configured: PASSWORD_SCRYPT_N = 2 ** {PASSWORD_SCRYPT_N.bit_length() - 1}")
+
+if __name__ == "__main__":
+    main()
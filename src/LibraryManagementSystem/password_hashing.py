@@ -0,0 +1,49 @@
+# password_hashing.py
+
+import base64
+import hashlib
+import hmac
+import os
+from configuration import PASSWORD_SCRYPT_N, PASSWORD_SCRYPT_R, PASSWORD_SCRYPT_P
+
+SCHEME = 'scrypt'
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+def _encode(data):
+    return base64.b64encode(data).decode('ascii')
+
+def _scrypt(password, salt, n, r, p):
+    # scrypt needs 128 * n * r bytes; OpenSSL's default limit is too low for the larger costs
+    return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                          maxmem=256 * n * r + 1024 * 1024, dklen=KEY_BYTES)
+
+def hash_password(password, n=PASSWORD_SCRYPT_N, r=PASSWORD_SCRYPT_R, p=PASSWORD_SCRYPT_P):
+    """Salted scrypt hash stored as 'scrypt$n$r$p$salt$key' (salt and key base64)"""
+    salt = os.urandom(SALT_BYTES)
+    return f"{SCHEME}${n}${r}${p}${_encode(salt)}${_encode(_scrypt(password, salt, n, r, p))}"
+
+def verify_password(password, stored):
+    """Check a password against a stored hash, or a legacy plaintext password.
+
+    With no stored hash (unknown user) a hash is still computed so the answer takes as long
+    as for a real account.
+    """
+    if stored is None:
+        hash_password(password)
+        return False
+    if not stored.startswith(SCHEME + '$'):
+        return hmac.compare_digest(password.encode('utf-8'), stored.encode('utf-8'))
+
+    try:
+        _, n, r, p, salt, key = stored.split('$')
+        expected = base64.b64decode(key)
+        actual = _scrypt(password, base64.b64decode(salt), int(n), int(r), int(p))
+    except ValueError:
+        return False
+    return hmac.compare_digest(actual, expected)
+
+def needs_rehash(stored):
+    """True for plaintext passwords and hashes made with a different cost than configured"""
+    return stored is None or not stored.startswith(
+        f"{SCHEME}${PASSWORD_SCRYPT_N}${PASSWORD_SCRYPT_R}${PASSWORD_SCRYPT_P}$")
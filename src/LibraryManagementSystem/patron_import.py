@@ -0,0 +1,190 @@
+# patron_import.py
+
+import csv
+import os
+import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from itertools import islice
+from utilities import (validate_email, validate_mobile, normalize_email, normalize_mobile,
+                       normalize_name, name_tokens)
+
+IMPORT_BATCH_SIZE = 1000        # Rows per validation chunk and per insert transaction
+PARALLEL_THRESHOLD = 5000       # Smaller files are validated in-process
+CHUNKS_PER_WORKER = 2           # Validation chunks in flight per worker process
+REQUIRED_COLUMNS = ('full_name', 'email', 'mobile_number')
+
+INSERT_MEMBER = """
+INSERT INTO members (member_id, full_name, email, mobile_number, status, email_key, mobile_key, name_key,
+                     added_at, updated_at)
+VALUES (%s, %s, %s, %s, 'Active', %s, %s, %s, %s, %s)
+"""
+INSERT_TOKEN = "INSERT IGNORE INTO member_name_tokens (token, member_id) VALUES (%s, %s)"
+
+def last_member_number(db):
+    """Highest numeric part of the existing MEM-### ids (string order breaks past MEM-999)"""
+    result = db.fetch_one("""
+        SELECT MAX(CAST(SUBSTRING_INDEX(member_id, '-', -1) AS UNSIGNED)) AS last_num
+        FROM members
+        WHERE member_id LIKE 'MEM-%'
+    """)
+    return int(result['last_num']) if result and result['last_num'] else 0
+
+def validate_chunk(chunk):
+    """Validate (line_no, row) pairs, returns (accepted, rejected) lists.
+
+    Runs in worker processes, so it only touches the row data and precompiled patterns.
+    """
+    accepted, rejected = [], []
+    for line_no, row in chunk:
+        name = (row.get('full_name') or '').strip()
+        email = (row.get('email') or '').strip()
+        mobile = (row.get('mobile_number') or '').strip()
+
+        if not all([name, email, mobile]):
+            rejected.append((line_no, row, "Missing required field"))
+        elif len(name) > 100 or len(email) > 100:
+            rejected.append((line_no, row, "Name or email is too long"))
+        elif not validate_email(email):
+            rejected.append((line_no, row, "Invalid email format"))
+        elif not validate_mobile(mobile):
+            rejected.append((line_no, row, "Invalid mobile format. Use: +63 9XX XXX XXXX"))
+        else:
+            accepted.append((line_no, name, email, mobile, normalize_email(email), normalize_mobile(mobile),
+                             normalize_name(name), sorted(name_tokens(name))))
+    return accepted, rejected
+
+def read_chunks(path, size=IMPORT_BATCH_SIZE):
+    """Stream (line_no, row) chunks from a CSV file without loading it whole"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        missing = [col for col in REQUIRED_COLUMNS if col not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"Missing column(s): {', '.join(missing)}")
+
+        # Data starts on line 2, after the header
+        rows = ((reader.line_num, row) for row in reader)
+        while True:
+            chunk = list(islice(rows, size))
+            if not chunk:
+                return
+            yield chunk
+
+def count_rows(path):
+    """Number of data rows, used to decide whether parallel validation pays off"""
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return max(sum(1 for _ in f) - 1, 0)
+
+class MemberImporter:
+    # Bulk member import from CSV (full_name, email, mobile_number).
+    # Validation runs in parallel worker processes, duplicate emails are checked
+    # against a set loaded in one query, and rows are inserted in batched transactions.
+    # validated_chunks() only reads the file, so it can run on another thread while
+    # add_chunk() inserts on the thread that owns the connection.
+
+    def __init__(self, db, workers=None, progress=None):
+        self.db = db
+        self.workers = workers
+        self.progress = progress
+        self.imported = 0
+        self.rejects = []
+        self.seen_emails = None
+        self.next_num = None
+
+    def load_existing_emails(self):
+        # All existing normalized emails in a single query
+        rows = self.db.fetch_all("SELECT COALESCE(email_key, LOWER(email)) AS email_key FROM members")
+        return {row['email_key'] for row in rows}
+
+    def validated_chunks(self, path):
+        # Yield validated chunks in file order, in parallel for large files
+        if count_rows(path) < PARALLEL_THRESHOLD:
+            for chunk in read_chunks(path):
+                yield validate_chunk(chunk)
+            return
+
+        # A bounded window of chunks is in flight, so the file is read only as fast as rows are
+        # inserted; results are taken oldest first, so ids are assigned in file order
+        window = (self.workers or os.cpu_count() or 1) * CHUNKS_PER_WORKER
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            pending = deque()
+            for chunk in read_chunks(path):
+                pending.append(pool.submit(validate_chunk, chunk))
+                if len(pending) >= window:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+
+    def start(self):
+        # Existing emails and the next member number, read before the first chunk is added
+        self.seen_emails = self.load_existing_emails()
+        self.next_num = last_member_number(self.db) + 1
+
+    def add_chunk(self, accepted, rejected):
+        # Insert one validated chunk's new members in a single transaction
+        self.rejects.extend(rejected)
+
+        members, tokens = [], []
+        now = datetime.now()
+        for line_no, name, email, mobile, email_key, mobile_key, name_key, words in accepted:
+            if email_key in self.seen_emails:
+                self.rejects.append((line_no, {'full_name': name, 'email': email, 'mobile_number': mobile},
+                                     "Email already exists"))
+                continue
+            self.seen_emails.add(email_key)
+
+            member_id = f"MEM-{self.next_num:03d}"
+            self.next_num += 1
+            members.append((member_id, name, email, mobile, email_key, mobile_key, name_key, now, now))
+            tokens.extend((word, member_id) for word in words)
+
+        if members and self.db.execute_batch([(INSERT_MEMBER, members), (INSERT_TOKEN, tokens)]):
+            self.imported += len(members)
+        elif members:
+            # Whole batch rolled back, report every row so nothing is silently lost
+            for member in members:
+                self.rejects.append((None, {'full_name': member[1], 'email': member[2],
+                                            'mobile_number': member[3]}, "Database insert failed"))
+
+        if self.progress:
+            self.progress(self.imported, len(self.rejects))
+
+    def run(self, path):
+        # Import members from a CSV file, returns (imported, rejects)
+        self.start()
+        for accepted, rejected in self.validated_chunks(path):
+            self.add_chunk(accepted, rejected)
+        return self.imported, self.rejects
+
+    def write_rejects(self, path):
+        # Write rejected rows with their reasons to a CSV report
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.writer(f)
+            writer.writerow(['line', 'full_name', 'email', 'mobile_number', 'reason'])
+            for line_no, row, reason in sorted(self.rejects, key=lambda r: r[0] or 0):
+                writer.writerow([line_no or '', row.get('full_name', ''), row.get('email', ''),
+                                 row.get('mobile_number', ''), reason])
+
+def main():
+    # Command line import: python patron_import.py members.csv [rejects.csv]
+    if len(sys.argv) < 2:
+        print("Usage: python patron_import.py members.csv [rejects.csv]")
+        return
+
+    from database import Database
+    db = Database()
+    if not db.connect():
+        return
+
+    importer = MemberImporter(db, progress=lambda done, bad: print(f"Imported {done}, rejected {bad}"))
+    imported, rejects = importer.run(sys.argv[1])
+    if rejects:
+        rejects_path = sys.argv[2] if len(sys.argv) > 2 else 'member_import_rejects.csv'
+        importer.write_rejects(rejects_path)
+        print(f"Rejects written to {rejects_path}")
+    print(f"Import finished: {imported} members added, {len(rejects)} rejected")
+    db.close()
+
+if __name__ == "__main__":
+    main()
@@ -1,17 +1,34 @@
 # patron_management.py
 
+import queue
+import threading
 import tkinter as tk
-from tkinter import ttk, messagebox
-from configuration import COLORS, FONTS
-from utilities import generate_id, validate_email, validate_mobile
+from tkinter import ttk, messagebox, filedialog
+from configuration import COLORS, FONTS, IMPORT_POLL_INTERVAL_MS
+from utilities import generate_id, validate_email, validate_mobile, format_currency
+from patron_search import search_members, search_key_statements
+from patron_import import MemberImporter, last_member_number
+from member_history import MemberHistory
+from tree_loader import TreeLoader
+from ui_profiler import UI_PROFILER
+from session_store import require
+from row_format import RowFormat, timestamp_column, count_column
 from datetime import datetime
 
+# Treeview values for a member
+MEMBER_ROW_FORMAT = RowFormat(
+    ('member_id', None), ('full_name', None), ('email', None), ('mobile_number', None), ('status', None),
+    ('borrowed_count', count_column('book', 'books')), ('added_at', timestamp_column()),
+    ('updated_at', timestamp_column()))
+
 class MembershipManagement:
     def __init__(self, parent, db):
         self.context_menu = None
         self.parent = parent
         self.db = db
         self.tree = None
+        self.tree_loader = None
+        self.import_btn = None
         self.search_var = tk.StringVar()
         self.filter_var = tk.StringVar(value="All")
 
@@ -93,6 +110,19 @@ class MembershipManagement:
         add_btn.bind('<Enter>', lambda e: add_btn.configure(bg=COLORS['secondary']))
         add_btn.bind('<Leave>', lambda e: add_btn.configure(bg=COLORS['accent']))
 
+        # Bulk import button
+        import_btn = self.import_btn = tk.Button(
+            search_frame,
+            text="Import Members",
+            font=FONTS['small'],
+            bg=COLORS['primary'],
+            fg='white',
+            cursor='hand2',
+            command=self.import_members)
+        import_btn.pack(side='right', padx=(0, 10))
+        import_btn.bind('<Enter>', lambda e: import_btn.configure(bg=COLORS['secondary']))
+        import_btn.bind('<Leave>', lambda e: import_btn.configure(bg=COLORS['primary']))
+
         # Table frame with scrollbars
         table_frame = tk.Frame(self.parent, bg='white')
         table_frame.pack(fill='both', expand=True, padx=20, pady=10)
@@ -130,10 +160,15 @@ class MembershipManagement:
         self.context_menu.add_command(label="Update Details", command=self.update_member_dialog)
         self.context_menu.add_command(label="Delete Member", command=self.delete_member)
         self.tree.bind('<Button-3>', self.show_context_menu)
+        self.tree_loader = TreeLoader(self.tree)
 
         # Load initial data
         self.load_members()
 
+    def refresh(self):
+        # Reload data shown on the page (used when the dashboard returns to a stale page)
+        self.load_members()
+
     def show_context_menu(self, event):
         try:
             row_id = self.tree.identify_row(event.y)
@@ -145,44 +180,25 @@ class MembershipManagement:
 
     def load_members(self):
         # Load members including borrowed count and timestamps
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
+        # borrowed_count comes from the maintained members.active_loans counter
         filter_value = self.filter_var.get()
         if filter_value == "All":
             query = """
-            SELECT m.*, COUNT(bb.borrow_id) AS borrowed_count
+            SELECT m.*, m.active_loans AS borrowed_count
             FROM members m
-            LEFT JOIN borrowed_books bb ON m.member_id = bb.member_id AND bb.status = 'Borrowed'
-            GROUP BY m.member_id
             ORDER BY m.member_id
             """
             members = self.db.fetch_all(query)
         else:
             query = """
-            SELECT m.*, COUNT(bb.borrow_id) AS borrowed_count
+            SELECT m.*, m.active_loans AS borrowed_count
             FROM members m
-            LEFT JOIN borrowed_books bb ON m.member_id = bb.member_id AND bb.status = 'Borrowed'
             WHERE m.status = %s
-            GROUP BY m.member_id
             ORDER BY m.member_id
             """
             members = self.db.fetch_all(query, (filter_value,))
 
-        for member in members:
-            added_at = member['added_at'].strftime('%Y-%m-%d %H:%M:%S') if member['added_at'] else ''
-            updated_at = member['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if member['updated_at'] else ''
-            borrowed_text = (f"{member['borrowed_count']} "
-                             f"book") if member['borrowed_count'] == 1 else f"{member['borrowed_count']} books"
-            self.tree.insert('', 'end', values=(
-                member['member_id'],
-                member['full_name'],
-                member['email'],
-                member['mobile_number'],
-                member['status'],
-                borrowed_text,
-                added_at,
-                updated_at))
+        self.tree_loader.load(members, MEMBER_ROW_FORMAT)
 
     def search_members(self):
         # Search members by keyword including timestamps
@@ -191,37 +207,14 @@ class MembershipManagement:
             self.load_members()
             return
 
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        query = """
-        SELECT m.*, COUNT(bb.borrow_id) AS borrowed_count
-        FROM members m
-        LEFT JOIN borrowed_books bb ON m.member_id = bb.member_id AND bb.status = 'Borrowed'
-        WHERE m.member_id LIKE %s OR m.full_name LIKE %s OR m.email LIKE %s OR m.mobile_number LIKE %s
-        GROUP BY m.member_id
-        ORDER BY m.member_id
-        """
-        search_pattern = f"%{keyword}%"
-        members = self.db.fetch_all(query, (search_pattern, search_pattern, search_pattern, search_pattern))
-
-        for member in members:
-            added_at = member['added_at'].strftime('%Y-%m-%d %H:%M:%S') if member['added_at'] else ''
-            updated_at = member['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if member['updated_at'] else ''
-            borrowed_text = f"{member['borrowed_count']} book" if member[
-                                                                      'borrowed_count'] == 1 else f"{member['borrowed_count']} books"
-            self.tree.insert('', 'end', values=(
-                member['member_id'],
-                member['full_name'],
-                member['email'],
-                member['mobile_number'],
-                member['status'],
-                borrowed_text,
-                added_at,
-                updated_at))
+        # Exact and prefix searches use the normalized key indexes, substrings fall back to a scan
+        members = search_members(self.db, keyword)
+        self.tree_loader.load(members, MEMBER_ROW_FORMAT)
 
     def add_member_dialog(self):
         # Add new member dialog with added_at and updated_at
+        if not require('manage_members'):
+            return
         dialog = tk.Toplevel(self.parent)
         dialog.title("Add New Member")
         dialog.geometry("500x450")
@@ -268,8 +261,8 @@ class MembershipManagement:
                 messagebox.showerror("Error", "Invalid mobile format. Use: +63 9XX XXX XXXX", parent=dialog)
                 return
 
-            last_member = self.db.fetch_one("SELECT member_id FROM members ORDER BY member_id DESC LIMIT 1")
-            member_id = generate_id("MEM", last_member['member_id'] if last_member else None)
+            last_num = last_member_number(self.db)
+            member_id = generate_id("MEM", f"MEM-{last_num}" if last_num else None)
             now = datetime.now()
 
             query = """
@@ -277,7 +270,10 @@ class MembershipManagement:
             VALUES (%s, %s, %s, %s, 'Active', %s, %s)
             """
 
-            if self.db.execute_query(query, (member_id, name, email, mobile, now, now)):
+            statements = [(query, (member_id, name, email, mobile, now, now))]
+            statements += search_key_statements(member_id, name, email, mobile)
+
+            if self.db.execute_transaction(statements):
                 messagebox.showinfo("Success", f"Member added successfully! (ID: {member_id})", parent=dialog)
                 dialog.destroy()
                 self.load_members()
@@ -285,7 +281,8 @@ class MembershipManagement:
                 messagebox.showerror("Error", "Failed to add member. Email might already exist.", parent=dialog)
 
         save_btn = tk.Button(btn_frame, text="Save Member", font=FONTS['small'],
-                             bg=COLORS['primary'], fg='white', width=15, cursor='hand2', command=save_member)
+                             bg=COLORS['primary'], fg='white', width=15, cursor='hand2',
+                             command=UI_PROFILER.wrap_action('MembershipManagement.save_member', save_member))
         save_btn.pack(side='left', padx=5)
         save_btn.bind('<Enter>', lambda e: save_btn.configure(bg=COLORS['secondary']))
         save_btn.bind('<Leave>', lambda e: save_btn.configure(bg=COLORS['primary']))
@@ -296,6 +293,63 @@ class MembershipManagement:
         cancel_btn.bind('<Enter>', lambda e: cancel_btn.configure(bg=COLORS['secondary']))
         cancel_btn.bind('<Leave>', lambda e: cancel_btn.configure(bg=COLORS['accent']))
 
+    def import_members(self):
+        # Bulk import members from a CSV file with full_name, email and mobile_number columns
+        if not require('import_members'):
+            return
+        path = filedialog.askopenfilename(
+            title="Import Members",
+            filetypes=[("CSV files", "*.csv"), ("All files", "*.*")])
+        if not path:
+            return
+
+        # The file is read and validated on a thread; each validated chunk is inserted here on the
+        # UI thread (which owns the connection), one per poll so the page stays responsive
+        def show_progress(done, bad):
+            if self.import_btn.winfo_exists():
+                self.import_btn.config(text=f"Importing… {done:,} added, {bad:,} rejected")
+
+        importer = MemberImporter(self.db, progress=show_progress)
+        importer.start()
+        chunks = queue.Queue(maxsize=4)
+
+        def validate():
+            try:
+                for chunk in importer.validated_chunks(path):
+                    chunks.put(chunk)
+                chunks.put(None)
+            except (OSError, ValueError) as e:
+                chunks.put(e)
+
+        def poll():
+            try:
+                item = chunks.get_nowait()
+            except queue.Empty:
+                self.parent.after(IMPORT_POLL_INTERVAL_MS, poll)
+                return
+            if isinstance(item, tuple):
+                importer.add_chunk(*item)
+                self.parent.after(1, poll)
+                return
+
+            if self.import_btn.winfo_exists():
+                self.import_btn.config(text="Import Members", state='normal')
+            if item is not None:
+                messagebox.showerror("Error", f"Failed to import members: {item}")
+                return
+            message = f"{importer.imported} members imported."
+            if importer.rejects:
+                rejects_path = path.rsplit('.', 1)[0] + "_rejects.csv"
+                importer.write_rejects(rejects_path)
+                message += f"\n{len(importer.rejects)} rows rejected, see:\n{rejects_path}"
+            messagebox.showinfo("Import Finished", message)
+            if self.tree.winfo_exists():
+                self.load_members()
+
+        self.import_btn.config(text="Importing…", state='disabled')
+        threading.Thread(target=validate, name="member-import", daemon=True).start()
+        self.parent.after(IMPORT_POLL_INTERVAL_MS, poll)
+
     def view_member(self):
         # View member details with improved styling matching book details view
         selected = self.tree.selection()
@@ -303,14 +357,8 @@ class MembershipManagement:
             return
 
         member_id = self.tree.item(selected[0])['values'][0]
-        member = self.db.fetch_one("""
-            SELECT m.*, COUNT(bb.borrow_id) AS borrowed_count
-            FROM members m
-            LEFT JOIN borrowed_books bb 
-                ON m.member_id = bb.member_id AND bb.status = 'Borrowed'
-            WHERE m.member_id = %s
-            GROUP BY m.member_id
-        """, (member_id,))
+        member = self.db.fetch_one(
+            "SELECT m.*, m.active_loans AS borrowed_count FROM members m WHERE m.member_id = %s", (member_id,))
         if not member:
             return
 
@@ -380,22 +428,112 @@ class MembershipManagement:
                 anchor='w').
              pack(side='left', fill='x', expand=True))
 
+        btn_frame = tk.Frame(dialog, bg='white')
+        btn_frame.pack(pady=10)
+
+        history_btn = tk.Button(
+            btn_frame,
+            text="Loan History",
+            font=FONTS['small'],
+            bg=COLORS['accent'],
+            fg='white',
+            width=12,
+            command=lambda: self.member_history_dialog(member['member_id'], member['full_name']))
+        history_btn.pack(side='left', padx=5)
+
         close_btn = tk.Button(
-            dialog,
+            btn_frame,
             text="Close",
             font=FONTS['small'],
             bg=COLORS['primary'],
             fg='white',
             width=10,
             command=dialog.destroy)
-        close_btn.pack(pady=10)
+        close_btn.pack(side='left', padx=5)
 
         # Hover effect
+        history_btn.bind('<Enter>', lambda e: history_btn.configure(bg=COLORS['secondary']))
+        history_btn.bind('<Leave>', lambda e: history_btn.configure(bg=COLORS['accent']))
         close_btn.bind('<Enter>', lambda e: close_btn.configure(bg=COLORS['secondary']))
         close_btn.bind('<Leave>', lambda e: close_btn.configure(bg=COLORS['primary']))
 
+    def member_history_dialog(self, member_id, full_name):
+        # Show a member's loan history one page at a time, newest first
+        history = MemberHistory(self.db, member_id)
+
+        dialog = tk.Toplevel(self.parent)
+        dialog.title("Loan History")
+        dialog.geometry("800x560")
+        dialog.configure(bg='white')
+        dialog.resizable(False, False)
+        dialog.grab_set()
+
+        dialog.update_idletasks()
+        x = (dialog.winfo_screenwidth() // 2) - (800 // 2)
+        y = (dialog.winfo_screenheight() // 2) - (560 // 2)
+        dialog.geometry(f'800x560+{x}+{y}')
+
+        tk.Label(dialog, text=f"Loan History – {full_name}", font=FONTS['heading'], bg='white',
+                 fg=COLORS['text']).pack(pady=(15, 5))
+
+        # Lifetime totals from the maintained member summary
+        totals = history.totals() or {'active_loans': 0, 'total_loans': 0, 'total_fines': 0}
+        total_loans = totals['total_loans'] or 0
+        tk.Label(
+            dialog,
+            text=(f"{total_loans} {'loan' if total_loans == 1 else 'loans'} | "
+                  f"{totals['active_loans'] or 0} active | {format_currency(totals['total_fines'] or 0)} in fines"),
+            font=FONTS['small'],
+            bg='white',
+            fg=COLORS['secondary']).pack(pady=(0, 10))
+
+        table_frame = tk.Frame(dialog, bg='white')
+        table_frame.pack(fill='both', expand=True, padx=20)
+
+        columns = ('borrow_date', 'book', 'due_date', 'return_date', 'status', 'fine_amount')
+        tree = ttk.Treeview(table_frame, columns=columns, show='headings', height=history.page_size)
+        widths = {'borrow_date': 100, 'book': 260, 'due_date': 100, 'return_date': 100, 'status': 90,
+                  'fine_amount': 100}
+        for col, width in widths.items():
+            tree.heading(col, text=col.replace('_', ' ').title())
+            tree.column(col, width=width)
+        tree.pack(fill='both', expand=True)
+
+        btn_frame = tk.Frame(dialog, bg='white')
+        btn_frame.pack(pady=10)
+
+        newer_btn = tk.Button(btn_frame, text="< Newer", font=FONTS['small'], bg=COLORS['primary'],
+                              fg='white', width=10, cursor='hand2')
+        newer_btn.pack(side='left', padx=5)
+        older_btn = tk.Button(btn_frame, text="Older >", font=FONTS['small'], bg=COLORS['primary'],
+                              fg='white', width=10, cursor='hand2')
+        older_btn.pack(side='left', padx=5)
+        close_btn = tk.Button(btn_frame, text="Close", font=FONTS['small'], bg=COLORS['accent'],
+                              fg='white', width=10, cursor='hand2', command=dialog.destroy)
+        close_btn.pack(side='left', padx=5)
+
+        def show_rows(rows):
+            for item in tree.get_children():
+                tree.delete(item)
+            for loan in rows:
+                tree.insert('', 'end', iid=loan['borrow_id'], values=(
+                    loan['borrow_date'].strftime('%Y-%m-%d'),
+                    f"{loan['book_title']} – {loan['book_id']}",
+                    loan['due_date'].strftime('%Y-%m-%d'),
+                    loan['return_date'].strftime('%Y-%m-%d') if loan['return_date'] else 'N/A',
+                    loan['status'],
+                    format_currency(loan['fine_amount'] or 0)))
+            newer_btn.configure(state='normal' if history.has_newer else 'disabled')
+            older_btn.configure(state='normal' if history.has_older else 'disabled')
+
+        newer_btn.configure(command=lambda: show_rows(history.newer_page()))
+        older_btn.configure(command=lambda: show_rows(history.older_page()))
+        show_rows(history.first_page())
+
     def update_member_dialog(self):
         # Show update member dialog
+        if not require('manage_members'):
+            return
         selected = self.tree.selection()
         if not selected:
             return
@@ -467,7 +605,10 @@ class MembershipManagement:
             SET full_name = %s, email = %s, mobile_number = %s, status = %s, updated_at = %s
             WHERE member_id = %s
             """
-            if self.db.execute_query(query, (full_name, email, mobile_number, status, now, member_id)):
+            statements = [(query, (full_name, email, mobile_number, status, now, member_id))]
+            statements += search_key_statements(member_id, full_name, email, mobile_number)
+
+            if self.db.execute_transaction(statements):
                 messagebox.showinfo("Success", "Member updated successfully!", parent=dialog)
                 dialog.destroy()
                 self.load_members()  # Refresh the member list
@@ -475,7 +616,8 @@ class MembershipManagement:
                 messagebox.showerror("Error", "Failed to update member", parent=dialog)
 
         update_btn = tk.Button(btn_frame, text="Update Member", font=FONTS['small'], bg=COLORS['primary'],
-                               fg='white', width=15, cursor='hand2', command=update_member)
+                               fg='white', width=15, cursor='hand2',
+                               command=UI_PROFILER.wrap_action('MembershipManagement.update_member', update_member))
         update_btn.pack(side='left', padx=5)
         update_btn.bind('<Enter>', lambda e: update_btn.configure(bg=COLORS['secondary']))
         update_btn.bind('<Leave>', lambda e: update_btn.configure(bg=COLORS['primary']))
@@ -488,6 +630,8 @@ class MembershipManagement:
 
     def delete_member(self):
         # Delete member with confirmation
+        if not require('delete_records'):
+            return
         selected = self.tree.selection()
         if not selected:
             return
@@ -0,0 +1,108 @@
+# patron_search.py
+
+import re
+from utilities import normalize_email, normalize_mobile, normalize_name, name_tokens
+
+MEMBER_COLUMNS = "m.*, m.active_loans AS borrowed_count"
+
+_MEMBER_ID_PATTERN = re.compile(r'^mem-?\d*$', re.IGNORECASE)
+_PHONE_PATTERN = re.compile(r'^[+\d][\d\s-]*$')
+PHONE_MIN_DIGITS = 7            # Shorter digit strings without a +63/63/09 prefix are not taken for phone numbers
+
+def _prefix(value):
+    # LIKE pattern that matches values starting with value (wildcards in value escaped)
+    return value.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_') + '%'
+
+def search_key_statements(member_id, full_name, email, mobile_number):
+    """Statements that (re)write a member's normalized search keys and name tokens"""
+    statements = [
+        ("UPDATE members SET email_key = %s, mobile_key = %s, name_key = %s WHERE member_id = %s",
+         (normalize_email(email), normalize_mobile(mobile_number), normalize_name(full_name), member_id)),
+        ("DELETE FROM member_name_tokens WHERE member_id = %s", (member_id,))]
+    for token in sorted(name_tokens(full_name)):
+        statements.append(("INSERT IGNORE INTO member_name_tokens (token, member_id) VALUES (%s, %s)",
+                           (token, member_id)))
+    return statements
+
+def backfill_search_keys(db):
+    """Fill search keys for members created before they existed"""
+    members = db.fetch_all(
+        "SELECT member_id, full_name, email, mobile_number FROM members WHERE name_key IS NULL")
+    for member in members:
+        db.execute_transaction(search_key_statements(
+            member['member_id'], member['full_name'], member['email'], member['mobile_number'] or ''))
+    if members:
+        print(f"Search keys created for {len(members)} members")
+
+def indexed_search(keyword, status=None):
+    """Build an index-backed (query, params) for exact and prefix searches.
+
+    Member IDs, emails and phone numbers are matched by prefix on their normalized keys,
+    anything else as word prefixes of the name. Returns None when the keyword has no
+    usable indexed form: short digit strings that are not phone-shaped (member numbers,
+    trailing phone digits) and dotted fragments without an @ (email domains).
+    """
+    keyword = keyword.strip()
+    status_clause = " AND m.status = %s" if status else ""
+    status_params = (status,) if status else ()
+
+    if _MEMBER_ID_PATTERN.match(keyword):
+        return (f"SELECT {MEMBER_COLUMNS} FROM members m WHERE m.member_id LIKE %s{status_clause} "
+                f"ORDER BY m.member_id", (_prefix(keyword.upper()),) + status_params)
+
+    if '@' in keyword:
+        return (f"SELECT {MEMBER_COLUMNS} FROM members m WHERE m.email_key LIKE %s{status_clause} "
+                f"ORDER BY m.member_id", (_prefix(normalize_email(keyword)),) + status_params)
+
+    if '.' in keyword:
+        return None
+
+    if _PHONE_PATTERN.match(keyword):
+        digits = normalize_mobile(keyword)
+        phone_shaped = keyword.startswith(('+63', '63', '09')) or len(digits) >= PHONE_MIN_DIGITS
+        if len(digits) < 3 or not phone_shaped:
+            return None
+        # Numbers typed without the country code ("917...") are matched after the 63 prefix
+        if not digits.startswith('63'):
+            digits = '63' + digits
+        return (f"SELECT {MEMBER_COLUMNS} FROM members m WHERE m.mobile_key LIKE %s{status_clause} "
+                f"ORDER BY m.member_id", (_prefix(digits),) + status_params)
+
+    tokens = sorted(name_tokens(keyword))
+    if not tokens:
+        return None
+
+    # Every word typed must be the prefix of some word of the name
+    joins = []
+    params = []
+    for idx, token in enumerate(tokens):
+        joins.append(f"JOIN member_name_tokens t{idx} ON t{idx}.member_id = m.member_id AND t{idx}.token LIKE %s")
+        params.append(_prefix(token))
+    query = (f"SELECT DISTINCT {MEMBER_COLUMNS} FROM members m {' '.join(joins)} "
+             f"WHERE 1 = 1{status_clause} ORDER BY m.member_id")
+    return query, tuple(params) + status_params
+
+def substring_search(keyword, status=None):
+    """Build the full-scan (query, params) for substring searches"""
+    pattern = f"%{keyword.strip()}%"
+    digits = normalize_mobile(keyword)
+    status_clause = " AND m.status = %s" if status else ""
+    query = f"""
+    SELECT {MEMBER_COLUMNS}
+    FROM members m
+    WHERE (m.member_id LIKE %s OR m.full_name LIKE %s OR m.email LIKE %s OR m.mobile_number LIKE %s
+           OR m.mobile_key LIKE %s){status_clause}
+    ORDER BY m.member_id
+    """
+    params = (pattern, pattern, pattern, pattern, f"%{digits or keyword.strip()}%")
+    return query, params + ((status,) if status else ())
+
+def search_members(db, keyword, status=None):
+    """Search members by the keyword's indexed form, scanning by substring when it has none
+    or the indexes find nothing (name infixes such as 'ntos')"""
+    routed = indexed_search(keyword, status)
+    if routed:
+        members = db.fetch_all(*routed)
+        if members:
+            return members
+    return db.fetch_all(*substring_search(keyword, status))
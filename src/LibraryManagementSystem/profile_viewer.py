@@ -0,0 +1,56 @@
+# profile_viewer.py
+
+import argparse
+import glob
+import os
+import pstats
+import tracemalloc
+from configuration import UI_PROFILE_DIR
+
+# Allocations made by the snapshots themselves are not the action's
+SNAPSHOT_FILTERS = [tracemalloc.Filter(False, tracemalloc.__file__),
+                    tracemalloc.Filter(False, "<frozen importlib._bootstrap>")]
+
+def latest_capture():
+    # Most recent actions_<timestamp> directory written by the action profiler
+    captures = sorted(glob.glob(os.path.join(UI_PROFILE_DIR, 'actions_*')))
+    return captures[-1] if captures else None
+
+def show_functions(path, top, sort):
+    pstats.Stats(path).sort_stats(sort).print_stats(top)
+
+def show_allocations(prefix, top):
+    before_path, after_path = prefix + '.before.tracemalloc', prefix + '.after.tracemalloc'
+    if not (os.path.exists(before_path) and os.path.exists(after_path)):
+        print("  no tracemalloc snapshots")
+        return
+    before = tracemalloc.Snapshot.load(before_path).filter_traces(SNAPSHOT_FILTERS)
+    after = tracemalloc.Snapshot.load(after_path).filter_traces(SNAPSHOT_FILTERS)
+    differences = after.compare_to(before, 'lineno')
+    growth = sum(difference.size_diff for difference in differences)
+    print(f"  memory held after the action: {growth / 1024:+.1f} KiB, top {top} lines:")
+    for difference in differences[:top]:
+        frame = difference.traceback[0]
+        print(f"    {difference.size_diff / 1024:+10.1f} KiB {difference.count_diff:+8d} blocks  "
+              f"{frame.filename}:{frame.lineno}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize captured UI action profiles")
+    parser.add_argument('directory', nargs='?', help="capture directory (default: the latest one)")
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--sort', default='cumulative', help="pstats sort key, e.g. cumulative, tottime, calls")
+    args = parser.parse_args()
+
+    directory = args.directory or latest_capture()
+    if not directory or not os.path.isdir(directory):
+        raise SystemExit(f"No captures found in {UI_PROFILE_DIR}")
+
+    for path in sorted(glob.glob(os.path.join(directory, '*.prof'))):
+        prefix = path[:-len('.prof')]
+        print(f"=== {os.path.basename(prefix)}")
+        show_functions(path, args.top, args.sort)
+        show_allocations(prefix, args.top)
+        print()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+# report_cache.py
+
+import threading
+import time
+
+class TTLSnapshot:
+    # Cached result of an expensive report query.
+    # Served until it is older than ttl seconds or a write touches one of its tables.
+    # Loads run outside the lock (the report worker fills it while the UI thread writes);
+    # a value loaded across an invalidate() is returned but not kept.
+
+    def __init__(self, ttl, tables):
+        self.ttl = ttl
+        self.tables = set(tables)
+        self.lock = threading.Lock()
+        self.value = None
+        self.loaded_at = None
+        self.generation = 0
+
+    def get(self, loader):
+        # Return the cached value, reloading it with loader() when stale
+        with self.lock:
+            if self.loaded_at is not None and time.monotonic() - self.loaded_at <= self.ttl:
+                return self.value
+            generation = self.generation
+
+        value = loader()
+        with self.lock:
+            if generation == self.generation:
+                self.value = value
+                self.loaded_at = time.monotonic()
+        return value
+
+    def invalidate(self):
+        with self.lock:
+            self.generation += 1
+            self.value = None
+            self.loaded_at = None
+
+    def invalidate_on_write(self, tables):
+        # Database write listener: drop the snapshot when one of its tables changed
+        if self.tables & set(tables):
+            self.invalidate()
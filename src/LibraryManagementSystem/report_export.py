@@ -0,0 +1,252 @@
+# report_export.py
+
+import csv
+import os
+import threading
+from datetime import date, datetime
+from decimal import Decimal
+from configuration import APP_TITLE, EXPORT_FETCH_SIZE, EXPORT_PDF_ROWS_PER_PAGE
+from library_reports import STATISTICS_QUERY
+from report_worker import connect_report_db
+
+# Report sections that can be exported: column headers, the streamed query, a count query for
+# progress (None for a single row), whether rows get a rank column and whether they take the
+# (start_date, end_date) period
+EXPORT_SECTIONS = {
+    "Statistics Cards": {
+        'columns': ['Active Members', 'Inactive Members', 'Currently Borrowed', 'Overdue Books', 'Total Fines'],
+        'query': STATISTICS_QUERY,
+        'count': None,
+        'ranked': False,
+        'dated': False},
+    "Top Borrowers": {
+        'columns': ['Rank', 'Member ID', 'Member Name', 'Borrowed Books', 'Total Fines'],
+        'query': """
+            SELECT r.member_id, m.full_name, r.total_borrowed, r.total_fines
+            FROM (
+                SELECT member_id, SUM(loans) AS total_borrowed, SUM(fines) AS total_fines
+                FROM member_daily_loans
+                WHERE loan_date BETWEEN %s AND %s
+                GROUP BY member_id
+            ) r
+            JOIN members m ON m.member_id = r.member_id
+            ORDER BY r.total_borrowed DESC, r.member_id
+        """,
+        'count': "SELECT COUNT(DISTINCT member_id) AS total FROM member_daily_loans WHERE loan_date BETWEEN %s AND %s",
+        'ranked': True,
+        'dated': True},
+    "Most Popular Books": {
+        'columns': ['Rank', 'Book ID', 'Title', 'Author', 'Times Borrowed'],
+        'query': """
+            SELECT r.book_id, b.title, b.author, r.borrow_count
+            FROM (
+                SELECT book_id, SUM(loans) AS borrow_count
+                FROM book_daily_loans
+                WHERE loan_date BETWEEN %s AND %s
+                GROUP BY book_id
+            ) r
+            JOIN books b ON b.book_id = r.book_id
+            ORDER BY r.borrow_count DESC, r.book_id
+        """,
+        'count': "SELECT COUNT(DISTINCT book_id) AS total FROM book_daily_loans WHERE loan_date BETWEEN %s AND %s",
+        'ranked': True,
+        'dated': True},
+    "Loan Register": {
+        'columns': ['Borrow ID', 'Book ID', 'Title', 'Member ID', 'Member Name', 'Borrow Date', 'Due Date',
+                    'Return Date', 'Status', 'Fine'],
+        'query': """
+            SELECT bb.borrow_id, bb.book_id, b.title, bb.member_id, m.full_name, bb.borrow_date,
+                   bb.due_date, bb.return_date, bb.status, bb.fine_amount
+            FROM borrowed_books bb
+            JOIN books b ON b.book_id = bb.book_id
+            JOIN members m ON m.member_id = bb.member_id
+            WHERE bb.borrow_date BETWEEN %s AND %s
+            ORDER BY bb.borrow_date, bb.borrow_id
+        """,
+        'count': "SELECT COUNT(*) AS total FROM borrowed_books WHERE borrow_date BETWEEN %s AND %s",
+        'ranked': False,
+        'dated': True}}
+
+EXPORT_FORMATS = ["CSV", "PDF"]
+
+def export_value(value):
+    # Plain text for a cell: 2-decimal amounts, ISO dates, empty for NULL
+    if value is None:
+        return ""
+    if isinstance(value, (Decimal, float)):
+        return f"{value:.2f}"
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+class CSVReportWriter:
+    def __init__(self, path, title, columns):
+        self.file = open(path, 'w', newline='', encoding='utf-8')
+        self.writer = csv.writer(self.file)
+        self.writer.writerow(columns)
+
+    def write_rows(self, rows):
+        self.writer.writerows(rows)
+
+    def close(self):
+        self.file.close()
+
+class PDFReportWriter:
+    # Minimal PDF 1.4 writer for tabular reports. Pages are written out as soon as they are
+    # full; only the byte offsets of written objects are kept for the cross-reference table,
+    # and the page tree (object 2) is written last once every page is known.
+
+    PAGE_WIDTH, PAGE_HEIGHT = 842, 595     # A4 landscape, in points
+    MARGIN = 36
+    FONT_SIZE = 8
+    LINE_HEIGHT = 10
+    LINE_CHARS = 160                       # Courier 8pt characters across the printable width
+
+    def __init__(self, path, title, columns):
+        self.file = open(path, 'wb')
+        self.title = title
+        self.offsets = {}
+        self.pages = []
+        self.next_object = 5
+        self.lines = []
+        self.widths = self._column_widths(len(columns))
+        self.header = self._format_row(columns)
+
+        self.file.write(b"%PDF-1.4\n")
+        self._object(1, b"<< /Type /Catalog /Pages 2 0 R >>")
+        self._object(3, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier /Encoding /WinAnsiEncoding >>")
+        self._object(4, b"<< /Type /Font /Subtype /Type1 /BaseFont /Courier-Bold /Encoding /WinAnsiEncoding >>")
+
+    def _column_widths(self, count):
+        # Equal character widths per column, one space between columns
+        width = max((self.LINE_CHARS - (count - 1)) // max(count, 1), 4)
+        return [width] * count
+
+    def _format_row(self, values):
+        cells = []
+        for value, width in zip(values, self.widths):
+            text = str(value)
+            cells.append(text[:width - 3] + "..." if len(text) > width else text.ljust(width))
+        return " ".join(cells).rstrip()
+
+    def _object(self, number, body):
+        self.offsets[number] = self.file.tell()
+        self.file.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+
+    @staticmethod
+    def _text(value):
+        # PDF string literal in WinAnsi encoding
+        data = value.replace("₱", "PHP ").encode('cp1252', errors='replace')
+        return b"(" + data.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)") + b")"
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.lines.append(self._format_row(row))
+            if len(self.lines) == EXPORT_PDF_ROWS_PER_PAGE:
+                self._flush_page()
+
+    def _flush_page(self):
+        top = self.PAGE_HEIGHT - self.MARGIN
+        page_number = len(self.pages) + 1
+        content = [b"BT /F2 11 Tf %d %d Td " % (self.MARGIN, top) + self._text(self.title) + b" Tj ET",
+                   b"BT /F1 %d Tf %d %d Td " % (self.FONT_SIZE, self.PAGE_WIDTH - self.MARGIN - 60, top)
+                   + self._text(f"Page {page_number}") + b" Tj ET",
+                   b"BT /F2 %d Tf %d TL %d %d Td " % (self.FONT_SIZE, self.LINE_HEIGHT, self.MARGIN, top - 24)
+                   + self._text(self.header) + b" Tj ET",
+                   b"BT /F1 %d Tf %d TL %d %d Td" % (self.FONT_SIZE, self.LINE_HEIGHT, self.MARGIN, top - 24 - self.LINE_HEIGHT)]
+        content += [self._text(line) + b" Tj T*" for line in self.lines]
+        content.append(b"ET")
+        stream = b"\n".join(content)
+
+        contents, page = self.next_object, self.next_object + 1
+        self.next_object += 2
+        self._object(contents, b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        self._object(page, b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+                           b"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents %d 0 R >>"
+                     % (self.PAGE_WIDTH, self.PAGE_HEIGHT, contents))
+        self.pages.append(page)
+        self.lines = []
+
+    def close(self):
+        if self.lines or not self.pages:
+            self._flush_page()
+        kids = b" ".join(b"%d 0 R" % page for page in self.pages)
+        self._object(2, b"<< /Type /Pages /Kids [" + kids + b"] /Count %d >>" % len(self.pages))
+
+        xref = self.file.tell()
+        self.file.write(b"xref\n0 %d\n0000000000 65535 f \n" % self.next_object)
+        for number in range(1, self.next_object):
+            self.file.write(b"%010d 00000 n \n" % self.offsets[number])
+        self.file.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (self.next_object, xref))
+        self.file.close()
+
+class ReportExport(threading.Thread):
+    # Background export of one report section to CSV or PDF. Rows are streamed from the
+    # server in EXPORT_FETCH_SIZE batches and written straight out, so memory use does not
+    # grow with the report. rows_written / total_rows can be polled from the UI thread.
+
+    def __init__(self, section, export_format, path, start_date=None, end_date=None, connect=connect_report_db):
+        super().__init__(name="report-export", daemon=True)
+        self.section = section
+        self.export_format = export_format
+        self.path = path
+        self.start_date = start_date or date.min
+        self.end_date = end_date or date.max
+        self.connect = connect
+        self.rows_written = 0
+        self.total_rows = None
+        self.error = None
+        self.cancelled = False
+        self.finished = False
+
+    def cancel(self):
+        self.cancelled = True
+
+    def run(self):
+        spec = EXPORT_SECTIONS[self.section]
+        params = (self.start_date, self.end_date) if spec['dated'] else None
+        db = writer = batches = None
+        try:
+            db = self.connect()
+            if db is None:
+                raise RuntimeError("Database unavailable")
+
+            if spec['count']:
+                counted = db.fetch_one(spec['count'], params)
+                self.total_rows = counted['total'] if counted else None
+            else:
+                self.total_rows = 1
+
+            writer_class = PDFReportWriter if self.export_format == "PDF" else CSVReportWriter
+            period = "" if not spec['dated'] else \
+                f" ({export_value(params[0]) if params[0] != date.min else 'start'} to " \
+                f"{export_value(params[1]) if params[1] != date.max else 'today'})"
+            writer = writer_class(self.path, f"{APP_TITLE} - {self.section}{period}", spec['columns'])
+
+            batches = db.stream_rows(spec['query'], params, EXPORT_FETCH_SIZE)
+            for rows in batches:
+                if self.cancelled:
+                    break
+                if spec['ranked']:
+                    rows = [(self.rows_written + index,) + tuple(row) for index, row in enumerate(rows, 1)]
+                writer.write_rows([[export_value(value) for value in row] for row in rows])
+                self.rows_written += len(rows)
+        except Exception as e:
+            self.error = e
+        finally:
+            try:
+                # A cancelled export leaves the generator open; close its cursor before the connection.
+                # Each step runs even if an earlier one failed, so the dialog always sees finished
+                for cleanup in (batches and batches.close, writer and writer.close, db and db.close):
+                    if cleanup:
+                        try:
+                            cleanup()
+                        except Exception as e:
+                            self.error = self.error or e
+                if (self.cancelled or self.error) and os.path.exists(self.path):
+                    try:
+                        os.remove(self.path)
+                    except OSError:
+                        pass
+            finally:
+                self.finished = True
@@ -0,0 +1,189 @@
+# report_rollups.py
+
+from datetime import date
+from configuration import ROLLUP_OVERLAP_SECONDS
+
+ROLLUP_CHUNK_SIZE = 500          # Rollup cells recomputed per statement
+
+# Records a (day, book, member) cell whose loans changed in a way the refresh job cannot see
+# from borrowed_books alone (a deleted loan, or a loan moved to another day, book or member)
+MARK_DIRTY = """
+INSERT IGNORE INTO rollup_dirty (loan_date, book_id, member_id) VALUES (%s, %s, %s)
+"""
+
+def dirty_cell_statement(book_id, member_id, borrow_date):
+    """Statement for the loan-changing transaction that queues the loan's old cell for the next refresh"""
+    return MARK_DIRTY, (borrow_date, book_id, member_id)
+
+class ReportRollups:
+    # Daily rollups of borrowed_books for the report rankings:
+    #   book_daily_loans   (loan_date, book_id)   -> loans
+    #   member_daily_loans (loan_date, member_id) -> loans, fines
+    # refresh() recomputes only the cells touched since the last run: new loans past
+    # the borrow_id watermark, loans whose server-set updated_at is after the last refresh
+    # time less ROLLUP_OVERLAP_SECONDS, and cells queued in rollup_dirty. The overlap
+    # catches transactions that were still open at the last refresh (a loan with a lower
+    # borrow_id, or an update stamped before refreshed_at but committed after it);
+    # recomputing a cell twice is harmless. Rankings for any range then read rollup rows only.
+
+    def __init__(self, db):
+        self.db = db
+
+    def state(self):
+        return self.db.fetch_one("SELECT last_borrow_id, refreshed_at FROM rollup_state WHERE name = 'daily'")
+
+    def rebuild(self):
+        # Full rebuild from borrowed_books, used the first time
+        marker = self.db.fetch_one("SELECT COALESCE(MAX(borrow_id), 0) AS last_id, NOW() AS now FROM borrowed_books")
+        if not marker:
+            return False
+        statements = [
+            ("DELETE FROM book_daily_loans", None),
+            ("DELETE FROM member_daily_loans", None),
+            ("""
+            INSERT INTO book_daily_loans (loan_date, book_id, loans)
+            SELECT borrow_date, book_id, COUNT(*)
+            FROM borrowed_books
+            WHERE borrow_id <= %s
+            GROUP BY borrow_date, book_id
+            """, (marker['last_id'],)),
+            ("""
+            INSERT INTO member_daily_loans (loan_date, member_id, loans, fines)
+            SELECT borrow_date, member_id, COUNT(*), COALESCE(SUM(fine_amount), 0)
+            FROM borrowed_books
+            WHERE borrow_id <= %s
+            GROUP BY borrow_date, member_id
+            """, (marker['last_id'],)),
+            ("DELETE FROM rollup_dirty", None),
+            ("""
+            REPLACE INTO rollup_state (name, last_borrow_id, refreshed_at) VALUES ('daily', %s, %s)
+            """, (marker['last_id'], marker['now']))]
+        return self.db.execute_transaction(statements)
+
+    def refresh(self):
+        # Incrementally bring the rollups up to date, returns the number of cells recomputed
+        if self.db.offline:
+            return 0
+
+        state = self.state()
+        if not state:
+            self.rebuild()
+            return -1
+
+        marker = self.db.fetch_one("SELECT COALESCE(MAX(borrow_id), 0) AS last_id, NOW() AS now FROM borrowed_books")
+        if not marker:
+            return 0
+
+        changed = self.db.fetch_all("""
+            SELECT DISTINCT borrow_date, book_id, member_id FROM borrowed_books
+            WHERE borrow_id > %s AND borrow_id <= %s
+            UNION
+            SELECT DISTINCT borrow_date, book_id, member_id FROM borrowed_books
+            WHERE updated_at >= %s - INTERVAL %s SECOND
+        """, (state['last_borrow_id'], marker['last_id'], state['refreshed_at'], ROLLUP_OVERLAP_SECONDS))
+        dirty = self.db.fetch_all("SELECT loan_date AS borrow_date, book_id, member_id FROM rollup_dirty")
+        changed = changed + dirty
+
+        book_cells = sorted({(row['borrow_date'], row['book_id']) for row in changed})
+        member_cells = sorted({(row['borrow_date'], row['member_id']) for row in changed})
+
+        statements = []
+        for start in range(0, len(book_cells), ROLLUP_CHUNK_SIZE):
+            statements += self._recompute_book_cells(book_cells[start:start + ROLLUP_CHUNK_SIZE])
+        for start in range(0, len(member_cells), ROLLUP_CHUNK_SIZE):
+            statements += self._recompute_member_cells(member_cells[start:start + ROLLUP_CHUNK_SIZE])
+
+        # Only dirty cells that were read above are cleared, later ones wait for the next run
+        for row in dirty:
+            statements.append(("DELETE FROM rollup_dirty WHERE loan_date = %s AND book_id = %s AND member_id = %s",
+                               (row['borrow_date'], row['book_id'], row['member_id'])))
+        statements.append(("UPDATE rollup_state SET last_borrow_id = %s, refreshed_at = %s WHERE name = 'daily'",
+                           (marker['last_id'], marker['now'])))
+
+        self.db.execute_transaction(statements)
+        return len(book_cells) + len(member_cells)
+
+    @staticmethod
+    def _recompute_book_cells(cells):
+        # Replace the rollup rows for these (day, book) cells with fresh counts
+        placeholders = ", ".join(["(%s, %s)"] * len(cells))
+        params = tuple(value for cell in cells for value in cell)
+        return [
+            (f"DELETE FROM book_daily_loans WHERE (loan_date, book_id) IN ({placeholders})", params),
+            (f"""
+            INSERT INTO book_daily_loans (loan_date, book_id, loans)
+            SELECT borrow_date, book_id, COUNT(*)
+            FROM borrowed_books
+            WHERE (borrow_date, book_id) IN ({placeholders})
+            GROUP BY borrow_date, book_id
+            """, params)]
+
+    @staticmethod
+    def _recompute_member_cells(cells):
+        # Replace the rollup rows for these (day, member) cells with fresh counts and fines
+        placeholders = ", ".join(["(%s, %s)"] * len(cells))
+        params = tuple(value for cell in cells for value in cell)
+        return [
+            (f"DELETE FROM member_daily_loans WHERE (loan_date, member_id) IN ({placeholders})", params),
+            (f"""
+            INSERT INTO member_daily_loans (loan_date, member_id, loans, fines)
+            SELECT borrow_date, member_id, COUNT(*), COALESCE(SUM(fine_amount), 0)
+            FROM borrowed_books
+            WHERE (borrow_date, member_id) IN ({placeholders})
+            GROUP BY borrow_date, member_id
+            """, params)]
+
+    def top_borrowers(self, start_date=None, end_date=None, limit=10):
+        # Members with the most loans borrowed in the range, from member_daily_loans
+        start_date = start_date or date.min
+        end_date = end_date or date.max
+        return self.db.fetch_all("""
+            SELECT m.member_id, m.full_name, r.total_borrowed, r.total_fines
+            FROM (
+                SELECT member_id, SUM(loans) AS total_borrowed, SUM(fines) AS total_fines
+                FROM member_daily_loans
+                WHERE loan_date BETWEEN %s AND %s
+                GROUP BY member_id
+                ORDER BY total_borrowed DESC
+                LIMIT %s
+            ) r
+            JOIN members m ON m.member_id = r.member_id
+            ORDER BY r.total_borrowed DESC
+        """, (start_date, end_date, limit))
+
+    def popular_books(self, start_date=None, end_date=None, limit=10):
+        # Books borrowed most often in the range, from book_daily_loans
+        start_date = start_date or date.min
+        end_date = end_date or date.max
+        return self.db.fetch_all("""
+            SELECT b.book_id, b.title, b.author, r.borrow_count
+            FROM (
+                SELECT book_id, SUM(loans) AS borrow_count
+                FROM book_daily_loans
+                WHERE loan_date BETWEEN %s AND %s
+                GROUP BY book_id
+                ORDER BY borrow_count DESC
+                LIMIT %s
+            ) r
+            JOIN books b ON b.book_id = r.book_id
+            ORDER BY r.borrow_count DESC
+        """, (start_date, end_date, limit))
+
+def main():
+    # Scheduled refresh: python report_rollups.py [--rebuild]
+    import sys
+    from database import Database
+    db = Database()
+    if not db.connect():
+        return
+
+    rollups = ReportRollups(db)
+    if '--rebuild' in sys.argv:
+        rollups.rebuild()
+        print("Report rollups rebuilt")
+    else:
+        print(f"Report rollups refreshed ({rollups.refresh()} cells)")
+    db.close()
+
+if __name__ == "__main__":
+    main()
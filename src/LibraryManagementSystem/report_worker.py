@@ -0,0 +1,62 @@
+# report_worker.py
+
+import queue
+import threading
+import time
+
+class ReportWorker:
+    # Computes report sections on one background thread with its own database connection
+    # (a MySQL connection must not be shared across threads). Jobs run in submission order;
+    # each finished job is queued as (owner, section, result, error, elapsed_ms) for the
+    # UI thread to pick up with results().
+
+    def __init__(self, connect, name="report-worker"):
+        self.connect = connect
+        self.name = name
+        self.jobs = queue.Queue()
+        self.finished = queue.Queue()
+        self.thread = None
+        self.db = None
+
+    def submit(self, owner, section, compute):
+        # Queue compute(db) for a section of owner's page
+        if self.thread is None or not self.thread.is_alive():
+            self.thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self.thread.start()
+        self.jobs.put((owner, section, compute))
+
+    def results(self):
+        # Finished jobs since the last call (UI thread)
+        finished = []
+        while True:
+            try:
+                finished.append(self.finished.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def _run(self):
+        while True:
+            owner, section, compute = self.jobs.get()
+            started = time.perf_counter()
+            try:
+                if self.db is None:
+                    self.db = self.connect()
+                if self.db is None:
+                    raise RuntimeError("Database unavailable")
+                result, error = compute(self.db), None
+            except Exception as e:
+                result, error = None, e
+            self.finished.put((owner, section, result, error, (time.perf_counter() - started) * 1000))
+
+def connect_report_db():
+    # Separate connection for the worker thread, None if the server is unreachable. Its offline
+    # queue is in memory: the desk's own connection owns the queue file and replays it
+    from database import Database
+    db = Database(offline_queue_path=':memory:')
+    return db if db.connect() else None
+
+# Shared by every reports page
+REPORT_WORKER = ReportWorker(connect_report_db)
+
+# Scheduled rollup, recommendation and loan total upkeep, kept apart so it never delays a report
+MAINTENANCE_WORKER = ReportWorker(connect_report_db, name="maintenance-worker")
@@ -0,0 +1,143 @@
+# reservation_queue.py
+
+from datetime import datetime, timedelta
+from configuration import HOLD_PICKUP_DAYS
+
+class ReservationQueue:
+    # Per-book FIFO hold queues backed by the reservations table.
+    # reservation_id is auto-incremented, so it orders each queue: enqueue is a
+    # single INSERT and the head of a queue is one seek on idx_reservations_queue
+    # (book_id, status, reservation_id), no matter how many patrons are waiting for
+    # the same title. A patron's position is not stored (it would shift on every
+    # fulfil, expiry and cancellation); queue_position counts the holds ahead.
+
+    def __init__(self, db):
+        self.db = db
+
+    def place_hold(self, book_id, member_id):
+        # Append a member to the book's queue, returns (reservation_id, position) or None if already queued
+        existing = self.db.fetch_one("""
+            SELECT reservation_id FROM reservations
+            WHERE book_id = %s AND member_id = %s AND status IN ('Waiting', 'Ready')
+            LIMIT 1
+        """, (book_id, member_id))
+        if existing:
+            return None
+
+        query = """
+        INSERT INTO reservations (book_id, member_id, status, reserved_at)
+        VALUES (%s, %s, 'Waiting', %s)
+        """
+        if not self.db.execute_query(query, (book_id, member_id, datetime.now())):
+            return None
+
+        # No id yet when the hold was queued offline, its position is known only after replay
+        reservation_id = self.db.last_row_id
+        if reservation_id is None:
+            return None, None
+        return reservation_id, self.queue_position(book_id, reservation_id)
+
+    def queue_position(self, book_id, reservation_id):
+        # 1-based position of a waiting reservation in its book's queue; an index range count
+        # over idx_reservations_queue that reads only the entries ahead of it
+        result = self.db.fetch_one("""
+            SELECT COUNT(*) AS ahead FROM reservations
+            WHERE book_id = %s AND status = 'Waiting' AND reservation_id < %s
+        """, (book_id, reservation_id))
+        return (result['ahead'] if result else 0) + 1
+
+    def peek(self, book_id):
+        # Head of the waiting queue for a book, or None
+        return self.db.fetch_one("""
+            SELECT * FROM reservations
+            WHERE book_id = %s AND status = 'Waiting'
+            ORDER BY reservation_id
+            LIMIT 1
+        """, (book_id,))
+
+    def ready_hold(self, book_id):
+        # Hold currently set aside for pickup, or None
+        return self.db.fetch_one("""
+            SELECT * FROM reservations
+            WHERE book_id = %s AND status = 'Ready'
+            ORDER BY reservation_id
+            LIMIT 1
+        """, (book_id,))
+
+    def release_book(self, book_id, now=None):
+        # Called when a copy comes back: hand it to the next patron in line or shelve it.
+        # Returns the reservation that was made Ready, or None if the queue was empty.
+        now = now or datetime.now()
+        head = self.peek(book_id)
+
+        if not head:
+            self.db.execute_query("UPDATE books SET status = 'Available', updated_at = %s WHERE book_id = %s",
+                                  (now, book_id))
+            return None
+
+        expires_at = now + timedelta(days=HOLD_PICKUP_DAYS)
+        self.db.execute_query("""
+            UPDATE reservations
+            SET status = 'Ready', ready_at = %s, expires_at = %s
+            WHERE reservation_id = %s AND status = 'Waiting'
+        """, (now, expires_at, head['reservation_id']))
+        self.db.execute_query("UPDATE books SET status = 'On Hold', updated_at = %s WHERE book_id = %s",
+                              (now, book_id))
+
+        head['status'] = 'Ready'
+        head['ready_at'] = now
+        head['expires_at'] = expires_at
+        return head
+
+    def can_issue(self, book, member_id):
+        # Check whether a book may be issued to a member, returns (allowed, ready_hold)
+        if book['status'] == 'Available':
+            return True, None
+        if book['status'] != 'On Hold':
+            return False, None
+
+        hold = self.ready_hold(book['book_id'])
+        if hold and hold['member_id'] == member_id:
+            return True, hold
+        return False, hold
+
+    def fulfil(self, reservation_id):
+        # Mark a Ready hold as picked up
+        return self.db.execute_query(
+            "UPDATE reservations SET status = 'Fulfilled' WHERE reservation_id = %s AND status = 'Ready'",
+            (reservation_id,))
+
+    def cancel(self, reservation_id):
+        # Cancel a hold; a cancelled Ready hold passes the copy on to the next patron
+        hold = self.db.fetch_one("SELECT * FROM reservations WHERE reservation_id = %s", (reservation_id,))
+        if not hold or hold['status'] not in ('Waiting', 'Ready'):
+            return False
+
+        self.db.execute_query("UPDATE reservations SET status = 'Cancelled' WHERE reservation_id = %s",
+                              (reservation_id,))
+        if hold['status'] == 'Ready':
+            self.release_book(hold['book_id'])
+        return True
+
+    def expire_holds(self, now=None):
+        # Expire Ready holds that were not picked up and move each copy down its queue
+        now = now or datetime.now()
+        expired = self.db.fetch_all("""
+            SELECT reservation_id, book_id FROM reservations
+            WHERE status = 'Ready' AND expires_at < %s
+        """, (now,))
+
+        for hold in expired:
+            self.db.execute_query(
+                "UPDATE reservations SET status = 'Expired' WHERE reservation_id = %s AND status = 'Ready'",
+                (hold['reservation_id'],))
+            self.release_book(hold['book_id'], now)
+
+        return len(expired)
+
+    def waiting_count(self, book_id):
+        # Number of patrons waiting for a book
+        result = self.db.fetch_one(
+            "SELECT COUNT(*) AS count FROM reservations WHERE book_id = %s AND status = 'Waiting'",
+            (book_id,))
+        return result['count'] if result else 0
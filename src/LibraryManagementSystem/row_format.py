@@ -0,0 +1,60 @@
+# row_format.py
+
+from operator import itemgetter
+from configuration import FORMAT_CACHE_SIZE
+from utilities import format_currency
+
+class ColumnFormat:
+    # Formats a whole column of values at once. Each distinct value is converted once and
+    # remembered, so the thousands of rows sharing a due date, fine amount or loan count
+    # cost one dict lookup each instead of a strftime/format call.
+
+    def __init__(self, convert, default=""):
+        self.convert = convert
+        self.default = default
+        self.cache = {None: default}
+
+    def __call__(self, values):
+        cache = self.cache
+        if len(cache) > FORMAT_CACHE_SIZE:
+            cache.clear()
+            cache[None] = self.default
+        for value in set(values).difference(cache):
+            cache[value] = self.convert(value)
+        return list(map(cache.__getitem__, values))
+
+def timestamp_column():
+    # Same text as strftime('%Y-%m-%d %H:%M:%S'), several times faster
+    return ColumnFormat(lambda value: value.isoformat(' ', 'seconds'))
+
+def date_column(default=""):
+    return ColumnFormat(lambda value: value.isoformat(), default)
+
+def currency_column():
+    return ColumnFormat(format_currency, format_currency(0))
+
+def count_column(singular, plural):
+    # 1 -> '1 book', 3 -> '3 books'
+    return ColumnFormat(lambda value: f"{value} {singular if value == 1 else plural}", f"0 {plural}")
+
+class RowFormat:
+    """Turns fetched row dicts into Treeview value tuples a batch at a time.
+
+    columns are (key, ColumnFormat or None) pairs in display order; None passes the value
+    through unchanged. Rows are transposed into one tuple per column, each formatted
+    column is converted in a single pass, and the columns are zipped back into rows.
+    """
+
+    def __init__(self, *columns):
+        self.keys = [key for key, _ in columns]
+        self.formats = [(index, column_format) for index, (_, column_format) in enumerate(columns) if column_format]
+        # itemgetter with a single key returns the bare value rather than a 1-tuple
+        self.getter = itemgetter(*self.keys) if len(self.keys) > 1 else lambda row: (row[self.keys[0]],)
+
+    def format_rows(self, rows):
+        if not rows:
+            return []
+        columns = list(zip(*map(self.getter, rows)))
+        for index, column_format in self.formats:
+            columns[index] = column_format(columns[index])
+        return list(zip(*columns))
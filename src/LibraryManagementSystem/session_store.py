@@ -0,0 +1,92 @@
+# session_store.py
+
+import secrets
+import time
+from tkinter import messagebox
+from configuration import ROLE_PERMISSIONS, DEFAULT_ROLE, SESSION_IDLE_TIMEOUT_SECONDS
+
+class Session:
+    # A signed-in librarian: identity, roles and the permissions they grant, resolved once
+    # at login so permission checks are set lookups instead of librarians queries.
+
+    def __init__(self, token, librarian_id, username, roles):
+        self.token = token
+        self.librarian_id = librarian_id
+        self.username = username
+        self.roles = frozenset(roles) or frozenset([DEFAULT_ROLE])
+        self.permissions = frozenset(permission for role in self.roles for permission in ROLE_PERMISSIONS.get(role, ()))
+        self.started_at = time.monotonic()
+        self.last_activity = self.started_at
+
+    def can(self, permission):
+        return permission in self.permissions
+
+    def touch(self):
+        self.last_activity = time.monotonic()
+
+    @property
+    def idle_seconds(self):
+        return time.monotonic() - self.last_activity
+
+class SessionStore:
+    # In-memory sessions by token. A desk has one current session; more can be open at once
+    # (for example simulated desks), each expiring after SESSION_IDLE_TIMEOUT_SECONDS idle.
+
+    def __init__(self, idle_timeout=SESSION_IDLE_TIMEOUT_SECONDS):
+        self.idle_timeout = idle_timeout
+        self.sessions = {}
+        self.current = None
+
+    def create(self, librarian_id, username, roles=(), make_current=True):
+        session = Session(secrets.token_hex(16), librarian_id, username, roles)
+        self.sessions[session.token] = session
+        if make_current:
+            self.current = session
+        return session
+
+    def get(self, token):
+        # Session for token, None if it never existed, ended or has been idle too long
+        session = self.sessions.get(token)
+        if session is not None and session.idle_seconds > self.idle_timeout:
+            self.end(session)
+            return None
+        return session
+
+    def end(self, session):
+        if session is None:
+            return
+        self.sessions.pop(session.token, None)
+        if self.current is session:
+            self.current = None
+
+    def touch(self):
+        # User activity on this desk
+        if self.current is not None:
+            self.current.touch()
+
+    def expire_idle(self):
+        # End idle sessions, returns them (the current one first if it expired)
+        expired = [session for session in self.sessions.values() if session.idle_seconds > self.idle_timeout]
+        expired.sort(key=lambda session: session is not self.current)
+        for session in expired:
+            self.end(session)
+        return expired
+
+    def can(self, permission):
+        # Whether the current session grants permission (no session grants nothing)
+        return self.current is not None and self.current.can(permission)
+
+# Sessions of this client
+SESSIONS = SessionStore()
+
+def parse_roles(value):
+    # GROUP_CONCAT roles column ('admin,librarian' or None) -> set of roles
+    return {role for role in (value or '').split(',') if role}
+
+def require(permission, parent=None):
+    """True if the signed-in librarian has permission, otherwise explain why the action is blocked"""
+    if SESSIONS.can(permission):
+        return True
+    messagebox.showerror("Permission Denied",
+                         f"Your account is not allowed to {permission.replace('_', ' ')}.", parent=parent)
+    return False
@@ -0,0 +1,113 @@
+# statistics_benchmark.py
+
+import argparse
+import random
+import statistics
+import time
+from datetime import date, timedelta
+import mysql.connector
+from configuration import DB_CONFIG
+from database import Database
+from library_reports import STATISTICS_QUERY, STATISTICS_SNAPSHOT, ReportsAnalytics
+
+# Five-query version that get_statistics used before the single aggregate query
+PER_QUERY_STATISTICS = [
+    "SELECT COUNT(*) as count FROM members WHERE status = 'Active'",
+    "SELECT COUNT(*) as count FROM members WHERE status = 'Inactive'",
+    "SELECT COUNT(*) as count FROM borrowed_books WHERE status = 'Borrowed'",
+    "SELECT COUNT(*) as count FROM borrowed_books WHERE status = 'Overdue'",
+    "SELECT SUM(fine_amount) as total FROM borrowed_books WHERE status IN ('Overdue', 'Borrowed')"]
+
+SEED_BATCH_SIZE = 10000
+
+def connect_bench_db(name):
+    # Database object pointed at a separate benchmark schema, never the live one
+    server = mysql.connector.connect(host=DB_CONFIG['host'], user=DB_CONFIG['user'], password=DB_CONFIG['password'])
+    server.cursor().execute(f"CREATE DATABASE IF NOT EXISTS {name}")
+    server.close()
+
+    # Private in-memory offline queue: the desk's queued writes are never replayed here, and
+    # nothing written here is queued for the live database
+    db = Database({**DB_CONFIG, 'database': name}, ':memory:')
+    if not db.connect():
+        raise SystemExit(f"Cannot connect to the benchmark schema {name}")
+    db.create_tables()
+    return db
+
+def seed(db, loans, members=50000, books=100000, seed_value=42):
+    # Fill the benchmark schema with random members, books and loans
+    rng = random.Random(seed_value)
+    existing = db.fetch_one("SELECT COUNT(*) AS count FROM borrowed_books")
+    if existing and existing['count'] >= loans:
+        print(f"Benchmark data already has {existing['count']} loans")
+        return
+
+    print(f"Seeding {members} members, {books} books and {loans} loans...")
+    db.execute_batch([("""
+        INSERT IGNORE INTO members (member_id, full_name, email, mobile_number, status)
+        VALUES (%s, %s, %s, %s, %s)
+    """, [(f"MEM-{i:06d}", f"Member {i}", f"member{i}@bench.local", "+63 917 000 0000",
+           'Active' if rng.random() < 0.8 else 'Inactive') for i in range(1, members + 1)])])
+    db.execute_batch([("""
+        INSERT IGNORE INTO books (book_id, title, author, isbn, category, status)
+        VALUES (%s, %s, %s, %s, 'Fiction', 'Available')
+    """, [(f"BK-{i:06d}", f"Book {i}", f"Author {i % 5000}", f"{9780000000000 + i}") for i in range(1, books + 1)])])
+
+    start = date.today() - timedelta(days=3 * 365)
+    query = """
+    INSERT INTO borrowed_books (book_id, member_id, borrow_date, due_date, return_date, status, fine_amount)
+    VALUES (%s, %s, %s, %s, %s, %s, %s)
+    """
+    for offset in range(0, loans, SEED_BATCH_SIZE):
+        rows = []
+        for _ in range(min(SEED_BATCH_SIZE, loans - offset)):
+            borrow_date = start + timedelta(days=rng.randrange(3 * 365))
+            due_date = borrow_date + timedelta(days=14)
+            status = rng.choices(['Returned', 'Borrowed', 'Overdue', 'Lost'], [85, 8, 6, 1])[0]
+            fine = rng.randrange(0, 3000, 100) if status in ('Overdue', 'Lost') else 0
+            rows.append((f"BK-{rng.randrange(1, books + 1):06d}", f"MEM-{rng.randrange(1, members + 1):06d}",
+                         borrow_date, due_date, due_date if status == 'Returned' else None, status, fine))
+        db.execute_batch([(query, rows)])
+        print(f"  {offset + len(rows)} loans")
+
+def time_runs(func, runs):
+    # Wall-clock timings in milliseconds
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - started) * 1000)
+    return timings
+
+def percentile(timings, fraction):
+    ordered = sorted(timings)
+    return ordered[min(int(len(ordered) * fraction), len(ordered) - 1)]
+
+def report(label, timings):
+    print(f"{label:<28} median {statistics.median(timings):9.2f} ms   p95 {percentile(timings, 0.95):9.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the statistics card queries")
+    parser.add_argument('--loans', type=int, default=5000000)
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--database', default=f"{DB_CONFIG['database']}_bench")
+    args = parser.parse_args()
+
+    db = connect_bench_db(args.database)
+    seed(db, args.loans)
+    reports = ReportsAnalytics(None, db)
+
+    # Five separate COUNT/SUM queries
+    report("five queries", time_runs(lambda: [db.fetch_one(q) for q in PER_QUERY_STATISTICS], args.runs))
+
+    # Single conditional-sum query
+    report("single aggregate query", time_runs(lambda: db.fetch_one(STATISTICS_QUERY), args.runs))
+
+    # Snapshot hits after the first load
+    STATISTICS_SNAPSHOT.invalidate()
+    report("snapshot (TTL hit)", time_runs(reports.get_statistics, args.runs))
+
+    db.close()
+
+if __name__ == "__main__":
+    main()
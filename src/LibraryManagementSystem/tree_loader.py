@@ -0,0 +1,70 @@
+# tree_loader.py
+
+from configuration import TREE_FIRST_CHUNK, TREE_CHUNK_SIZE, TREE_CHUNK_DELAY_MS, TREE_HIDDEN_POLL_MS
+from ui_profiler import UI_PROFILER
+
+class TreeLoader:
+    # Fills a Treeview progressively: the first screenful is inserted at once, the rest in
+    # chunks scheduled with after() so the event loop keeps handling input between them.
+    # A new load() cancels the one in progress; while the page is hidden the remaining
+    # chunks wait instead of inserting into an invisible tree.
+
+    def __init__(self, tree, first_chunk=TREE_FIRST_CHUNK, chunk_size=TREE_CHUNK_SIZE):
+        self.tree = tree
+        self.first_chunk = first_chunk
+        self.chunk_size = chunk_size
+        self.rows = None
+        self.row_format = None
+        self.iid_key = None
+        self.position = 0
+        self.job = None
+
+    @property
+    def loading(self):
+        return self.rows is not None
+
+    def load(self, rows, row_format, iid_key=None):
+        # Replace the tree's rows with the RowFormat values of rows (iid taken from row[iid_key] if given)
+        self.cancel()
+        self.tree.delete(*self.tree.get_children())
+        self.rows, self.row_format, self.iid_key, self.position = rows, row_format, iid_key, 0
+        self._insert_chunk(self.first_chunk)
+
+    def cancel(self):
+        # Stop inserting the remaining rows
+        if self.job is not None:
+            self.tree.after_cancel(self.job)
+            self.job = None
+        self.rows = None
+
+    def _insert_chunk(self, size):
+        self.job = None
+        if self.rows is None or not self.tree.winfo_exists():
+            self.rows = None
+            return
+
+        # Hidden page: check again later rather than inserting rows nobody can see
+        if self.position and not self.tree.winfo_viewable():
+            self.job = self.tree.after(TREE_HIDDEN_POLL_MS, self._insert_chunk, size)
+            return
+
+        end = min(self.position + size, len(self.rows))
+        chunk = self.rows[self.position:end]
+        # Chunks after the first run outside the action that started the load
+        with UI_PROFILER.action('TreeLoader.chunk'):
+            with UI_PROFILER.phase('format'):
+                formatted = self.row_format.format_rows(chunk)
+            with UI_PROFILER.phase('insert'):
+                insert = self.tree.insert
+                if self.iid_key is None:
+                    for values in formatted:
+                        insert('', 'end', values=values)
+                else:
+                    for row, values in zip(chunk, formatted):
+                        insert('', 'end', iid=row[self.iid_key], values=values)
+        self.position = end
+
+        if end < len(self.rows):
+            self.job = self.tree.after(TREE_CHUNK_DELAY_MS, self._insert_chunk, self.chunk_size)
+        else:
+            self.rows = None
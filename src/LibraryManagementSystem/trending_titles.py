@@ -0,0 +1,168 @@
+# trending_titles.py
+
+import threading
+from collections import Counter
+from datetime import date, timedelta
+from configuration import TRENDING_CAPACITY, TRENDING_WINDOW_DAYS
+
+# Adds this desk's unsaved checkouts onto the shared day buckets, so several desks can persist
+# into the same table without overwriting each other
+PERSIST_BUCKET = """
+INSERT INTO trending_buckets (bucket_date, book_id, loans) VALUES (%s, %s, %s)
+ON DUPLICATE KEY UPDATE loans = loans + VALUES(loans)
+"""
+SEED_BUCKET = "INSERT IGNORE INTO trending_buckets (bucket_date, book_id, loans) VALUES (%s, %s, %s)"
+
+class SpaceSaving:
+    # Space-Saving heavy-hitters summary: at most `capacity` counters, each count
+    # over-estimates the true count by at most its error. Any item with more than
+    # total/capacity occurrences is guaranteed to be kept.
+
+    def __init__(self, capacity=TRENDING_CAPACITY):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+
+    def offer(self, item, weight=1):
+        if item in self.counts:
+            self.counts[item] += weight
+            return
+
+        if len(self.counts) < self.capacity:
+            self.counts[item] = weight
+            self.errors[item] = 0
+            return
+
+        # Replace the smallest counter, inheriting its count as the error
+        smallest = min(self.counts, key=self.counts.get)
+        floor = self.counts.pop(smallest)
+        del self.errors[smallest]
+        self.counts[item] = floor + weight
+        self.errors[item] = floor
+
+    def __len__(self):
+        return len(self.counts)
+
+class TrendingTitles:
+    # Trending titles over the last TRENDING_WINDOW_DAYS days, fed with checkout events.
+    # One SpaceSaving summary per day keeps memory at (days x capacity) counters; a window
+    # is answered by merging its day summaries. The summaries hold every desk's checkouts as
+    # saved in trending_buckets plus this desk's unsaved ones; checkouts since the last
+    # persist() are also kept in pending so they can be added to trending_buckets in one batch.
+    # sync() runs on the maintenance worker while the UI thread records checkouts, so the
+    # summaries and pending are only touched under the lock.
+
+    def __init__(self, capacity=TRENDING_CAPACITY, days=max(TRENDING_WINDOW_DAYS)):
+        self.capacity = capacity
+        self.days = days
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.pending = Counter()
+        self.loaded = False
+
+    def record(self, book_id, day=None):
+        # Count one checkout
+        day = day or date.today()
+        if day <= date.today() - timedelta(days=self.days):
+            return
+        with self.lock:
+            self.buckets.setdefault(day, SpaceSaving(self.capacity)).offer(book_id)
+            self.pending[(day, book_id)] += 1
+
+    def expire(self, today=None):
+        # Drop day summaries that have left the longest window
+        cutoff = (today or date.today()) - timedelta(days=self.days)
+        with self.lock:
+            for day in [day for day in self.buckets if day <= cutoff]:
+                del self.buckets[day]
+
+    def top(self, window_days=7, limit=10, today=None):
+        # [(book_id, estimated loans, max over-estimate)] for the last window_days days
+        today = today or date.today()
+        first_day = today - timedelta(days=window_days - 1)
+        counts, errors = Counter(), Counter()
+        with self.lock:
+            for day, summary in self.buckets.items():
+                if first_day <= day <= today:
+                    counts.update(summary.counts)
+                    errors.update(summary.errors)
+        return [(book_id, loans, errors[book_id]) for book_id, loans in counts.most_common(limit)]
+
+    def _saved_rows(self, db, cutoff):
+        return db.fetch_all("""
+            SELECT bucket_date, book_id, loans FROM trending_buckets
+            WHERE bucket_date > %s
+            ORDER BY bucket_date, loans DESC
+        """, (cutoff,))
+
+    def _seed(self, db, cutoff):
+        # First use: copy the rollup days before the rollups' last refresh day, which hold every
+        # loan of those days. INSERT IGNORE keeps desks seeding at the same time from adding twice.
+        state = db.fetch_one("SELECT refreshed_at FROM rollup_state WHERE name = 'daily'")
+        if not state:
+            return []
+        watermark = state['refreshed_at'].date()
+        rows = db.fetch_all("""
+            SELECT loan_date AS bucket_date, book_id, loans FROM book_daily_loans
+            WHERE loan_date > %s AND loan_date < %s
+        """, (cutoff, watermark))
+        if not rows:
+            return []
+        db.execute_batch([(SEED_BUCKET, [(row['bucket_date'], row['book_id'], row['loans']) for row in rows])])
+
+        # This desk's unsaved checkouts on seeded days are already in the rollups
+        with self.lock:
+            for key in [key for key in self.pending if key[0] < watermark]:
+                del self.pending[key]
+        return self._saved_rows(db, cutoff)
+
+    def load(self, db):
+        # Rebuild the day summaries from trending_buckets and the unsaved checkouts
+        if db.offline and self.loaded:
+            return
+        cutoff = date.today() - timedelta(days=self.days)
+        rows = self._saved_rows(db, cutoff)
+        if not rows and not db.offline:
+            rows = self._seed(db, cutoff)
+
+        buckets = {}
+        for row in rows:
+            buckets.setdefault(row['bucket_date'], SpaceSaving(self.capacity)).offer(row['book_id'], int(row['loans']))
+
+        # Checkouts not saved yet, including those recorded while the rows were read
+        with self.lock:
+            for (day, book_id), loans in self.pending.items():
+                buckets.setdefault(day, SpaceSaving(self.capacity)).offer(book_id, loans)
+            self.buckets = buckets
+            self.loaded = not db.offline
+
+    def persist(self, db):
+        # Add pending checkouts to trending_buckets and prune expired days, returns the number saved
+        self.expire()
+        if db.offline:
+            return 0
+
+        cutoff = date.today() - timedelta(days=self.days)
+        with self.lock:
+            saving = Counter({key: loans for key, loans in self.pending.items() if key[0] > cutoff})
+        batches = [("DELETE FROM trending_buckets WHERE bucket_date <= %s", [(cutoff,)])]
+        if saving:
+            batches.append((PERSIST_BUCKET, [(day, book_id, loans) for (day, book_id), loans in saving.items()]))
+
+        if not db.execute_batch(batches):
+            return 0
+        # Checkouts recorded while saving stay pending
+        with self.lock:
+            self.pending.subtract(saving)
+            self.pending = +self.pending
+            for key in [key for key in self.pending if key[0] <= cutoff]:
+                del self.pending[key]
+        return len(saving)
+
+    def sync(self, db):
+        # Maintenance job: save this desk's checkouts, then pick up every desk's saved counts
+        self.persist(db)
+        self.load(db)
+
+# Shared by the circulation desk (which feeds it) and the reports page (which reads it)
+TRENDING_TITLES = TrendingTitles()
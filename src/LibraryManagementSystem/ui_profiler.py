@@ -0,0 +1,173 @@
+# ui_profiler.py
+
+import csv
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+import tkinter as tk
+from configuration import (UI_PROFILE_ENV, UI_PROFILE_DIR, UI_PROFILE_HEARTBEAT_MS, UI_PROFILE_LAG_THRESHOLD_MS,
+                           UI_PROFILE_LAG_WINDOW)
+from action_profiler import ACTION_PROFILER
+
+# Page and Dashboard methods timed as UI actions
+PROFILED_PREFIXES = ('show', 'refresh', 'load_', 'search_', 'get_', 'render_', 'view_', 'add_', 'update_',
+                     'delete_', 'import_', 'issue_', 'return_')
+
+# Database methods whose time is counted as the action's DB phase
+PROFILED_DB_METHODS = ('execute_query', 'execute_transaction', 'execute_batch', 'fetch_all', 'fetch_columns',
+                       'fetch_one')
+
+PHASES = ('db', 'format', 'insert')
+TRACE_COLUMNS = ['time', 'kind', 'name', 'total_ms', 'db_ms', 'format_ms', 'insert_ms', 'other_ms', 'db_calls']
+
+class UIProfiler:
+    # Opt-in instrumentation for the Tk client. Each UI action (a wrapped page or Dashboard
+    # method on the main thread) is split into DB time, row formatting and Treeview insertion,
+    # the rest being widget building and other Python. A heartbeat after() probe measures how
+    # late the event loop runs it. Results go to a small overlay and a CSV trace.
+    # Action methods are always wrapped so ACTION_PROFILER can be armed at runtime;
+    # disabled, action() and phase() are no-op contexts.
+
+    def __init__(self):
+        self.enabled = False
+        self.root = None
+        self.overlay = None
+        self.trace_file = None
+        self.trace = None
+        self.main_thread = threading.main_thread()
+        self.current = None         # phase totals of the outermost running action
+        self.open_phase = None
+        self.last_action = None
+        self.lags = deque(maxlen=UI_PROFILE_LAG_WINDOW)
+        self.expected_beat = None
+
+    def start(self, root, db):
+        # Turn profiling on for this process: trace file, DB timing, overlay and heartbeat
+        os.makedirs(UI_PROFILE_DIR, exist_ok=True)
+        path = os.path.join(UI_PROFILE_DIR, f"ui_trace_{datetime.now():%Y%m%d_%H%M%S}.csv")
+        self.trace_file = open(path, 'w', newline='', encoding='utf-8', buffering=1)
+        self.trace = csv.writer(self.trace_file)
+        self.trace.writerow(TRACE_COLUMNS)
+
+        self.enabled = True
+        self.root = root
+        for name in PROFILED_DB_METHODS:
+            setattr(db, name, self._timed_db(getattr(db, name)))
+        self.expected_beat = time.perf_counter() + UI_PROFILE_HEARTBEAT_MS / 1000
+        root.after(UI_PROFILE_HEARTBEAT_MS, self._heartbeat)
+        print(f"UI profiling enabled, trace: {path}")
+
+    def stop(self):
+        self.enabled = False
+        if self.trace_file:
+            self.trace_file.close()
+            self.trace_file = self.trace = None
+
+    def instrument(self, obj):
+        # Wrap obj's public action methods; call before the widgets bind them as commands
+        owner = type(obj).__name__
+        for name in dir(type(obj)):
+            if name.startswith(PROFILED_PREFIXES) and callable(getattr(type(obj), name)):
+                setattr(obj, name, self.wrap_action(f"{owner}.{name}", getattr(obj, name)))
+        return obj
+
+    def wrap_action(self, name, func):
+        # func timed as the UI action `name` and captured by ACTION_PROFILER while it is armed
+        @functools.wraps(func)
+        def timed(*args, **kwargs):
+            with self.action(name):
+                return ACTION_PROFILER.call(name, func, *args, **kwargs)
+        return timed
+
+    def action(self, name):
+        # Context timing one UI action; nested actions count towards the outermost one
+        if not self.enabled or self.current is not None or threading.current_thread() is not self.main_thread:
+            return nullcontext()
+        return self._action(name)
+
+    def phase(self, kind):
+        # Context adding its time to `kind` of the running action
+        if self.current is None or self.open_phase is not None \
+                or threading.current_thread() is not self.main_thread:
+            return nullcontext()
+        return self._phase(kind)
+
+    @contextmanager
+    def _action(self, name):
+        self.current = dict.fromkeys(PHASES, 0.0)
+        self.current['db_calls'] = 0
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            total = (time.perf_counter() - started) * 1000
+            phases, self.current = self.current, None
+            self._record('action', name, total, phases)
+
+    @contextmanager
+    def _phase(self, kind):
+        self.open_phase = kind
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.current[kind] += (time.perf_counter() - started) * 1000
+            self.open_phase = None
+
+    def _timed_db(self, method):
+        @functools.wraps(method)
+        def timed(*args, **kwargs):
+            if self.current is not None and self.open_phase is None \
+                    and threading.current_thread() is self.main_thread:
+                self.current['db_calls'] += 1
+            with self.phase('db'):
+                return method(*args, **kwargs)
+        return timed
+
+    def _record(self, kind, name, total, phases=None):
+        phases = phases or {}
+        timings = [phases.get(phase, 0.0) for phase in PHASES]
+        other = max(total - sum(timings), 0.0)
+        if kind == 'action':
+            self.last_action = (name, total, *timings, other)
+        if self.trace:
+            self.trace.writerow([datetime.now().isoformat(timespec='milliseconds'), kind, name, f"{total:.2f}",
+                                 *(f"{value:.2f}" for value in timings), f"{other:.2f}", phases.get('db_calls', 0)])
+
+    def _heartbeat(self):
+        # Lag is how much later than scheduled this callback ran: time Tk spent busy elsewhere
+        if not self.enabled:
+            return
+        now = time.perf_counter()
+        lag = max((now - self.expected_beat) * 1000, 0.0)
+        self.lags.append(lag)
+        if lag >= UI_PROFILE_LAG_THRESHOLD_MS:
+            self._record('lag', 'event loop', lag)
+        self._update_overlay()
+        self.expected_beat = now + UI_PROFILE_HEARTBEAT_MS / 1000
+        self.root.after(UI_PROFILE_HEARTBEAT_MS, self._heartbeat)
+
+    def _update_overlay(self):
+        # Pages clear the root window's children, so the overlay is recreated when it is gone
+        if self.overlay is None or not self.overlay.winfo_exists():
+            self.overlay = tk.Label(self.root, font=('Consolas', 9), bg='#000000', fg='#9EF01A',
+                                    justify='left', anchor='w', padx=6, pady=3)
+        lines = [f"loop lag  now {self.lags[-1]:5.0f} ms   max {max(self.lags):5.0f} ms"]
+        if self.last_action:
+            name, total, db_ms, format_ms, insert_ms, other = self.last_action
+            lines.append(f"{name}  {total:.0f} ms")
+            lines.append(f"db {db_ms:.0f} | format {format_ms:.0f} | insert {insert_ms:.0f} | other {other:.0f} ms")
+        self.overlay.configure(text="\n".join(lines))
+        self.overlay.place(relx=1.0, rely=1.0, anchor='se')
+        self.overlay.lift()
+
+# Shared by the dashboard, the pages and the table loader
+UI_PROFILER = UIProfiler()
+
+def profiling_requested():
+    # Profiling is opt-in through the environment, e.g. LMS_UI_PROFILE=1
+    return os.environ.get(UI_PROFILE_ENV, '').lower() in ('1', 'true', 'yes', 'on')
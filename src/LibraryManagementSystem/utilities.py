@@ -2,6 +2,11 @@
 
 from datetime import datetime, timedelta
 import re
+from configuration import OVERDUE_FINE_PER_DAY
+
+# Precompiled so bulk validation does not go through the re cache per row
+EMAIL_PATTERN = re.compile(r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$')
+MOBILE_PATTERN = re.compile(r'^\+63\s9\d{2}\s\d{3}\s\d{4}$')
 
 def generate_id(prefix, last_id):
     """Generate new ID with prefix (e.g., BK-001, MEM-001)"""
@@ -17,19 +22,17 @@ def generate_id(prefix, last_id):
 
 def validate_email(email):
     """Validate email format"""
-    pattern = r'^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$'
-    return re.match(pattern, email) is not None
+    return EMAIL_PATTERN.match(email) is not None
 
 
 def validate_mobile(mobile):
     """Validate mobile number format"""
     # Philippine mobile format: +63 9XX XXX XXXX
-    pattern = r'^\+63\s9\d{2}\s\d{3}\s\d{4}$'
-    return re.match(pattern, mobile) is not None
+    return MOBILE_PATTERN.match(mobile) is not None
 
 
-def calculate_fine(due_date, return_date, daily_rate=50):
-    """Calculate fine for overdue books (₱50 per day)"""
+def calculate_fine(due_date, return_date, daily_rate=OVERDUE_FINE_PER_DAY):
+    """Calculate fine for overdue books (OVERDUE_FINE_PER_DAY per day)"""
     if not return_date:
         return_date = datetime.now().date()
 
@@ -72,4 +75,27 @@ def validate_isbn(isbn):
     isbn = isbn.replace('-', '').replace(' ', '')
 
     # Check if it's 10 or 13 digits
-    return len(isbn) in [10, 13] and isbn.isdigit()
\ No newline at end of file
+    return len(isbn) in [10, 13] and isbn.isdigit()
+
+def normalize_email(email):
+    """Lowercased email used as the indexed search key"""
+    return email.strip().lower()
+
+
+def normalize_mobile(mobile):
+    """Digits-only mobile number used as the indexed search key (e.g. 639171234567)"""
+    digits = re.sub(r'\D', '', mobile)
+    # Local 09XX form is stored in the same international form as +63 9XX
+    if digits.startswith('09'):
+        digits = '63' + digits[1:]
+    return digits
+
+
+def normalize_name(name):
+    """Lowercased, single-spaced full name used as the indexed search key"""
+    return ' '.join(name.lower().split())
+
+
+def name_tokens(name):
+    """Distinct lowercased name words for prefix search (e.g. 'Ana Dela Cruz' -> {'ana', 'dela', 'cruz'})"""
+    return {token[:50] for token in re.split(r"[^\w'-]+", normalize_name(name)) if token}
@@ -0,0 +1,7 @@
+# conftest.py
+
+import os
+import sys
+
+# The application modules import each other as top-level modules (python main_system.py)
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir, 'src', 'LibraryManagementSystem'))
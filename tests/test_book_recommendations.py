@@ -0,0 +1,147 @@
+# test_book_recommendations.py
+
+import math
+from collections import Counter, defaultdict
+import numpy as np
+import book_recommendations
+from book_recommendations import BookRecommender, co_borrowing
+
+def random_pairs(n_members, n_books, n_pairs, seed):
+    # Distinct (member, book) codes in random (not member-sorted) order
+    rng = np.random.default_rng(seed)
+    pairs = np.unique(np.stack([rng.integers(0, n_members, n_pairs), rng.integers(0, n_books, n_pairs)], axis=1), axis=0)
+    rng.shuffle(pairs)
+    return pairs[:, 0].astype(np.int64), pairs[:, 1].astype(np.int64)
+
+def brute_force(members, books, limit):
+    # {target: [(neighbour, score)]} from per-member loops, best first, ties by neighbour
+    shelves = defaultdict(set)
+    for member, book in zip(members.tolist(), books.tolist()):
+        shelves[member].add(book)
+    popularity = Counter(books.tolist())
+    co = Counter()
+    for shelf in shelves.values():
+        for a in shelf:
+            for b in shelf:
+                if a != b:
+                    co[(a, b)] += 1
+    expected = defaultdict(list)
+    for (a, b), count in co.items():
+        expected[a].append((b, count / math.sqrt(popularity[a] * popularity[b])))
+    return {a: sorted(neighbours, key=lambda item: (-item[1], item[0]))[:limit] for a, neighbours in expected.items()}
+
+def as_lists(result):
+    # co_borrowing arrays -> {target: [(neighbour, score)]} in position order
+    lists = defaultdict(list)
+    for target, neighbour, score, position in sorted(zip(*[column.tolist() for column in result]),
+                                                     key=lambda row: (row[0], row[3])):
+        assert position == len(lists[target])
+        lists[target].append((neighbour, score))
+    return dict(lists)
+
+def assert_same(actual, expected):
+    assert actual.keys() == expected.keys()
+    for target, neighbours in expected.items():
+        assert [b for b, _ in actual[target]] == [b for b, _ in neighbours]
+        assert np.allclose([s for _, s in actual[target]], [s for _, s in neighbours])
+
+def test_csr_expansion_matches_per_member_loops():
+    members, books = random_pairs(60, 40, 600, seed=3)
+    result = co_borrowing(members, books, np.arange(40), limit=5)
+    assert_same(as_lists(result), brute_force(members, books, 5))
+
+def test_batches_use_the_same_offsets(monkeypatch):
+    # Several target batches, each expanding its own pairs through the shared CSR offsets
+    members, books = random_pairs(80, 50, 900, seed=4)
+    expected = as_lists(co_borrowing(members, books, np.arange(50), limit=4))
+    monkeypatch.setattr(book_recommendations, 'RECOMMENDATION_BATCH_SIZE', 7)
+    assert_same(as_lists(co_borrowing(members, books, np.arange(50), limit=4)), expected)
+
+def test_members_without_loans_leave_empty_csr_rows():
+    # Member codes 1 and 3 have no pairs, so their indptr ranges are empty
+    members = np.array([4, 0, 2, 0, 4, 2], dtype=np.int64)
+    books = np.array([1, 0, 1, 1, 2, 2], dtype=np.int64)
+    assert_same(as_lists(co_borrowing(members, books, [0, 1, 2])), brute_force(members, books, 10))
+
+def test_no_pairs_or_targets_gives_empty_arrays():
+    empty = np.empty(0, np.int64)
+    assert all(len(column) == 0 for column in co_borrowing(empty, empty, [0]))
+    assert all(len(column) == 0 for column in co_borrowing(np.array([0]), np.array([0]), []))
+
+def test_compute_maps_codes_back_to_ids():
+    member_ids = ['MEM-001', 'MEM-001', 'MEM-002', 'MEM-002', 'MEM-003']
+    book_ids = ['BK-A', 'BK-B', 'BK-A', 'BK-C', 'BK-B']
+    rows = BookRecommender(None)._compute(member_ids, book_ids, None)
+
+    by_book = defaultdict(list)
+    for book_id, position, similar_book_id, score in rows:
+        by_book[book_id].append((position, similar_book_id, round(score, 6)))
+    # A and B share MEM-001 (borrowers 2 and 2), A and C share MEM-002 (2 and 1)
+    assert sorted(by_book['BK-A']) == [(0, 'BK-C', round(1 / math.sqrt(2), 6)), (1, 'BK-B', 0.5)]
+    assert by_book['BK-B'] == [(0, 'BK-A', 0.5)]
+    assert by_book['BK-C'] == [(0, 'BK-A', round(1 / math.sqrt(2), 6))]
+
+class LoansDb:
+    # borrowed_books, book_recommendations and rollup_state in lists and dicts, answering BookRecommender's queries
+    offline = False
+
+    def __init__(self, loans):
+        self.loans = list(loans)   # (borrow_id, member_id, book_id)
+        self.lists = {}
+        self.state = None
+
+    def pairs(self, members=None, last_id=None):
+        pairs = sorted({(member, book) for borrow_id, member, book in self.loans
+                        if (members is None or member in members) and (last_id is None or borrow_id <= last_id)})
+        return [member for member, _ in pairs], [book for _, book in pairs]
+
+    def fetch_one(self, query, params=None):
+        if 'FROM rollup_state' in query:
+            return self.state
+        return {'last_id': max(borrow_id for borrow_id, _, _ in self.loans), 'now': None}
+
+    def fetch_columns(self, query, params):
+        if 'borrow_id >' in query:
+            new = [(member, book) for borrow_id, member, book in self.loans if params[0] < borrow_id <= params[1]]
+            affected = set(self.pairs({member for member, _ in new})[1])
+            if 'FROM book_recommendations' in query:
+                affected |= {book for book, rows in self.lists.items() if any(row[2] in {b for _, b in new} for row in rows)}
+            return (list(affected),)
+        if 'WHERE book_id IN' in query:
+            return self.pairs({member for _, member, book in self.loans if book in params})
+        return self.pairs(last_id=params[0])
+
+    def fetch_all(self, query, params):
+        borrowers = Counter(book for member, book in zip(*self.pairs()))
+        return [{'book_id': book, 'borrowers': borrowers[book]} for book in params if book in borrowers]
+
+    def execute_batch(self, batches):
+        for query, rows in batches:
+            if query.startswith('DELETE'):
+                for book in (rows[0] if 'WHERE' in query else list(self.lists)):
+                    self.lists.pop(book, None)
+            elif 'book_recommendations' in query:
+                for row in rows:
+                    self.lists.setdefault(row[0], []).append(row)
+            else:
+                self.state = {'last_borrow_id': rows[0][0], 'refreshed_at': rows[0][1]}
+        return True
+
+def stored(db):
+    return {book: sorted((p, similar, round(score, 9)) for _, p, similar, score in rows) for book, rows in db.lists.items()}
+
+def test_refresh_matches_a_rebuild():
+    rng = np.random.default_rng(5)
+    loans = [(index + 1, f"MEM-{member:03d}", f"BK-{book:03d}")
+             for index, (member, book) in enumerate(zip(rng.integers(0, 30, 200), rng.integers(0, 25, 200)))]
+    db = LoansDb(loans)
+    BookRecommender(db).rebuild()
+
+    # A new patron borrowing one title only changes that title's borrower count, which
+    # lowers its score in the lists of books that patron never touched
+    db.loans += [(201, 'MEM-NEW', 'BK-003'), (202, 'MEM-001', 'BK-020')]
+    assert BookRecommender(db).refresh() > 0
+
+    fresh = LoansDb(db.loans)
+    BookRecommender(fresh).rebuild()
+    assert stored(db) == stored(fresh)
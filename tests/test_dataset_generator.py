@@ -0,0 +1,26 @@
+# test_dataset_generator.py
+
+from dataset_generator import isbn13
+
+def check_digit(body):
+    # ISBN-13 check digit, digits weighted 1, 3, 1, 3, ...
+    total = sum(int(digit) * (3 if index % 2 else 1) for index, digit in enumerate(body))
+    return (10 - total % 10) % 10
+
+def test_known_isbn():
+    # 978-0-306-40615-7 is the standard worked example
+    assert check_digit('978030640615') == 7
+
+def test_isbns_are_valid():
+    for number in list(range(1000)) + [10 ** 6, 123456789, 10 ** 9 - 1]:
+        isbn = isbn13(number)
+        assert len(isbn) == 13 and isbn.isdigit()
+        assert isbn.startswith('978')
+        assert int(isbn[-1]) == check_digit(isbn[:12])
+
+def test_isbns_are_unique():
+    isbns = [isbn13(number) for number in range(50000)]
+    assert len(set(isbns)) == len(isbns)
+
+def test_isbns_do_not_look_sequential():
+    assert int(isbn13(1)[3:12]) - int(isbn13(0)[3:12]) != 1
@@ -0,0 +1,45 @@
+# test_password_hashing.py
+
+import password_hashing
+from password_hashing import hash_password, verify_password, needs_rehash
+
+# A low scrypt cost keeps the tests fast; verify_password reads the cost from the stored hash
+FAST = {'n': 2 ** 4, 'r': 1, 'p': 1}
+
+def test_scrypt_hash_round_trip():
+    stored = hash_password('s3cret!', **FAST)
+    assert stored.startswith('scrypt$16$1$1$')
+    assert verify_password('s3cret!', stored)
+    assert not verify_password('s3cret', stored)
+    assert not verify_password('S3cret!', stored)
+
+def test_hashes_are_salted():
+    assert hash_password('same', **FAST) != hash_password('same', **FAST)
+
+def test_non_ascii_passwords():
+    stored = hash_password('contraseña ñ', **FAST)
+    assert verify_password('contraseña ñ', stored)
+    assert not verify_password('contrasena n', stored)
+
+def test_legacy_plaintext_passwords():
+    assert verify_password('admin123', 'admin123')
+    assert not verify_password('admin12', 'admin123')
+    assert not verify_password('', 'admin123')
+    assert needs_rehash('admin123')
+
+def test_malformed_hash_is_rejected():
+    assert not verify_password('anything', 'scrypt$16$1$1$not-base64')
+    assert not verify_password('anything', 'scrypt$16$1')
+
+def test_unknown_user_still_hashes(monkeypatch):
+    costs = []
+    monkeypatch.setattr(password_hashing, 'hash_password', lambda password: costs.append(password))
+    assert not verify_password('guess', None)
+    assert costs == ['guess']
+    assert needs_rehash(None)
+
+def test_rehash_only_when_the_cost_changed():
+    assert needs_rehash(hash_password('pw', **FAST))
+    current = (f"scrypt${password_hashing.PASSWORD_SCRYPT_N}${password_hashing.PASSWORD_SCRYPT_R}"
+               f"${password_hashing.PASSWORD_SCRYPT_P}$c2FsdA==$a2V5")
+    assert not needs_rehash(current)
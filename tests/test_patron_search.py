@@ -0,0 +1,43 @@
+# test_patron_search.py
+
+from patron_search import indexed_search, search_members, substring_search
+
+class FakeDb:
+    # Records queries and answers each with the next canned result
+    def __init__(self, *results):
+        self.results = list(results)
+        self.queries = []
+
+    def fetch_all(self, query, params=None):
+        self.queries.append((query, params))
+        return self.results.pop(0)
+
+def test_structured_keywords_use_their_key_index():
+    assert 'm.member_id LIKE' in indexed_search('MEM-00')[0]
+    assert indexed_search('mem-001')[1] == ('MEM-001%',)
+    assert indexed_search('Ana@Gmail.com')[1] == ('ana@gmail.com%',)
+    assert indexed_search('+63 917 123')[1] == ('63917123%',)
+    assert indexed_search('0917 123')[1] == ('63917123%',)
+    assert indexed_search('9171234567')[1] == ('639171234567%',)
+    assert indexed_search('Santos', status='Active')[1] == ('santos%', 'Active')
+
+def test_substring_keywords_are_scanned():
+    # Member-number digits, trailing phone digits and email domains have no indexed form
+    for keyword in ('001', '4567', '123456', 'gmail.com', 'cruz.ana'):
+        assert indexed_search(keyword) is None, keyword
+
+def test_short_unprefixed_digits_search_every_column():
+    db = FakeDb([{'member_id': 'MEM-001'}])
+    assert search_members(db, '001') == [{'member_id': 'MEM-001'}]
+    assert db.queries == [substring_search('001')]
+
+def test_empty_indexed_hit_falls_back_to_the_scan():
+    db = FakeDb([], [{'member_id': 'MEM-007', 'full_name': 'Rosa Santos'}])
+    assert search_members(db, 'ntos') == [{'member_id': 'MEM-007', 'full_name': 'Rosa Santos'}]
+    assert db.queries[0] == indexed_search('ntos')
+    assert db.queries[1] == substring_search('ntos')
+
+def test_indexed_hit_skips_the_scan():
+    db = FakeDb([{'member_id': 'MEM-007'}])
+    assert search_members(db, 'santos') == [{'member_id': 'MEM-007'}]
+    assert len(db.queries) == 1
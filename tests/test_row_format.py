@@ -0,0 +1,66 @@
+# test_row_format.py
+
+from datetime import date, datetime
+from decimal import Decimal
+import row_format
+from row_format import RowFormat, ColumnFormat, timestamp_column, date_column, currency_column, count_column
+from utilities import format_currency
+
+LOANS = [
+    {'book_id': 'BK-001', 'member_id': 'MEM-001', 'book_title': 'Dune', 'borrow_date': date(2026, 1, 5),
+     'return_date': None, 'due_date': date(2026, 1, 19), 'status': 'Borrowed', 'fine_amount': Decimal('0.00'),
+     'updated_at': datetime(2026, 1, 5, 9, 3, 7, 512000)},
+    {'book_id': 'BK-002', 'member_id': 'MEM-002', 'book_title': 'Emma', 'borrow_date': date(2025, 12, 1),
+     'return_date': date(2026, 1, 2), 'due_date': date(2025, 12, 15), 'status': 'Returned',
+     'fine_amount': Decimal('1850.50'), 'updated_at': datetime(2026, 1, 2, 17, 0, 0)},
+    {'book_id': 'BK-003', 'member_id': 'MEM-001', 'book_title': 'Ulysses', 'borrow_date': date(2026, 1, 5),
+     'return_date': None, 'due_date': date(2026, 1, 19), 'status': 'Overdue', 'fine_amount': 1234567.891,
+     'updated_at': datetime(2026, 1, 20, 0, 0, 59, 999999)}]
+
+def old_loan_values(item):
+    # circulation_desk's per-row formatting before RowFormat
+    return (item['book_id'], item['member_id'], item['book_title'], item['borrow_date'].strftime('%Y-%m-%d'),
+            item['return_date'].strftime('%Y-%m-%d') if item['return_date'] else 'N/A',
+            item['due_date'].strftime('%Y-%m-%d'), item['status'], format_currency(item['fine_amount']),
+            item['updated_at'].strftime('%Y-%m-%d %H:%M:%S') if item.get('updated_at') else '')
+
+def old_member_values(member):
+    # patron_management's per-row formatting before RowFormat
+    borrowed_text = f"{member['borrowed_count']} book" if member['borrowed_count'] == 1 \
+        else f"{member['borrowed_count']} books"
+    return (member['member_id'], member['full_name'], borrowed_text,
+            member['added_at'].strftime('%Y-%m-%d %H:%M:%S') if member['added_at'] else '')
+
+def test_loan_rows_match_the_strftime_path():
+    loan_format = RowFormat(
+        ('book_id', None), ('member_id', None), ('book_title', None), ('borrow_date', date_column()),
+        ('return_date', date_column('N/A')), ('due_date', date_column()), ('status', None),
+        ('fine_amount', currency_column()), ('updated_at', timestamp_column()))
+    assert loan_format.format_rows(LOANS) == [old_loan_values(item) for item in LOANS]
+
+def test_member_rows_match_the_strftime_path():
+    members = [{'member_id': f'MEM-{n:03d}', 'full_name': 'Ana Cruz', 'borrowed_count': n % 3,
+                'added_at': datetime(2025, 7, 1, 8, 30, n) if n % 4 else None} for n in range(12)]
+    member_format = RowFormat(('member_id', None), ('full_name', None),
+                              ('borrowed_count', count_column('book', 'books')), ('added_at', timestamp_column()))
+    assert member_format.format_rows(members) == [old_member_values(member) for member in members]
+
+def test_single_column_and_empty_batches():
+    ids = RowFormat(('book_id', None))
+    assert ids.format_rows(LOANS) == [('BK-001',), ('BK-002',), ('BK-003',)]
+    assert ids.format_rows([]) == []
+
+def test_each_distinct_value_is_converted_once():
+    calls = []
+    column = ColumnFormat(lambda value: calls.append(value) or str(value))
+    assert column([1, 2, 1, None, 2, 1]) == ['1', '2', '1', '', '2', '1']
+    assert column([2, 3]) == ['2', '3']
+    assert sorted(calls) == [1, 2, 3]
+
+def test_cache_starts_over_when_full(monkeypatch):
+    monkeypatch.setattr(row_format, 'FORMAT_CACHE_SIZE', 3)
+    column = date_column('N/A')
+    days = [date(2026, 1, day) for day in range(1, 6)]
+    assert column(days) == [day.strftime('%Y-%m-%d') for day in days]
+    assert column([None, days[0]]) == ['N/A', '2026-01-01']
+    assert len(column.cache) == 2
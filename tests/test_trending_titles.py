@@ -0,0 +1,138 @@
+# test_trending_titles.py
+
+import random
+from collections import Counter
+from datetime import date, datetime, timedelta
+from trending_titles import SpaceSaving, TrendingTitles
+
+def zipf_stream(items, length, seed):
+    # Skewed checkout stream over `items` titles, a few popular and a long tail
+    rng = random.Random(seed)
+    weights = [1 / rank for rank in range(1, items + 1)]
+    return rng.choices([f"BK-{index:03d}" for index in range(items)], weights=weights, k=length)
+
+def test_counts_stay_within_their_error_bounds():
+    stream = zipf_stream(500, 20000, seed=1)
+    summary = SpaceSaving(capacity=50)
+    for item in stream:
+        summary.offer(item)
+
+    true_counts = Counter(stream)
+    assert len(summary) == 50
+    for item, count in summary.counts.items():
+        error = summary.errors[item]
+        assert count - error <= true_counts[item] <= count
+        assert error <= len(stream) / summary.capacity
+
+def test_heavy_hitters_are_always_kept():
+    stream = zipf_stream(500, 20000, seed=2)
+    summary = SpaceSaving(capacity=50)
+    for item in stream:
+        summary.offer(item)
+
+    threshold = len(stream) / summary.capacity
+    heavy = [item for item, count in Counter(stream).items() if count > threshold]
+    assert heavy
+    assert all(item in summary.counts for item in heavy)
+
+def test_weighted_offers_match_repeated_offers():
+    weighted, repeated = SpaceSaving(capacity=3), SpaceSaving(capacity=3)
+    for item, weight in [('a', 5), ('b', 3), ('c', 2), ('d', 4), ('a', 1)]:
+        weighted.offer(item, weight)
+        for _ in range(weight):
+            repeated.offer(item)
+    assert weighted.counts['a'] == repeated.counts['a'] == 6
+    assert weighted.counts['d'] == 6 and weighted.errors['d'] == 2
+
+def test_window_merges_day_summaries():
+    today = date(2026, 10, 19)
+    trending = TrendingTitles(capacity=20, days=30)
+    true_counts = Counter()
+    for offset in range(10):
+        day = today - timedelta(days=offset)
+        for item in zipf_stream(200, 2000, seed=offset):
+            trending.buckets.setdefault(day, SpaceSaving(20)).offer(item)
+            if offset < 7:
+                true_counts[item] += 1
+
+    top = trending.top(window_days=7, limit=5, today=today)
+    assert len(top) == 5
+    assert [loans for _, loans, _ in top] == sorted((loans for _, loans, _ in top), reverse=True)
+    for book_id, loans, error in top:
+        # Merged estimates keep the lower bound; the error is the sum of the days' errors
+        assert loans - error <= true_counts[book_id]
+    assert top[0][0] == true_counts.most_common(1)[0][0]
+
+def test_window_excludes_days_outside_it():
+    today = date(2026, 10, 19)
+    trending = TrendingTitles(capacity=5, days=30)
+    trending.buckets[today] = SpaceSaving(5)
+    trending.buckets[today].offer('recent', 2)
+    trending.buckets[today - timedelta(days=10)] = SpaceSaving(5)
+    trending.buckets[today - timedelta(days=10)].offer('older', 50)
+
+    assert trending.top(window_days=7, today=today) == [('recent', 2, 0)]
+    assert trending.top(window_days=30, today=today)[0] == ('older', 50, 0)
+
+class BucketDb:
+    # trending_buckets, book_daily_loans and rollup_state in dicts, answering TrendingTitles' queries
+    offline = False
+
+    def __init__(self, saved=None, rollups=None, refreshed_at=None):
+        self.saved = Counter(saved or {})
+        self.rollups = rollups or {}
+        self.refreshed_at = refreshed_at
+
+    def fetch_all(self, query, params):
+        if 'FROM trending_buckets' in query:
+            return [{'bucket_date': day, 'book_id': book_id, 'loans': loans}
+                    for (day, book_id), loans in self.saved.items() if day > params[0]]
+        return [{'bucket_date': day, 'book_id': book_id, 'loans': loans}
+                for (day, book_id), loans in self.rollups.items() if params[0] < day < params[1]]
+
+    def fetch_one(self, query, params=None):
+        return {'refreshed_at': self.refreshed_at} if self.refreshed_at else None
+
+    def execute_batch(self, batches):
+        for query, rows in batches:
+            if query.startswith('DELETE'):
+                continue
+            for day, book_id, loans in rows:
+                if 'IGNORE' in query:
+                    self.saved.setdefault((day, book_id), loans)
+                else:
+                    self.saved[(day, book_id)] += loans
+        return True
+
+def test_sync_picks_up_other_desks_without_counting_own_checkouts_twice():
+    today = date.today()
+    db = BucketDb(saved={(today, 'BK-1'): 3})
+    desk_a, desk_b = TrendingTitles(capacity=10), TrendingTitles(capacity=10)
+    desk_a.load(db)
+    desk_b.load(db)
+
+    desk_a.record('BK-1')
+    desk_a.record('BK-2')
+    desk_b.record('BK-2')
+    desk_a.sync(db)
+    desk_b.sync(db)
+    desk_a.sync(db)
+
+    assert db.saved == Counter({(today, 'BK-1'): 4, (today, 'BK-2'): 2})
+    assert dict((book_id, loans) for book_id, loans, _ in desk_a.top(7)) == {'BK-1': 4, 'BK-2': 2}
+    assert desk_a.top(7) == desk_b.top(7)
+    assert not desk_a.pending and not desk_b.pending
+
+def test_seed_copies_only_days_before_the_rollup_watermark():
+    today = date.today()
+    yesterday = today - timedelta(days=1)
+    db = BucketDb(rollups={(yesterday, 'BK-1'): 5, (today, 'BK-1'): 2},
+                  refreshed_at=datetime.combine(today, datetime.min.time()))
+    trending = TrendingTitles(capacity=10)
+    trending.record('BK-1', yesterday)   # already in yesterday's rollup
+    trending.record('BK-1', today)       # not in any seeded day
+    trending.load(db)
+
+    assert db.saved == Counter({(yesterday, 'BK-1'): 5})
+    assert trending.pending == Counter({(today, 'BK-1'): 1})
+    assert trending.top(7) == [('BK-1', 6, 0)]